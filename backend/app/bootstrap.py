@@ -0,0 +1,73 @@
+from sqlalchemy import inspect
+from app.db.database import Base, SessionLocal, engine
+from app.db.search import rebuild_search_index
+from app.db import migrations
+from app.services import glycemic, units
+from app import models  # noqa: F401  registers every table on Base.metadata
+import argparse, logging
+
+logger = logging.getLogger(__name__)
+
+# One-shot schema setup, run once per deploy instead of in every worker:
+#   python -m app.bootstrap [--rebuild-search] [--backfill-units] [--backfill-glycemic]
+# Creates missing tables, then applies pending migrations (app/db/migrations.py) to existing ones.
+# Workers check on startup that no migration is pending and refuse to start otherwise.
+
+
+def create_tables():
+    Base.metadata.create_all(bind=engine)
+
+
+def migrate() -> list[str]:
+    with engine.begin() as connection:
+        return migrations.migrate(connection)
+
+
+def setup_schema() -> list[str]:
+    create_tables()
+    return migrate()
+
+
+def rebuild_search():
+    with engine.begin() as connection:
+        rebuild_search_index(connection)
+
+
+def backfill_units() -> int:
+    db = SessionLocal()
+    try:
+        return units.backfill_recipe_ingredients(db)
+    finally:
+        db.close()
+
+
+def backfill_glycemic() -> int:
+    db = SessionLocal()
+    try:
+        return glycemic.backfill(db)
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create database tables, apply migrations and search indexes")
+    parser.add_argument("--rebuild-search", action="store_true", help="Re-index rows written before the search tables existed")
+    parser.add_argument("--backfill-units", action="store_true", help="Parse typed amounts for older recipe ingredient rows (after migration 017)")
+    parser.add_argument("--backfill-glycemic", action="store_true", help="Precompute glycemic figures for cached recipes")
+    args = parser.parse_args(argv)
+
+    applied = setup_schema()
+    logger.info("Tables ready: %s", ", ".join(sorted(inspect(engine).get_table_names())))
+    logger.info("Migrations applied: %s", ", ".join(applied) or "none pending")
+    if args.rebuild_search:
+        rebuild_search()
+        logger.info("Search index rebuilt")
+    if args.backfill_units:
+        logger.info("Typed amounts filled for %d recipe ingredients", backfill_units())
+    if args.backfill_glycemic:
+        logger.info("Glycemic figures computed for %d recipes", backfill_glycemic())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
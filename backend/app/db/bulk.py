@@ -0,0 +1,269 @@
+from sqlalchemy import and_, bindparam, func, insert, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+from types import SimpleNamespace
+from app.models.db_recipes import Recipe, RecipeIngredient, Ingredient, Product
+import copy, logging
+
+logger = logging.getLogger(__name__)
+
+# Bulk persistence for rows coming from Spoonacular.
+# One IN lookup for existence, one INSERT ... ON CONFLICT (spoonacular_id) per table,
+# one commit per call. Safe when several workers cache the same rows at once.
+
+RECIPE_COLUMNS = (
+    "spoonacular_id", "title", "image", "instructions", "meal_type", "diet", "cuisine", "prep_time", "servings",
+    "likes", "calories", "protein", "carbs", "fat", "cached",
+)
+RECIPE_INGREDIENT_COLUMNS = (
+    "ingredients", "name", "spoonacular_ingredient_id", "quantity", "unit", "amount", "base_unit", "base_amount",
+)
+INGREDIENT_COLUMNS = ("spoonacular_id", "name", "image")
+PRODUCT_COLUMNS = ("spoonacular_id", "title", "image", "image_type")
+
+# Rows per multi-row INSERT, well below the bind parameter limits
+CHILD_BATCH_SIZE = 1000
+
+# Callbacks (db, recipe_ids) run after upsert_recipes commits inserted/updated recipes or new ingredient rows.
+# Services holding derived data (in-memory indexes, precomputed tables) register here.
+after_recipes_written: list = []
+# Callbacks (db, spoonacular_ids) run after upsert_ingredients inserts new ingredients.
+after_ingredients_written: list = []
+
+
+def upsert_insert(db: Session, model):
+    """
+    Dialect-specific INSERT that supports on_conflict_do_nothing / on_conflict_do_update.
+    Other dialects get a PortableUpsert with the same API. Run the statement with execute_upsert.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    return PortableUpsert(model)
+
+
+def execute_upsert(db: Session, stmt):
+    # db.execute for upsert_insert statements; PortableUpsert runs its row-by-row fallback
+    if isinstance(stmt, PortableUpsert):
+        return stmt.run(db)
+    return db.execute(stmt)
+
+
+class PortableUpsert:
+    """
+    INSERT ... ON CONFLICT for dialects without it. It keeps the fluent API of the Postgres / SQLite
+    insert (values, on_conflict_do_nothing / on_conflict_do_update, excluded, returning). Each row gets
+    an existence check on the conflict columns, then an UPDATE or a plain INSERT.
+    A row inserted concurrently (IntegrityError) counts as a conflict.
+    """
+
+    def __init__(self, model):
+        self.table = model.__table__
+        self.rows: list[dict] = []
+        self.index_elements: list[str] = []
+        self.set_: dict | None = None
+        self.returning_columns: tuple = ()
+        # excluded.<column> is the row being inserted, bound per row when the UPDATE runs
+        self.excluded = SimpleNamespace(**{
+            column.name: bindparam(f"excluded_{column.name}", type_=column.type) for column in self.table.columns
+        })
+
+    def _with(self, **changes) -> "PortableUpsert":
+        stmt = copy.copy(self)
+        stmt.__dict__.update(changes)
+        return stmt
+
+    def values(self, rows=None, **values) -> "PortableUpsert":
+        rows = [values] if rows is None else [rows] if isinstance(rows, dict) else list(rows)
+        return self._with(rows=rows)
+
+    def on_conflict_do_nothing(self, index_elements) -> "PortableUpsert":
+        return self._with(index_elements=list(index_elements), set_=None)
+
+    def on_conflict_do_update(self, index_elements, set_) -> "PortableUpsert":
+        return self._with(index_elements=list(index_elements), set_=dict(set_))
+
+    def returning(self, *columns) -> "PortableUpsert":
+        return self._with(returning_columns=columns)
+
+    def run(self, db: Session) -> "_ReturnedRows":
+        returned = []
+        for row in self.rows:
+            condition = and_(*(self.table.c[name] == row[name] for name in self.index_elements))
+            if db.execute(select(literal(1)).select_from(self.table).where(condition)).first() is None:
+                try:
+                    with db.begin_nested():
+                        db.execute(insert(self.table).values(row))
+                except IntegrityError:
+                    pass
+                else:
+                    if self.returning_columns:
+                        returned.append(db.execute(select(*self.returning_columns).where(condition)).one())
+                    continue
+            if self.set_:
+                excluded = {f"excluded_{column.name}": row.get(column.name) for column in self.table.columns}
+                db.execute(update(self.table).where(condition).values(self.set_), excluded)
+        return _ReturnedRows(returned)
+
+
+class _ReturnedRows(list):
+    # The parts of Result the call sites use: iteration, all(), scalars()
+    def all(self) -> list:
+        return list(self)
+
+    def scalars(self):
+        return (row[0] for row in self)
+
+
+def _run_callbacks(callbacks: list, db: Session, ids: list[int]):
+    # The rows are committed by now: a failing hook is logged and must not fail the write
+    for callback in callbacks:
+        try:
+            callback(db, ids)
+        except Exception:
+            logger.exception("After-write callback %s failed", getattr(callback, "__qualname__", callback))
+            db.rollback()
+
+
+def _dedupe(rows: list[dict]) -> list[dict]:
+    # Last payload wins, first position is kept
+    return list({row["spoonacular_id"]: row for row in rows}.values())
+
+
+def _recipe_values(row: dict) -> dict:
+    values = {column: row.get(column) for column in RECIPE_COLUMNS}
+    values["cached"] = row.get("cached", True)
+    return values
+
+
+def upsert_recipes(db: Session, rows: list[dict], update_fields: tuple[str, ...] = ()) -> list[Recipe]:
+    """
+    Insert recipe rows (see RECIPE_COLUMNS, plus an optional "ingredients" list) keyed by spoonacular_id.
+    Existing recipes only get update_fields overwritten with non-null values.
+    Child RecipeIngredient rows are written for recipes that have none yet; lines another writer
+    stored meanwhile are skipped on (recipe_id, position).
+    Returns the Recipe rows in input order.
+    """
+    rows = _dedupe(rows)
+    if not rows:
+        return []
+
+    ids = [row["spoonacular_id"] for row in rows]
+
+    # 1. Existence check: a single IN lookup
+    existing = dict(
+        db.query(Recipe.spoonacular_id, Recipe.id).filter(Recipe.spoonacular_id.in_(ids)).all()
+    )
+
+    # 2. Insert new recipes; rows another worker inserted meanwhile are skipped (not returned)
+    new_rows = [row for row in rows if row["spoonacular_id"] not in existing]
+    inserted = {}
+    if new_rows:
+        stmt = (
+            upsert_insert(db, Recipe)
+            .values([_recipe_values(row) for row in new_rows])
+            .on_conflict_do_nothing(index_elements=["spoonacular_id"])
+            .returning(Recipe.spoonacular_id, Recipe.id)
+        )
+        inserted = dict(execute_upsert(db, stmt).all())
+
+    written = set(inserted.values())
+
+    # 3. Refresh selected columns of recipes we already had
+    known_rows = [row for row in rows if row["spoonacular_id"] in existing]
+    if update_fields and known_rows:
+        stmt = upsert_insert(db, Recipe).values([_recipe_values(row) for row in known_rows])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["spoonacular_id"],
+            set_={field: func.coalesce(getattr(stmt.excluded, field), getattr(Recipe, field)) for field in update_fields},
+        )
+        execute_upsert(db, stmt)
+        written.update(existing[row["spoonacular_id"]] for row in known_rows)
+
+    # 4. Child ingredient rows for recipes inserted here, or known recipes still without ingredients
+    with_ingredients = [row for row in rows if row.get("ingredients")]
+    if with_ingredients:
+        known_ids = [existing[row["spoonacular_id"]] for row in with_ingredients if row["spoonacular_id"] in existing]
+        filled = {
+            recipe_id for (recipe_id,) in
+            db.query(RecipeIngredient.recipe_id).filter(RecipeIngredient.recipe_id.in_(known_ids)).distinct()
+        } if known_ids else set()
+
+        targets = {**existing, **inserted}
+        children = [
+            {
+                "recipe_id": targets[row["spoonacular_id"]], "position": position,
+                **{c: ing.get(c) for c in RECIPE_INGREDIENT_COLUMNS},
+            }
+            for row in with_ingredients
+            if row["spoonacular_id"] in inserted
+            or (row["spoonacular_id"] in existing and existing[row["spoonacular_id"]] not in filled)
+            for position, ing in enumerate(row["ingredients"])
+        ]
+        for start in range(0, len(children), CHILD_BATCH_SIZE):
+            execute_upsert(
+                db,
+                upsert_insert(db, RecipeIngredient)
+                .values(children[start:start + CHILD_BATCH_SIZE])
+                .on_conflict_do_nothing(index_elements=["recipe_id", "position"]),
+            )
+        written.update(child["recipe_id"] for child in children)
+
+    db.commit()
+
+    if written:
+        _run_callbacks(after_recipes_written, db, sorted(written))
+
+    # 5. Read everything back (ingredients in one extra SELECT ... IN, not one per recipe), in input order
+    recipes = {
+        recipe.spoonacular_id: recipe
+        for recipe in db.query(Recipe).options(selectinload(Recipe.ingredients)).filter(Recipe.spoonacular_id.in_(ids))
+    }
+    return [recipes[sid] for sid in ids if sid in recipes]
+
+
+def _upsert_catalog(db: Session, model, columns: tuple[str, ...], rows: list[dict], callbacks: list = ()) -> list:
+    rows = _dedupe(rows)
+    if not rows:
+        return []
+
+    ids = [row["spoonacular_id"] for row in rows]
+    existing = {
+        sid for (sid,) in db.query(model.spoonacular_id).filter(model.spoonacular_id.in_(ids))
+    }
+
+    new_rows = [row for row in rows if row["spoonacular_id"] not in existing]
+    if new_rows:
+        stmt = (
+            upsert_insert(db, model)
+            .values([{column: row.get(column) for column in columns} for row in new_rows])
+            .on_conflict_do_nothing(index_elements=["spoonacular_id"])
+        )
+        execute_upsert(db, stmt)
+
+    db.commit()
+
+    if new_rows:
+        _run_callbacks(callbacks, db, [row["spoonacular_id"] for row in new_rows])
+
+    found = {item.spoonacular_id: item for item in db.query(model).filter(model.spoonacular_id.in_(ids))}
+    return [found[sid] for sid in ids if sid in found]
+
+
+def upsert_ingredients(db: Session, rows: list[dict]) -> list[Ingredient]:
+    """
+    Insert ingredient rows (see INGREDIENT_COLUMNS) keyed by spoonacular_id, skipping known ones.
+    Returns the Ingredient rows in input order.
+    """
+    return _upsert_catalog(db, Ingredient, INGREDIENT_COLUMNS, rows, after_ingredients_written)
+
+
+def upsert_products(db: Session, rows: list[dict]) -> list[Product]:
+    """
+    Insert product rows (see PRODUCT_COLUMNS) keyed by spoonacular_id, skipping known ones.
+    Returns the Product rows in input order.
+    """
+    return _upsert_catalog(db, Product, PRODUCT_COLUMNS, rows)
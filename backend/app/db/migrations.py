@@ -0,0 +1,230 @@
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, insert, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateColumn
+from app.models.db_recipes import ProductSearch, Recipe, RecipeIngredient, SimilarRecipe, _sqlite_fts_ddl
+from app.models.db_shopping import ShoppingListRecipe, ShoppingListItem
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Schema changes for databases created before a model change. create_all (app/bootstrap.py) only
+# creates missing tables, so every column / index / constraint added to an existing table gets a
+# step here. Steps inspect the live schema before changing it (safe on fresh and old databases);
+# applied versions are recorded in schema_migrations. python -m app.bootstrap runs them.
+#
+#   @migration("023_recipes_likes")
+#   def _recipes_likes(connection):
+#       add_columns(connection, Recipe, "likes")
+
+# Kept off Base.metadata: it must exist before (and independently of) the model tables
+schema_migrations = Table(
+    "schema_migrations", MetaData(),
+    Column("version", String, primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# (version, step(connection)), applied in list order
+MIGRATIONS: list[tuple[str, callable]] = []
+
+# Serializes concurrent bootstraps (several release / start commands at once) on Postgres
+ADVISORY_LOCK_KEY = 0x637563  # "cuc"
+
+
+def migration(version: str):
+    def decorator(step):
+        MIGRATIONS.append((version, step))
+        return step
+    return decorator
+
+
+#       ------------------      Step helpers (idempotent)      ------------------
+
+def add_columns(connection: Connection, model, *names: str):
+    """
+    ALTER TABLE ... ADD COLUMN for each model column the table lacks, then its single-column indexes.
+    The column DDL (type, default, NOT NULL) is compiled from the model, so both stay in sync.
+    """
+    table = model.__table__
+    existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+    for name in names:
+        column = table.c[name]
+        if name not in existing:
+            ddl = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+        for index in table.indexes:
+            if list(index.columns) == [column]:
+                index.create(connection, checkfirst=True)
+
+
+def create_indexes(connection: Connection, model, *names: str):
+    indexes = {index.name: index for index in model.__table__.indexes}
+    for name in names:
+        indexes[name].create(connection, checkfirst=True)
+
+
+#       ------------------      Runner      ------------------
+
+def applied_versions(connection: Connection) -> set[str]:
+    if not inspect(connection).has_table(schema_migrations.name):
+        return set()
+    return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def pending(connection: Connection) -> list[str]:
+    applied = applied_versions(connection)
+    return [version for version, _ in MIGRATIONS if version not in applied]
+
+
+def migrate(connection: Connection) -> list[str]:
+    """
+    Apply every pending step in order, inside the caller's transaction. Returns the applied versions.
+    """
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+    schema_migrations.create(connection, checkfirst=True)
+
+    applied = applied_versions(connection)
+    done = []
+    for version, step in MIGRATIONS:
+        if version in applied:
+            continue
+        step(connection)
+        connection.execute(insert(schema_migrations).values(version=version, applied_at=datetime.utcnow()))
+        logger.info("Migration applied: %s", version)
+        done.append(version)
+    return done
+
+
+def check(engine):
+    """
+    Worker startup guard: refuse to serve on a database bootstrap has not brought up to date,
+    instead of failing later on the first query that touches a missing column.
+    """
+    try:
+        with engine.connect() as connection:
+            missing = pending(connection)
+    except OperationalError as error:
+        # Database unreachable at boot: requests will report it; not a schema problem
+        logger.warning("Schema check skipped, database unavailable: %s", error)
+        return
+    if missing:
+        raise RuntimeError(
+            f"Database schema is behind ({', '.join(missing)}). Run `python -m app.bootstrap` before starting "
+            "the web workers (release phase or start command), or set AUTO_CREATE_TABLES=true."
+        )
+
+
+#       ------------------      Steps, in order      ------------------
+
+@migration("004_text_search_indexes")
+def _text_search_indexes(connection):
+    create_indexes(connection, RecipeIngredient, "ix_recipe_ingredients_recipe_id")
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        create_indexes(connection, Recipe, "ix_recipes_title_trgm")
+        create_indexes(connection, RecipeIngredient, "ix_recipe_ingredients_ingredients_trgm")
+    elif connection.dialect.name == "sqlite":
+        for model, column in ((Recipe, "title"), (RecipeIngredient, "ingredients")):
+            for ddl in _sqlite_fts_ddl(model.__tablename__, column):
+                connection.execute(ddl)
+            # Index the rows cached before the FTS table existed
+            fts = f"{model.__tablename__}_fts"
+            connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+
+@migration("005_recipe_ingredients_position")
+def _recipe_ingredients_position(connection):
+    add_columns(connection, RecipeIngredient, "position")
+    # Number existing lines per recipe in insertion order, then enforce one line per position
+    connection.execute(text(
+        "UPDATE recipe_ingredients SET position = (SELECT COUNT(*) FROM recipe_ingredients AS earlier "
+        "WHERE earlier.recipe_id = recipe_ingredients.recipe_id AND earlier.id < recipe_ingredients.id) "
+        "WHERE position IS NULL"
+    ))
+    create_indexes(connection, RecipeIngredient, "uq_recipe_ingredients_recipe_position")
+
+
+@migration("006_recipe_ingredients_name")
+def _recipe_ingredients_name(connection):
+    add_columns(connection, RecipeIngredient, "name")
+
+
+@migration("007_similar_recipes_score")
+def _similar_recipes_score(connection):
+    add_columns(connection, SimilarRecipe, "score", "source")
+    inspector = inspect(connection)
+    existing = {index["name"] for index in inspector.get_indexes(SimilarRecipe.__tablename__)}
+    existing |= {constraint["name"] for constraint in inspector.get_unique_constraints(SimilarRecipe.__tablename__)}
+    if "uq_similar_recipes_edge" not in existing:
+        # Older databases may hold the same edge several times: keep the first before enforcing uniqueness
+        connection.execute(text(
+            "DELETE FROM similar_recipes WHERE id NOT IN "
+            "(SELECT MIN(id) FROM similar_recipes GROUP BY recipe_id, similar_recipe_id)"
+        ))
+        connection.execute(text(
+            "CREATE UNIQUE INDEX uq_similar_recipes_edge ON similar_recipes (recipe_id, similar_recipe_id)"
+        ))
+    create_indexes(connection, SimilarRecipe, "ix_similar_recipes_recipe_score")
+
+
+@migration("014_recipes_servings")
+def _recipes_servings(connection):
+    add_columns(connection, Recipe, "servings")
+
+
+@migration("016_recipe_ingredients_spoonacular_id")
+def _recipe_ingredients_spoonacular_id(connection):
+    add_columns(connection, RecipeIngredient, "spoonacular_ingredient_id")
+
+
+@migration("017_recipe_ingredients_amounts")
+def _recipe_ingredients_amounts(connection):
+    # Filled for older rows by python -m app.bootstrap --backfill-units, which runs after the migrations
+    add_columns(connection, RecipeIngredient, "amount", "base_unit", "base_amount")
+
+
+@migration("019_recipes_nutrition")
+def _recipes_nutrition(connection):
+    add_columns(connection, Recipe, "calories", "protein", "carbs", "fat")
+
+
+@migration("020_shopping_lists_cascade_hidden")
+def _shopping_lists_cascade_hidden(connection):
+    add_columns(connection, ShoppingListItem, "hidden")
+    if connection.dialect.name != "postgresql":
+        # SQLite cannot alter a foreign key in place; user deletion clears the lists explicitly
+        return
+    inspector = inspect(connection)
+    for model in (ShoppingListRecipe, ShoppingListItem):
+        table = model.__tablename__
+        for foreign_key in inspector.get_foreign_keys(table):
+            cascades = foreign_key["options"].get("ondelete") == "CASCADE"
+            if foreign_key["referred_table"] != "users" or foreign_key["constrained_columns"] != ["user_id"] or cascades:
+                continue
+            connection.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{foreign_key["name"]}"'))
+            connection.execute(text(
+                f'ALTER TABLE {table} ADD CONSTRAINT "{foreign_key["name"]}" FOREIGN KEY (user_id) '
+                "REFERENCES users (id) ON DELETE CASCADE"
+            ))
+
+
+@migration("020_shopping_list_recipes_items")
+def _shopping_list_recipes_items(connection):
+    add_columns(connection, ShoppingListRecipe, "items")
+
+
+@migration("021_recipes_cuisine")
+def _recipes_cuisine(connection):
+    add_columns(connection, Recipe, "cuisine")
+
+
+@migration("022_product_searches_fetched")
+def _product_searches_fetched(connection):
+    add_columns(connection, ProductSearch, "fetched")
+
+
+@migration("023_recipes_likes")
+def _recipes_likes(connection):
+    add_columns(connection, Recipe, "likes")
@@ -0,0 +1,35 @@
+from sqlalchemy.orm import Session
+from app.models.db_recipes import Recipe, RecipeIngredient
+
+# Read-only recipe payloads built straight from row tuples (no ORM identity map, no lazy loads).
+# Two queries for any number of recipes: the recipe columns, then every child ingredient row.
+# Dicts match RecipeSchema / IngredientSchema.
+
+RECIPE_FIELDS = (Recipe.id, Recipe.title, Recipe.image, Recipe.spoonacular_id, Recipe.instructions, Recipe.cached)
+INGREDIENT_FIELDS = (RecipeIngredient.recipe_id, RecipeIngredient.id, RecipeIngredient.ingredients,
+                     RecipeIngredient.quantity, RecipeIngredient.unit)
+
+
+def ingredients_by_recipe(db: Session, recipe_ids: list[int]) -> dict[int, list[dict]]:
+    grouped = {recipe_id: [] for recipe_id in recipe_ids}
+    if not recipe_ids:
+        return grouped
+    rows = (
+        db.query(*INGREDIENT_FIELDS)
+        .filter(RecipeIngredient.recipe_id.in_(recipe_ids))
+        .order_by(RecipeIngredient.recipe_id, RecipeIngredient.id)
+    )
+    for recipe_id, ingredient_id, ingredients, quantity, unit in rows:
+        grouped[recipe_id].append({"id": ingredient_id, "ingredients": ingredients, "quantity": quantity, "unit": unit})
+    return grouped
+
+
+def recipe_dicts(db: Session, recipe_ids: list[int]) -> list[dict]:
+    """
+    Recipes (with ingredients) for the given primary keys, in input order; unknown ids are skipped.
+    """
+    if not recipe_ids:
+        return []
+    recipes = {row.id: row._asdict() for row in db.query(*RECIPE_FIELDS).filter(Recipe.id.in_(recipe_ids))}
+    ingredients = ingredients_by_recipe(db, list(recipes))
+    return [{**recipes[recipe_id], "ingredients": ingredients[recipe_id]} for recipe_id in recipe_ids if recipe_id in recipes]
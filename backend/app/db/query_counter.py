@@ -0,0 +1,77 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from app.db.database import engine
+
+# SQL statement counting scoped to the current request / test.
+# The active counter lives in a ContextVar, so concurrent requests on the same engine are
+# counted separately; run_in_threadpool copies the context into the worker thread.
+#
+#   with assert_max_queries(3):
+#       _save_random_recipes(db, results)
+#
+# Over HTTP (TestClient runs the app in another thread), QueryCountMiddleware reports the
+# per-request count in an X-DB-Queries response header instead.
+
+_active: ContextVar["QueryCounter | None"] = ContextVar("query_counter", default=None)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _active.get()
+    if counter is not None:
+        counter.statements.append(statement)
+
+
+event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+@contextmanager
+def count_queries():
+    counter = QueryCounter()
+    token = _active.set(counter)
+    try:
+        yield counter
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    with count_queries() as counter:
+        yield counter
+    if counter.count > limit:
+        listing = "\n".join(f"  {i + 1}. {statement}" for i, statement in enumerate(counter.statements))
+        raise AssertionError(f"Expected at most {limit} queries, got {counter.count}:\n{listing}")
+
+
+class QueryCountMiddleware:
+    """
+    ASGI middleware: counts the SQL statements of each request into an X-DB-Queries header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with count_queries() as counter:
+            async def send_with_count(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-queries", str(counter.count).encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_count)
@@ -0,0 +1,108 @@
+from sqlalchemy import Float, Integer, bindparam, func, literal, or_, select, text
+from sqlalchemy.orm import Query
+from app.models.db_recipes import Recipe, RecipeIngredient, Product
+from app.services.normalize import TAG_SEPARATOR
+import re
+
+# Text search over Recipe.title / RecipeIngredient.ingredients / Product.title.
+# Postgres: pg_trgm GIN indexes (ILIKE + word similarity, ranked by word_similarity).
+# SQLite: FTS5 tables recipes_fts / recipe_ingredients_fts (ranked by bm25).
+# Any other backend falls back to a plain ILIKE scan.
+
+
+def _dialect(query: Query) -> str:
+    return query.session.get_bind().dialect.name
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _fts_match(term: str) -> str | None:
+    # Every word must match, as a prefix: "chick sou" -> "chick"* "sou"*
+    tokens = re.findall(r"\w+", term.lower())
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _fts_rowids(table: str, match: str):
+    return (
+        text(f"SELECT rowid AS id, bm25({table}) AS rank FROM {table} WHERE {table} MATCH :match")
+        .bindparams(bindparam("match", match, unique=True))
+        .columns(id=Integer, rank=Float)
+        .subquery()
+    )
+
+
+def _search_title(query: Query, model, fts_table: str, title: str) -> Query:
+    dialect = _dialect(query)
+
+    if dialect == "postgresql":
+        return query.filter(
+            or_(
+                model.title.ilike(_like_pattern(title), escape="\\"),
+                literal(title).op("<%")(model.title),
+            )
+        ).order_by(func.word_similarity(title, model.title).desc(), model.id)
+
+    match = _fts_match(title) if dialect == "sqlite" else None
+    if match:
+        fts = _fts_rowids(fts_table, match)
+        return query.join(fts, fts.c.id == model.id).order_by(fts.c.rank, model.id)
+
+    return query.filter(model.title.ilike(_like_pattern(title), escape="\\")).order_by(model.id)
+
+
+def search_titles(query: Query, title: str) -> Query:
+    """
+    Filter a Recipe query by title and order it by relevance (best match first).
+    """
+    return _search_title(query, Recipe, "recipes_fts", title)
+
+
+def search_products(query: Query, title: str) -> Query:
+    """
+    Filter a Product query by title (word prefixes / trigram similarity), best match first.
+    """
+    return _search_title(query, Product, "products_fts", title)
+
+
+def has_tag(column, tag: str):
+    """
+    Filter for a comma-separated tag column (normalize.join_tags) containing `tag`, case-insensitively.
+    """
+    wrapped = literal(TAG_SEPARATOR) + func.lower(column) + literal(TAG_SEPARATOR)
+    return wrapped.contains(f"{TAG_SEPARATOR}{tag.strip().lower()}{TAG_SEPARATOR}", autoescape=True)
+
+
+def exclude_ingredients(query: Query, ingredients: list[str]) -> Query:
+    """
+    Drop recipes with any ingredient matching one of the given terms.
+    """
+    dialect = _dialect(query)
+
+    for ing in ingredients:
+        match = _fts_match(ing) if dialect == "sqlite" else None
+        if match:
+            fts = _fts_rowids("recipe_ingredients_fts", match)
+            matching = select(RecipeIngredient.recipe_id).join(fts, fts.c.id == RecipeIngredient.id)
+            query = query.filter(~Recipe.id.in_(matching))
+        else:
+            # On Postgres the trigram index on recipe_ingredients.ingredients serves this ILIKE
+            query = query.filter(
+                ~Recipe.ingredients.any(RecipeIngredient.ingredients.ilike(_like_pattern(ing), escape="\\"))
+            )
+
+    return query
+
+
+def rebuild_search_index(connection):
+    """
+    Re-index rows written before the FTS5 tables existed (SQLite only, no-op elsewhere).
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    for table in ("recipes_fts", "recipe_ingredients_fts", "products_fts"):
+        connection.execute(text(f"INSERT INTO {table}({table}) VALUES ('rebuild')"))
@@ -0,0 +1,148 @@
+import gzip, hashlib, re
+import brotli
+
+# HTTP caching for read endpoints: strong ETag from the response body, If-None-Match -> 304,
+# a Cache-Control policy per route and gzip / brotli above a size threshold.
+# Only successful GET responses are buffered; streamed NDJSON / SSE and everything else pass through.
+
+# (path pattern, Cache-Control) - first match wins. Routes that set Cache-Control themselves keep it.
+POLICIES = [
+    (re.compile(r"^/ingredient/info/\d+$"), "public, max-age=86400, stale-while-revalidate=604800"),
+    (re.compile(r"^/ingredient/substitutes/"), "public, max-age=86400"),
+    (re.compile(r"^/wine/"), "public, max-age=86400"),
+    (re.compile(r"^/recipes/\d+/similar_recipes$"), "public, max-age=3600"),
+    (re.compile(r"^/recipes/(search/|ingredients/|autocomplete)"), "public, max-age=60, stale-while-revalidate=300"),
+    (re.compile(r"^/(ingredient|products)/search"), "public, max-age=300"),
+    (re.compile(r"^/metrics/"), "no-store"),
+]
+# Anything else (random recipes, per-user data) is revalidated on every use, which the ETag makes cheap
+DEFAULT_POLICY = "no-cache"
+AUTHENTICATED_POLICY = "private, no-cache"
+
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+STREAMING_TYPES = ("application/x-ndjson", "text/event-stream")
+
+
+def policy_for(path: str, authenticated: bool = False) -> str:
+    if authenticated:
+        return AUTHENTICATED_POLICY
+    for pattern, policy in POLICIES:
+        if pattern.match(path):
+            return policy
+    return DEFAULT_POLICY
+
+
+def etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+_ENCODING_SUFFIX = re.compile(r'-(gzip|br)"$')
+
+
+def _matches(if_none_match: str, tag: str) -> bool:
+    # Weak comparison (RFC 9110 13.1.2); a "-gzip"/"-br" suffix names the same body in another encoding
+    if if_none_match.strip() == "*":
+        return True
+    tag = _ENCODING_SUFFIX.sub('"', tag)
+    return any(
+        _ENCODING_SUFFIX.sub('"', candidate.strip().removeprefix("W/")) == tag for candidate in if_none_match.split(",")
+    )
+
+
+def _encoding(accept_encoding: str) -> str | None:
+    accepted = {
+        part.split(";")[0].strip().lower()
+        for part in accept_encoding.split(",")
+        if not re.search(r";\s*q=0(\.0*)?\s*$", part)
+    }
+    if "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class HttpCacheMiddleware:
+    """
+    ASGI middleware: ETag / 304, Cache-Control and compression for GET responses.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        start = None
+        chunks = []
+        passthrough = False
+
+        async def buffered_send(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                content_type = next(
+                    (value.decode("latin-1") for name, value in message.get("headers", []) if name == b"content-type"), ""
+                )
+                if message["status"] != 200 or content_type.startswith(STREAMING_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            if message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await self._respond(send, start, b"".join(chunks), scope["path"], request_headers)
+                return
+            await send(message)
+
+        await self.app(scope, receive, buffered_send)
+
+    async def _respond(self, send, start: dict, body: bytes, path: str, request_headers: dict):
+        headers = [(name, value) for name, value in start.get("headers", []) if name != b"content-length"]
+        names = {name for name, _ in headers}
+        content_type = next((value.decode("latin-1") for name, value in headers if name == b"content-type"), "")
+
+        tag = etag(body)
+        if b"cache-control" not in names:
+            policy = policy_for(path, authenticated="authorization" in request_headers)
+            headers.append((b"cache-control", policy.encode()))
+
+        encoding = None
+        if b"content-encoding" not in names and content_type.startswith(COMPRESSIBLE_TYPES):
+            headers.append((b"vary", b"Accept-Encoding"))
+            if len(body) >= MIN_COMPRESS_SIZE:
+                encoding = _encoding(request_headers.get("accept-encoding", ""))
+        if encoding:
+            # Strong validators differ per content-coding
+            tag = f'{tag[:-1]}-{encoding}"'
+        headers.append((b"etag", tag.encode()))
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, tag):
+            headers = [(name, value) for name, value in headers if name not in (b"content-type", b"content-encoding")]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if encoding:
+            body = _compress(body, encoding)
+            headers.append((b"content-encoding", encoding.encode()))
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({**start, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
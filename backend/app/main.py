@@ -1,17 +1,56 @@
+from app import startup_timing
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 import uvicorn
-from app.routes import user
+startup_timing.mark("import_fastapi")
+from app.db import database
+startup_timing.mark("import_database")
+from app.routes import user, metrics
 from app.routes.spoonacular import recipes, ingredients, products, menu, wine
-from app.db.database import Base, engine
+from app.services import spoonacular
+from app.http_cache import HttpCacheMiddleware
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+import os
+startup_timing.mark("import_routers")
 
-def create_tables():
-    Base.metadata.create_all(bind=engine)
-create_tables()
+# Schema creation is a one-shot command (python -m app.bootstrap), not part of every worker boot.
+# AUTO_CREATE_TABLES=true restores create-on-startup (tables + migrations) for local development.
+AUTO_CREATE_TABLES = os.getenv("AUTO_CREATE_TABLES", "false").lower() in ("1", "true", "yes")
+# Otherwise refuse to start on a database with pending migrations (one small query at boot)
+SCHEMA_CHECK = os.getenv("SCHEMA_CHECK", "true").lower() in ("1", "true", "yes")
+# Background job worker (app/services/jobs.py) inside each web process; off when it runs separately
+RUN_JOB_WORKER = os.getenv("RUN_JOB_WORKER", "true").lower() in ("1", "true", "yes")
+# Build the autocomplete index in the background at startup instead of on the first keystroke
+AUTOCOMPLETE_WARM = os.getenv("AUTOCOMPLETE_WARM", "true").lower() in ("1", "true", "yes")
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if AUTO_CREATE_TABLES:
+        from app.bootstrap import setup_schema
+        await run_in_threadpool(setup_schema)
+        startup_timing.mark("create_tables")
+    elif SCHEMA_CHECK:
+        from app.db import migrations
+        await run_in_threadpool(migrations.check, database.engine)
+        startup_timing.mark("schema_check")
+    if RUN_JOB_WORKER:
+        from app.services import jobs
+        jobs.start_worker()
+    if AUTOCOMPLETE_WARM:
+        from app.services import autocomplete
+        autocomplete.start_build()
+    startup_timing.mark("startup")
+    yield
+    if RUN_JOB_WORKER:
+        await jobs.stop_worker()
+    # Release pooled Spoonacular and async DB connections on shutdown
+    await spoonacular.close_client()
+    await database.dispose_async_engine()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(user.router)
 app.include_router(recipes.router)
@@ -19,6 +58,7 @@ app.include_router(ingredients.router)
 app.include_router(products.router)
 app.include_router(menu.router)
 app.include_router(wine.router)
+app.include_router(metrics.router)
 
 
 # Welcome route
@@ -26,6 +66,8 @@ app.include_router(wine.router)
 def welcome_root():
     return {"Respuesta": "Esta funcionando"}
 
+# ETag / 304, per-route Cache-Control and compression for GET responses (inside CORS)
+app.add_middleware(HttpCacheMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["https://culinarytech.vercel.app"],
@@ -33,5 +75,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(startup_timing.FirstRequestTimer)
+
+# Development/test aid: X-DB-Queries header with the number of SQL statements per request
+if os.getenv("DEBUG_QUERY_COUNT", "false").lower() in ("1", "true", "yes"):
+    from app.db.query_counter import QueryCountMiddleware
+    app.add_middleware(QueryCountMiddleware)
+startup_timing.mark("app_ready")
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="127.0.0.1", port=8000, reload=True)
@@ -1,5 +1,8 @@
 
 from app.models.db_users import User
 from app.models.db_recipes import Recipe
+from app.models.db_jobs import Job
+from app.models.db_shopping import ShoppingListRecipe, ShoppingListItem
+from app.models.db_wine import WinePairing, WineLookup
 
-__all__ = ["Recipe", "User"]
\ No newline at end of file
+__all__ = ["Recipe", "User", "Job", "ShoppingListRecipe", "ShoppingListItem", "WinePairing", "WineLookup"]
\ No newline at end of file
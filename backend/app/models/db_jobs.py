@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index, UniqueConstraint
+from app.db.database import Base
+from datetime import datetime
+
+
+# Background job queue (see app/services/jobs.py)
+# One row per (kind, key): enqueueing the same work twice is a no-op.
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)                   # handler name, e.g. "enrich_recipe"
+    key = Column(String, nullable=False)                    # handler argument, e.g. a spoonacular id
+    status = Column(String, nullable=False, default="pending")   # pending | running | done | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, nullable=True)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)   # retry backoff
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("kind", "key", name="uq_jobs_kind_key"),
+        Index("ix_jobs_claim", "kind", "status", "run_after"),
+    )
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Index, UniqueConstraint, DDL, event
 from sqlalchemy.orm import relationship
 from app.db.database import Base
+from datetime import datetime
 
 # Model for the Recipe table in the database
 # This model defines the structure of the Recipe table and its columns.
@@ -15,7 +16,15 @@ class Recipe(Base):
     cached = Column(Boolean, default=True)
     meal_type = Column(String, nullable=True) 
     diet = Column(String, nullable=True)      
+    cuisine = Column(String, nullable=True)
     prep_time = Column(Integer, nullable=True)
+    servings = Column(Integer, nullable=True)
+    likes = Column(Integer, nullable=True)    # Spoonacular aggregateLikes, popularity for autocomplete
+    # Nutrition per serving, from full recipe payloads fetched with includeNutrition (meal planning)
+    calories = Column(Float, nullable=True)
+    protein = Column(Float, nullable=True)
+    carbs = Column(Float, nullable=True)
+    fat = Column(Float, nullable=True)
     
     #Relationships with ingredients
     ingredients = relationship("RecipeIngredient", back_populates="recipe", cascade="all, delete-orphan")
@@ -23,6 +32,14 @@ class Recipe(Base):
     #Relationships with similar recipes
     similar_recipes = relationship("SimilarRecipe", back_populates="recipe", cascade="all, delete-orphan")
 
+    # Trigram index so title ILIKE '%...%' / fuzzy search can use an index (Postgres only)
+    __table_args__ = (
+        Index(
+            "ix_recipes_title_trgm", "title",
+            postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
     def __repr__(self):
         return f"<Recipe(id={self.id}, title={self.title}, image={self.image})>"
     
@@ -34,21 +51,44 @@ class SimilarRecipe(Base):
     similar_recipe_id = Column(Integer, index=True)
     title = Column(String, index=True)
     image = Column(String, index=True)
+    score = Column(Float, nullable=True)      # higher = more similar
+    source = Column(String, nullable=True)    # "spoonacular" | "local" (ingredient MinHash)
     
     recipe = relationship("Recipe", back_populates="similar_recipes")
 
+    # Adjacency list: one edge per (recipe, similar recipe), read ordered by score
+    __table_args__ = (
+        UniqueConstraint("recipe_id", "similar_recipe_id", name="uq_similar_recipes_edge"),
+        Index("ix_similar_recipes_recipe_score", "recipe_id", "score"),
+    )
+
 
     
 class RecipeIngredient(Base):
     __tablename__ = "recipe_ingredients"
 
     id = Column(Integer, primary_key=True, index=True)
-    recipe_id = Column(Integer, ForeignKey("recipes.id"))
+    recipe_id = Column(Integer, ForeignKey("recipes.id"), index=True)
     ingredients = Column(String)
+    name = Column(String, nullable = True, index=True)  # normalized ingredient name (app/services/normalize.py)
+    spoonacular_ingredient_id = Column(Integer, nullable = True, index=True)  # links to Ingredient / IngredientNutrition
     quantity = Column(String, nullable = True)
     unit = Column(String, nullable = True)
+    # Typed amounts (app/services/units.py): parsed quantity, and the same amount in g / ml / piece
+    amount = Column(Float, nullable = True)
+    base_unit = Column(String, nullable = True)
+    base_amount = Column(Float, nullable = True)
+    position = Column(Integer, nullable = True)  # line number within the recipe, unique per recipe (app/db/bulk.py)
 
     recipe = relationship("Recipe", back_populates="ingredients")
+
+    __table_args__ = (
+        Index("uq_recipe_ingredients_recipe_position", "recipe_id", "position", unique=True),
+        Index(
+            "ix_recipe_ingredients_ingredients_trgm", "ingredients",
+            postgresql_using="gin", postgresql_ops={"ingredients": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
     
     
 class Ingredient(Base):
@@ -58,3 +98,93 @@ class Ingredient(Base):
     spoonacular_id = Column(Integer, unique=True, index=True)
     name = Column(String, index=True)
     image = Column(String, index=True)
+
+    nutrition = relationship("IngredientNutrition", back_populates="ingredient", uselist=False, cascade="all, delete-orphan")
+
+
+# Nutrition facts per `per_grams` grams of an ingredient, stored on first fetch (app/services/nutrition.py)
+class IngredientNutrition(Base):
+    __tablename__ = "ingredient_nutrition"
+
+    id = Column(Integer, primary_key=True, index=True)
+    ingredient_id = Column(Integer, ForeignKey("ingredients.id"), unique=True, index=True)
+    per_grams = Column(Float, nullable=False, default=100)
+    calories = Column(Float, nullable=True)     # kcal
+    carbs = Column(Float, nullable=True)        # g
+    fat = Column(Float, nullable=True)          # g
+    protein = Column(Float, nullable=True)      # g
+    fiber = Column(Float, nullable=True)        # g
+    sugar = Column(Float, nullable=True)        # g
+    sodium = Column(Float, nullable=True)       # mg
+
+    ingredient = relationship("Ingredient", back_populates="nutrition")
+
+
+# Grocery products cached from /food/products/search (app/routes/spoonacular/products.py)
+class Product(Base):
+    __tablename__ = "products"
+
+    id = Column(Integer, primary_key=True, index=True)
+    spoonacular_id = Column(Integer, unique=True, index=True)
+    title = Column(String, nullable=False)
+    image = Column(String, nullable=True)
+    image_type = Column(String, nullable=True)
+
+    # Same title search as recipes: trigram index on Postgres, FTS5 table on SQLite
+    __table_args__ = (
+        Index(
+            "ix_products_title_trgm", "title",
+            postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
+# Product searches already sent upstream: normalized query -> Spoonacular's total and how much of it is cached
+class ProductSearch(Base):
+    __tablename__ = "product_searches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    query = Column(String, unique=True, index=True, nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+    fetched = Column(Integer, nullable=False, default=0, server_default="0")   # leading upstream results cached
+    fetched_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# Precomputed glycemic figures per recipe, refreshed whenever its ingredients are written (app/services/glycemic.py)
+class RecipeGlycemic(Base):
+    __tablename__ = "recipe_glycemic"
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipe_id = Column(Integer, ForeignKey("recipes.id"), unique=True, index=True)
+    glycemic_index = Column(Float, nullable=True)             # carb-weighted mean GI of the matched ingredients
+    glycemic_load = Column(Float, nullable=False, default=0)
+    glycemic_load_per_serving = Column(Float, nullable=True)
+    classification = Column(String, nullable=True)           # low | medium | high (GL per serving)
+    servings = Column(Integer, nullable=True)
+    matched = Column(Integer, nullable=False, default=0)      # ingredients with a GI reference and grams
+    unmatched = Column(Integer, nullable=False, default=0)
+
+
+#       ------------------      Text search DDL (see app/db/search.py)      ------------------
+
+# Postgres: trigram operators/indexes need the pg_trgm extension
+event.listen(
+    Base.metadata, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
+# SQLite: FTS5 external-content tables kept in sync with triggers
+def _sqlite_fts_ddl(table: str, column: str) -> list[DDL]:
+    fts = f"{table}_fts"
+    return [
+        DDL(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({column}, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"),
+        DDL(f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END"),
+        DDL(f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END"),
+        DDL(f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column} ON {table} BEGIN INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END"),
+    ]
+
+
+for _model, _column in ((Recipe, "title"), (RecipeIngredient, "ingredients"), (Product, "title")):
+    for _ddl in _sqlite_fts_ddl(_model.__tablename__, _column):
+        event.listen(_model.__table__, "after_create", _ddl.execute_if(dialect="sqlite"))
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, JSON, UniqueConstraint, false
+from app.db.database import Base
+from datetime import datetime
+
+
+# Per-user shopping lists, maintained incrementally (see app/services/shopping.py)
+# Recipes currently on a user's list
+class ShoppingListRecipe(Base):
+    __tablename__ = "shopping_list_recipes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    recipe_id = Column(Integer, ForeignKey("recipes.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # [[name, unit, amount], ...] added to the items, subtracted as-is when the recipe is removed
+    items = Column(JSON, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "recipe_id", name="uq_shopping_list_recipes_user_recipe"),
+    )
+
+
+# One aggregated line per (user, normalized ingredient, unit); amounts are running sums
+class ShoppingListItem(Base):
+    __tablename__ = "shopping_list_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String, nullable=False)
+    unit = Column(String, nullable=False, default="")       # g | ml | piece, or the recipe unit when not convertible
+    amount = Column(Float, nullable=False, default=0)        # 0: no parseable amount ("salt to taste")
+    recipe_count = Column(Integer, nullable=False, default=0)   # recipe lines merged in; 0 -> row removed
+    # Deleted by the user: kept (amounts still follow recipe changes) but not listed until the row goes
+    hidden = Column(Boolean, nullable=False, default=False, server_default=false())
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "name", "unit", name="uq_shopping_list_items_user_name_unit"),
+    )
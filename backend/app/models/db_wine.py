@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index, UniqueConstraint
+from app.db.database import Base
+from datetime import datetime
+
+
+# Wine pairings learned from Spoonacular (see app/services/wine.py)
+# One edge per (dish, wine), whichever direction it was looked up from
+class WinePairing(Base):
+    __tablename__ = "wine_pairings"
+
+    id = Column(Integer, primary_key=True, index=True)
+    dish = Column(String, nullable=False)       # normalized food, ingredient or cuisine
+    wine = Column(String, nullable=False)       # normalized wine name or type
+    source = Column(String, nullable=False)     # "dish" (/food/wine/pairing) | "wine" (/food/wine/dishes)
+
+    __table_args__ = (
+        UniqueConstraint("dish", "wine", name="uq_wine_pairings_dish_wine"),
+        Index("ix_wine_pairings_wine", "wine"),
+    )
+
+
+# Lookups already answered upstream (also the empty ones), so they are never fetched twice
+class WineLookup(Base):
+    __tablename__ = "wine_lookups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)       # "dish" | "wine"
+    term = Column(String, nullable=False)
+    text = Column(String, nullable=True)        # Spoonacular's pairing description
+    fetched_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("kind", "term", name="uq_wine_lookups_kind_term"),
+    )
@@ -1,8 +1,15 @@
-from passlib.context import CryptContext
-from jose import jwt
+from fastapi import Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.db.database import SessionLocal
+from app.models.db_users import User as UserModel
+from app.schemas.users import CurrentUser
+from app.services.cache import TTLCache, MISSING
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 from dotenv import load_dotenv
-import os
+import asyncio, os, time
 
 load_dotenv()
 
@@ -11,11 +18,34 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-#Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost factor; hashes with any other cost are re-hashed on the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Dedicated hashing threads and how many requests may wait for one before we shed load
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_DEPTH = int(os.getenv("HASH_QUEUE_DEPTH", "32"))
+# Verified tokens are cached until they expire; user rows for USER_CACHE_TTL seconds
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+
+#Password hashing | passlib (and its bcrypt backend) is loaded on first use, not at boot
+_pwd_context = None
+
+def get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__rounds=BCRYPT_ROUNDS,
+            bcrypt__min_rounds=BCRYPT_ROUNDS,
+            bcrypt__max_rounds=BCRYPT_ROUNDS,
+        )
+    return _pwd_context
 
 def verify_password(plain_password , hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
@@ -24,8 +54,182 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
+    from jose import jwt
+
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return get_pwd_context().hash(password)
+
+
+#       ------------------      Bounded hashing executor      ------------------
+
+class HashingPool:
+    """
+    Runs bcrypt on its own small thread pool so login bursts cannot starve the request threadpool.
+    Past HASH_WORKERS running + HASH_QUEUE_DEPTH waiting, new calls fail fast with 503.
+    """
+
+    def __init__(self, workers: int, queue_depth: int):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self.pending = 0            # running + waiting (only touched from the event loop)
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_ms = deque(maxlen=1000)
+        self.hash_ms = deque(maxlen=1000)
+
+    def _timed(self, submitted_at: float, fn, *args):
+        started_at = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            finished_at = time.perf_counter()
+            self.wait_ms.append((started_at - submitted_at) * 1000)
+            self.hash_ms.append((finished_at - started_at) * 1000)
+
+    async def run(self, fn, *args):
+        if self.pending >= self.workers + self.queue_depth:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+        loop = asyncio.get_running_loop()
+        future = self.executor.submit(self._timed, time.perf_counter(), fn, *args)
+        self.pending += 1
+        # Released when the hash itself ends: a cancelled caller does not stop a running bcrypt call
+        future.add_done_callback(lambda done: self._release(loop, done))
+        return await asyncio.wrap_future(future)
+
+    def _release(self, loop, future):
+        # Executor thread (or here, when already done): hand the bookkeeping to the event loop
+        try:
+            loop.call_soon_threadsafe(self._finished, future)
+        except RuntimeError:
+            pass  # loop closed at shutdown
+
+    def _finished(self, future):
+        self.pending -= 1
+        if future.cancelled():
+            return
+        if future.exception() is None:
+            self.completed += 1
+        else:
+            self.failed += 1
+
+    @staticmethod
+    def _percentiles(samples) -> dict:
+        if not samples:
+            return {"p50": None, "p95": None, "max": None}
+        ordered = sorted(samples)
+        return {
+            "p50": round(ordered[len(ordered) // 2], 2),
+            "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+            "max": round(ordered[-1], 2),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue_depth": self.queue_depth,
+            "in_flight": min(self.pending, self.workers),
+            "queue_depth": max(self.pending - self.workers, 0),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            "wait_ms": self._percentiles(self.wait_ms),
+            "hash_ms": self._percentiles(self.hash_ms),
+        }
+
+
+hashing_pool = HashingPool(HASH_WORKERS, HASH_QUEUE_DEPTH)
+
+
+async def hash_password_async(password: str) -> str:
+    return await hashing_pool.run(get_pwd_context().hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    Returns (valid, new_hash); new_hash is set when the stored hash uses an outdated cost factor.
+    """
+    return await hashing_pool.run(get_pwd_context().verify_and_update, plain_password, hashed_password)
+
+
+#       ------------------      Authentication dependency      ------------------
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+# token -> decoded claims, and sub (email) -> CurrentUser. Per worker process: another
+# worker may serve a deleted/updated user for up to USER_CACHE_TTL seconds.
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE)
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE)
+
+
+def _unauthorized(detail: str = "Could not validate credentials"):
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+
+def decode_access_token(token: str) -> dict:
+    claims = token_cache.get(token)
+    if claims is not MISSING:
+        return claims
+
+    from jose import jwt, JWTError
+
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise _unauthorized()
+
+    if not claims.get("sub"):
+        raise _unauthorized()
+
+    ttl = claims.get("exp", 0) - time.time()
+    if ttl > 0:
+        token_cache.set(token, claims, ttl)
+    return claims
+
+
+def _load_user(email: str):
+    db = SessionLocal()
+    try:
+        user = db.query(UserModel).filter(UserModel.email == email).first()
+        return CurrentUser.model_validate(user) if user else None
+    finally:
+        db.close()
+
+
+def invalidate_user(*emails: str):
+    for email in emails:
+        user_cache.delete(email)
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+) -> CurrentUser:
+    """
+    Dependency for protected routes. Steady state is two in-memory lookups, no DB query.
+    """
+    if credentials is None:
+        raise _unauthorized("Not authenticated")
+
+    claims = decode_access_token(credentials.credentials)
+    email = claims["sub"]
+
+    user = user_cache.get(email)
+    if user is MISSING:
+        user = await run_in_threadpool(_load_user, email)
+        if user is not None:
+            user_cache.set(email, user, USER_CACHE_TTL)
+
+    if user is None or not user.status:
+        raise _unauthorized()
+    return user
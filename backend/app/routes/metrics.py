@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app import startup_timing
+from app.routes import auth
+from app.db.database import get_db
+from app.services import jobs, spoonacular, payloads
+
+# Operational data (and a GROUP BY on the job queue): signed-in callers only
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"],
+    dependencies=[Depends(auth.get_current_user)],
+)
+
+# Spoonacular response cache counters (size it from hit_ratio / evictions)
+@router.get("/cache")
+def get_cache_metrics():
+    return spoonacular.response_cache.stats()
+
+# Pre-encoded response payloads: recipe fragments and whole responses (searches, ingredient info)
+@router.get("/payloads")
+def get_payload_metrics():
+    return payloads.stats()
+
+# Password hashing pool: queue depth, rejections (503) and hash latency
+@router.get("/hashing")
+def get_hashing_metrics():
+    return auth.hashing_pool.stats()
+
+# Worker boot phases and time to first request
+@router.get("/startup")
+def get_startup_metrics():
+    return startup_timing.report()
+
+# Background job queue: job counts per kind and status
+@router.get("/jobs")
+def get_job_metrics(db: Session = Depends(get_db)):
+    return jobs.stats(db)
+
+# Spoonacular budget: points left/used (quota headers), mode, throttled and cache-only answers
+@router.get("/spoonacular")
+def get_spoonacular_metrics():
+    return spoonacular.scheduler.stats()
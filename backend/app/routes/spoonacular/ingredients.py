@@ -1,15 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from app.models.db_recipes import Ingredient as IngredientModel
 from app.schemas.recipe import Ingredient as IngredientSchema
 from app.schemas.recipe import IngredientSubstitute as IngredientSubstituteSchema
 from app.schemas.recipe import IngredientInfo as IngredientInfoSchema
+from app.schemas.recipe import NutritionRequest, NutritionSummary, ConversionRequest, ConversionResult
+from app.schemas.recipe import GlycemicRequest, GlycemicSummary
 from app.db.database import get_db
-from dotenv import load_dotenv
-import os, requests
-
-# Import environment variables
-load_dotenv()
+from app.db import bulk
+from app.services import spoonacular, nutrition, units, glycemic, payloads
+from app.services.cache import MISSING, make_key
 
 router = APIRouter(
     prefix="/ingredient",
@@ -20,101 +20,107 @@ router = APIRouter(
     },
 )
 
-API_KEY = os.getenv("SPOONACULAR_API_KEY")
-BASE_URL = "https://api.spoonacular.com"
+INGREDIENT_INFO_TTL = 86400
 
 
 #     ------------------      Endpoint search ingredients for SpoonacularAPI | User filter by ingredients      ------------------      
 
+def _save_ingredients(db: Session, results: list[dict]):
+    saved_ingredients = bulk.upsert_ingredients(db, [spoonacular.ingredient_row(ingredient) for ingredient in results])
+    return [IngredientSchema.model_validate(ingredient) for ingredient in saved_ingredients]
+
+
 @router.get("/search", response_model=list[IngredientSchema])
-def search_ingredients(
+async def search_ingredients(
     query: str = Query(..., description="Search query for ingredients"),
     number: int = Query(10, ge=10, le=50, description="Number of results to return"),
     db: Session = Depends(get_db)
 ):
 
     # Use API if not found in the database
-    response = requests.get(
-        f"{BASE_URL}/food/ingredients/search",
-        params={
-            "query": query,
-            "number": number,
-            "apiKey": API_KEY
-        },
+    data = await spoonacular.get_json(
+        "/food/ingredients/search",
+        {"query": query, "number": number},
+        error_detail="Failed to fetch ingredients from API",
     )
 
-    if response.status_code != 200:
-        raise HTTPException(status_code=500, detail="Failed to fetch ingredients from API")
-
-    results = response.json().get("results", [])
+    results = data.get("results", [])
 
     if not results:
         raise HTTPException(status_code=404, detail="Ingredients not found")
 
     # Save in the database
-    saved_ingredients = []
-    for ingredient in results:
-        existing_ingredient = db.query(IngredientModel).filter_by(spoonacular_id=ingredient["id"]).first()
-        if existing_ingredient:
-            saved_ingredients.append(existing_ingredient)
-            continue
-
-        new_ingredient = IngredientModel(
-            spoonacular_id=ingredient["id"],
-            name=ingredient["name"],
-            image=ingredient["image"],
-        )
-        db.add(new_ingredient)
-        saved_ingredients.append(new_ingredient)
-
-    db.commit()
-
-    # Avoid duplicates in the response
-    unique_ingredients = {ingredient.spoonacular_id: ingredient for ingredient in saved_ingredients}
-
-    return list(unique_ingredients.values())
+    return await run_in_threadpool(_save_ingredients, db, results)
 
 #     ------------------      Endpoint get parse ingredient information | resume ingredient information (calories, carbs, fat, protein, etc.)     ------------------ 
 
 @router.get("/info/{ingredient_id}", response_model=IngredientInfoSchema)
-def get_ingredient_info(ingredient_id: int):
+async def get_ingredient_info(ingredient_id: int, db: Session = Depends(get_db)):
     """
-    Get nutritional information for a specific ingredient by ID.
+    Get nutritional information (per 100 g) for a specific ingredient by ID.
+    Served from the nutrition store; Spoonacular is only asked the first time.
+    Stored facts never change, so the encoded answer is kept in memory (payloads.responses).
     """
-    response = requests.get(
-        f"{BASE_URL}/food/ingredients/{ingredient_id}/information",
-        params={"apiKey": API_KEY, "amount": 100, "unit": "g"},
-    )
-
-    if response.status_code != 200:
-        raise HTTPException(status_code=500, detail="Failed to fetch ingredient info from API")
-
-    data = response.json()
+    key = make_key(f"/ingredient/info/{ingredient_id}")
+    body = payloads.responses.get(key)
+    if body is MISSING:
+        info = IngredientInfoSchema.model_validate(await nutrition.get_nutrition(db, ingredient_id))
+        body = payloads.dumps(info.model_dump())
+        payloads.responses.set(key, body, INGREDIENT_INFO_TTL)
+    return payloads.json_response(body)
+
+#     ------------------      Endpoint batch nutrition | per-ingredient and total nutrition for ingredient ids or a cached recipe      ------------------
+
+@router.post("/nutrition", response_model=NutritionSummary)
+async def get_nutrition_summary(request: NutritionRequest, db: Session = Depends(get_db)):
+    if request.recipe_id is None and not request.ingredient_ids:
+        raise HTTPException(status_code=400, detail="Provide ingredient_ids or recipe_id")
+    if len(request.ingredient_ids) > 100:
+        raise HTTPException(status_code=400, detail="At most 100 ingredient ids per request")
+
+    # (spoonacular ingredient id, display name, grams) per line
+    lines = [(ingredient_id, None, float(nutrition.PER_GRAMS)) for ingredient_id in request.ingredient_ids]
+    if request.recipe_id is not None:
+        rows = await run_in_threadpool(nutrition.recipe_ingredients, db, request.recipe_id)
+        if not rows:
+            raise HTTPException(status_code=404, detail="Recipe not found or without ingredients")
+        lines += [
+            (row.spoonacular_ingredient_id, row.name or row.ingredients, units.line_grams(row))
+            for row in rows
+        ]
+
+    facts = await nutrition.ensure_nutrition(db, [line[0] for line in lines if line[0] is not None])
+
+    items, amounts, missing = [], [], []
+    for ingredient_id, name, grams in lines:
+        fact = facts.get(ingredient_id)
+        label = name or (fact or {}).get("name") or str(ingredient_id)
+        if fact is None or grams is None:
+            missing.append(label)
+            continue
+        items.append({**fact, "name": label})
+        amounts.append(grams)
 
+    scaled, totals = nutrition.combine(items, amounts)
     return {
-        "id": data.get("id"),
-        "name": data.get("name"),
-        "image": data.get("image"),
-        "calories": data.get("nutrition", {}).get("nutrients", [])[0].get("amount"),
-        "carbs": next((n.get("amount") for n in data.get("nutrition", {}).get("nutrients", []) if n.get("name") == "Carbohydrates"), None),
-        "fat": next((n.get("amount") for n in data.get("nutrition", {}).get("nutrients", []) if n.get("name") == "Fat"), None),
-        "protein": next((n.get("amount") for n in data.get("nutrition", {}).get("nutrients", []) if n.get("name") == "Protein"), None),
+        "ingredients": [
+            {"id": item["id"], "name": item["name"], "grams": round(grams, 2), **values}
+            for item, grams, values in zip(items, amounts, scaled)
+        ],
+        "totals": totals,
+        "missing": missing,
     }
 
 #     ------------------      Endpoint to get substitutes for ingredients | get substitutes for a list of ingredients (e.g. gluten-free, dairy-free, etc.)      
 
 @router.get("/substitutes/{ingredient_name}", response_model=IngredientSubstituteSchema)
-def get_ingredient_substitutes(ingredient_name: str):
-    response = requests.get(
-        f"{BASE_URL}/food/ingredients/substitutes",
-        params={"ingredientName": ingredient_name, "apiKey": API_KEY},
+async def get_ingredient_substitutes(ingredient_name: str):
+    data = await spoonacular.get_json(
+        "/food/ingredients/substitutes",
+        {"ingredientName": ingredient_name},
+        error_detail="Failed to fetch substitutes from API",
     )
 
-    if response.status_code != 200:
-        raise HTTPException(status_code=500, detail="Failed to fetch substitutes from API")
-
-    data = response.json()
-
     if not data.get("substitutes"):
         raise HTTPException(status_code=404, detail="No substitutes found for this ingredient")
 
@@ -128,6 +134,41 @@ def get_ingredient_substitutes(ingredient_name: str):
 
 #     ------------------      Endpoint convert amounts | convert amounts (grams, ounces, cups, etc.)     ------------------      
 
-#    Endpoint Compute glycemic index & load | compute glycemic index (low, medium, high) and total glycemic load for a list of ingredients (total & per serving)
+MAX_CONVERSIONS = 500
+
+
+# Local unit registry + densities (app/services/units.py): a batch is pure CPU, no upstream call
+@router.post("/convert", response_model=list[ConversionResult])
+def convert_amounts(request: ConversionRequest):
+    if len(request.conversions) > MAX_CONVERSIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_CONVERSIONS} conversions per request")
+
+    results = []
+    for item in request.conversions:
+        try:
+            result, error = round(units.convert(item.amount, item.from_unit, item.to_unit, item.ingredient), 4), None
+        except units.ConversionError as exc:
+            result, error = None, str(exc)
+        results.append({**item.model_dump(), "result": result, "error": error})
+    return results
+
+#     ------------------      Endpoint compute glycemic index & load | low / medium / high GI and total + per serving load     ------------------      
+
+MAX_GLYCEMIC_INGREDIENTS = 200
+
+
+# Local GI reference table (app/services/glycemic.py); cached recipes read their precomputed row
+@router.post("/glycemic", response_model=GlycemicSummary)
+def compute_glycemic(request: GlycemicRequest, db: Session = Depends(get_db)):
+    if request.recipe_id is not None:
+        summary = glycemic.recipe_summary(db, request.recipe_id)
+        if summary is None:
+            raise HTTPException(status_code=404, detail="Recipe not found")
+        return summary
 
- 
\ No newline at end of file
+    if not request.ingredients:
+        raise HTTPException(status_code=400, detail="Provide ingredients or a recipe_id")
+    if len(request.ingredients) > MAX_GLYCEMIC_INGREDIENTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_GLYCEMIC_INGREDIENTS} ingredients per request")
+    lines = [(item.name, units.grams(item.amount, item.unit, item.name)) for item in request.ingredients]
+    return glycemic.compute(lines, request.servings)
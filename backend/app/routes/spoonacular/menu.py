@@ -1,4 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.orm import Session
+from app.db.database import get_db
+from app.routes.auth import get_current_user
+from app.schemas.menu import MealPlanRequest, MealPlan, ShoppingList, ShoppingListUpdate, ShoppingListUpdateResult
+from app.schemas.users import CurrentUser
+from app.services import shopping
 from dotenv import load_dotenv
 import os
 
@@ -18,11 +24,53 @@ API_KEY = os.getenv("SPOONACULAR_API_KEY")
 BASE_URL = "https://api.spoonacular.com"
 
 
-# Endpoint to get meal plan templates | User select any recipes and add to list for weekly meal plan
-@router.get("/menu")
-def get_meal_plan():
-    return {"message": "Meal plan endpoint"}
+# Endpoint to generate a weekly meal plan | days x meals grid picked from the cached recipes
+@router.post("/plan", response_model=MealPlan)
+def generate_meal_plan(request: MealPlanRequest, db: Session = Depends(get_db)):
+    # numpy-backed planner: imported on first use to keep worker boot fast
+    from app.services import meal_plan
 
-# Endpoint to generate shopping list | User select any recipes and add to list for shopping list
+    return meal_plan.generate(
+        db,
+        days=request.days,
+        meals=request.meals,
+        diet=request.diet,
+        max_prep_time=request.max_prep_time,
+        exclude=request.exclude_ingredients,
+        targets=request.targets.model_dump(),
+        seed=request.seed,
+    )
 
-# Endpoint to delete a item of shopping list | User select any recipes (& ingredient) and delete to list for shopping list
+# Endpoint to get the shopping list | aggregated items of every recipe the user added
+@router.get("/shopping-list", response_model=ShoppingList)
+def get_shopping_list(current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    return shopping.get_list(db, current_user.id)
+
+
+# Endpoint to add/remove recipes to the shopping list | one transaction, only the affected items change
+@router.post("/shopping-list/recipes", response_model=ShoppingListUpdateResult)
+def update_shopping_list(
+    request: ShoppingListUpdate,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    return shopping.update_list(db, current_user.id, request.add, request.remove)
+
+
+# Endpoint to delete a item of shopping list | by item id
+@router.delete("/shopping-list/items/{item_id}", status_code=204)
+def delete_shopping_list_item(
+    item_id: int,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    if not shopping.delete_item(db, current_user.id, item_id):
+        raise HTTPException(status_code=404, detail="Item not found")
+    return Response(status_code=204)
+
+
+# Endpoint to empty the shopping list
+@router.delete("/shopping-list", status_code=204)
+def clear_shopping_list(current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    shopping.clear(db, current_user.id)
+    return Response(status_code=204)
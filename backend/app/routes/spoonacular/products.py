@@ -1,4 +1,13 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import case
+from sqlalchemy.orm import Session
+from app.db.database import get_db
+from app.db import bulk, search
+from app.models.db_recipes import Product, ProductSearch
+from app.schemas.product import ProductPage
+from app.services import spoonacular
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import os
 
@@ -17,7 +26,105 @@ router = APIRouter(
 API_KEY = os.getenv("SPOONACULAR_API_KEY")
 BASE_URL = "https://api.spoonacular.com"
 
-# Endpoint to get information 'bout products for SpoonacularAPI | User search by product (MAYBE)
-@router.get("/products")
-def get_products_by_title():
-   return {"message": "Product search endpoint"}
\ No newline at end of file
+# Pages of a query inside its cached upstream results are answered locally, until that fetch is this old
+PRODUCT_SEARCH_TTL = timedelta(days=int(os.getenv("PRODUCT_SEARCH_TTL_DAYS", "7")))
+
+
+def _local_matches(db: Session, query: str):
+    return search.search_products(db.query(Product.spoonacular_id, Product.title, Product.image), query)
+
+
+def _page_rows(matches, offset: int, number: int) -> list[dict]:
+    # One row more than the page tells whether there is a next page, without a COUNT
+    rows = matches.offset(offset).limit(number + 1).all()
+    return [{"id": row.spoonacular_id, "title": row.title, "image": row.image} for row in rows]
+
+
+def _search_local_products(db: Session, query: str, offset: int, number: int) -> tuple[list[dict], bool] | None:
+    """
+    (local page, has more), or None when the query must go upstream. A page is local once the query
+    was sent upstream recently (fresh ProductSearch row) and the requested window lies within the
+    leading results already fetched for it (or every result was), so its products are all cached.
+    """
+    searched = (
+        db.query(ProductSearch.total, ProductSearch.fetched, ProductSearch.fetched_at)
+        .filter(ProductSearch.query == query)
+        .first()
+    )
+    if searched is None or datetime.utcnow() - searched.fetched_at >= PRODUCT_SEARCH_TTL:
+        return None
+    if offset + number > searched.fetched and searched.fetched < searched.total:
+        return None
+    rows = _page_rows(_local_matches(db, query), offset, number)
+    return rows, len(rows) > number or offset + number < searched.total
+
+
+def _fallback_products(db: Session, query: str, offset: int, number: int) -> list[dict]:
+    return _page_rows(_local_matches(db, query), offset, number)
+
+
+def _save_products(db: Session, query: str, offset: int, results: list[dict], total: int):
+    products = bulk.upsert_products(db, [spoonacular.product_row(item) for item in results])
+    # `fetched` only grows over contiguous pages from the start; an expired search starts over
+    now, end = datetime.utcnow(), offset + len(results)
+    first = end if offset == 0 else 0
+    fetched = case(
+        (ProductSearch.fetched_at <= now - PRODUCT_SEARCH_TTL, first),
+        (ProductSearch.fetched >= offset, case((ProductSearch.fetched < end, end), else_=ProductSearch.fetched)),
+        else_=ProductSearch.fetched,
+    )
+    bulk.execute_upsert(
+        db,
+        bulk.upsert_insert(db, ProductSearch)
+        .values(query=query, total=total, fetched=first, fetched_at=now)
+        .on_conflict_do_update(index_elements=["query"], set_={"total": total, "fetched": fetched, "fetched_at": now})
+    )
+    db.commit()
+    return [{"id": product.spoonacular_id, "title": product.title, "image": product.image} for product in products]
+
+
+def _page(query: str, offset: int, number: int, products: list[dict], has_more: bool) -> dict:
+    return {
+        "query": query,
+        "offset": offset,
+        "number": number,
+        "next_offset": offset + number if has_more else None,
+        "products": products[:number],
+    }
+
+
+# Endpoint to search grocery products | local catalog (prefix / fuzzy title search) for pages already fetched, Spoonacular beyond them
+@router.get("/search", response_model=ProductPage)
+async def search_products(
+    response: Response,
+    query: str = Query(..., min_length=1, description="Product title, e.g. 'greek yogurt'"),
+    offset: int = Query(0, ge=0, le=900, description="Number of results to skip"),
+    number: int = Query(10, ge=1, le=100, description="Number of results to return"),
+    db: Session = Depends(get_db),
+):
+    query = " ".join(query.lower().split())
+    local = await run_in_threadpool(_search_local_products, db, query, offset, number)
+    if local is not None:
+        response.headers["X-Data-Source"] = "local"
+        return _page(query, offset, number, *local)
+
+    try:
+        data = await spoonacular.get_json(
+            "/food/products/search",
+            {"query": query, "offset": offset, "number": number},
+            error_detail="Failed to fetch products from API",
+        )
+    except HTTPException:
+        local = await run_in_threadpool(_fallback_products, db, query, offset, number)
+        if not local:
+            raise
+        # Upstream failure: the partial local page is still better than an error
+        response.headers["X-Data-Source"] = "local"
+        return _page(query, offset, number, local, False)
+
+    results = data.get("products", [])
+    total = data.get("totalProducts", len(results))
+    products = await run_in_threadpool(_save_products, db, query, offset, results, total)
+
+    response.headers["X-Data-Source"] = "spoonacular"
+    return _page(query, offset, number, products, offset + len(results) < total)
@@ -1,14 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from app.models.db_recipes import Recipe, SimilarRecipe, RecipeIngredient
-from app.schemas.recipe import RecipeSchema, SimilarRecipesSchema, RecipesWithSimilarSchema
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, selectinload
+from app.models.db_recipes import Recipe, SimilarRecipe
+from app.schemas.recipe import RecipeSchema, SimilarRecipesSchema, RecipesWithSimilarSchema, RecipeRecommendation
+from app.schemas.recipe import AutocompleteResult
 from app.db.database import get_db
-from dotenv import load_dotenv
-import os, requests
+from app.db import bulk, search, projections
+from app.services import spoonacular, enrichment, autocomplete, payloads
+from app.services.cache import MISSING, make_key
 from typing import Optional, List
-
-# Import environment variables
-load_dotenv()
+import asyncio
 
 router = APIRouter(
     prefix="/recipes",
@@ -19,29 +20,30 @@ router = APIRouter(
     },
 )
 
-API_KEY = os.getenv("SPOONACULAR_API_KEY")
-BASE_URL = "https://api.spoonacular.com"
+# DB work runs in the threadpool (run_in_threadpool) so the event loop only waits on Spoonacular.
+# Responses are validated inside those helpers so lazy relationships never load on the loop.
+# Recipe lists are returned as pre-encoded bytes (app/services/payloads.py); response_model documents them.
+
+SEARCH_TTL = 60     # fully local search answers are reused for this long (matches their Cache-Control)
 
 #     ------------------      Endpoint to get recipes for SpoonacularAPI | User search by name or ingredient         ------------------
 
-@router.get("/search/{title}", response_model=list[RecipeSchema])
-def get_recipes_by_title(
+def _search_local_recipes(
+    db: Session,
     title: str,
-    number: int = 5,
-    meal_type: Optional[str] = Query(None),
-    diet: Optional[str] = Query(None),
-    prep_time: Optional[str] = Query(None),
-    exclude_ingredients: Optional[List[str]] = Query(None),
-    db: Session = Depends(get_db)
+    number: int,
+    meal_type: Optional[str],
+    diet: Optional[str],
+    prep_time: Optional[str],
+    exclude_ingredients: Optional[List[str]],
 ):
-    
-    query = db.query(Recipe).filter(Recipe.title.ilike(f"%{title}%"))
+    query = db.query(Recipe)
 
     if meal_type:
-        query = query.filter(Recipe.meal_type == meal_type)
+        query = query.filter(search.has_tag(Recipe.meal_type, meal_type))
 
     if diet:
-        query = query.filter(Recipe.diet == diet)
+        query = query.filter(search.has_tag(Recipe.diet, diet))
 
     if prep_time:
         if prep_time == "10-60":
@@ -52,78 +54,164 @@ def get_recipes_by_title(
             query = query.filter(Recipe.prep_time > 90)
 
     if exclude_ingredients:
-        for ing in exclude_ingredients:
-            query = query.filter(~Recipe.ingredients.any(RecipeIngredient.ingredients.ilike(f"%{ing}%")))
-
-    # Ejecutar la consulta local
-    local_recipes = query.limit(number).all()
-
-    # 1. Search the recipe in the database
-    local_recipes = db.query(Recipe).filter(Recipe.title.ilike(f"%{title}%")).limit(number).all()
-
-    # 2. If not found in the database, search in the Spoonacular API
-    response = requests.get(
-        f"{BASE_URL}/recipes/complexSearch",
-        params={
-            "query": title, 
-            "number": number, 
-            "apiKey": API_KEY},
+        query = search.exclude_ingredients(query, exclude_ingredients)
+
+    # Ranked text search on the title (indexed, best matches first)
+    query = search.search_titles(query, title)
+
+    # Ejecutar la consulta local: ranked ids only, the payload comes from payloads.recipe_list
+    return [recipe_id for (recipe_id,) in query.with_entities(Recipe.id).limit(number)]
+
+
+def _save_search_results(db: Session, local_ids: list[int], results: list[dict], number: int) -> bytes:
+    saved_recipes = bulk.upsert_recipes(db, [spoonacular.recipe_row(recipe) for recipe in results]) if results else []
+    recipe_ids = list(dict.fromkeys(local_ids + [recipe.id for recipe in saved_recipes]))[:number]
+    # Encode before enqueueing: its commit expires saved_recipes, and reading them again costs a query each
+    body = payloads.recipe_list(db, recipe_ids, loaded=saved_recipes)
+    # Search results only carry id/title/image: the job worker fills in the rest later
+    enrichment.enqueue_recipes(db, [recipe.spoonacular_id for recipe in saved_recipes if not recipe.ingredients])
+    return body
+
+
+# Spoonacular complexSearch params equivalent to the local filters
+def _upstream_filters(meal_type, diet, prep_time, exclude_ingredients) -> dict:
+    params = {}
+    if meal_type:
+        params["type"] = meal_type
+    if diet:
+        params["diet"] = diet
+    if prep_time == "10-60":
+        params["maxReadyTime"] = 60
+    elif prep_time == "60-90":
+        params["maxReadyTime"] = 90
+    if exclude_ingredients:
+        params["excludeIngredients"] = ",".join(exclude_ingredients)
+    return params
+
+
+@router.get("/search/{title}", response_model=list[RecipeSchema])
+async def get_recipes_by_title(
+    title: str,
+    number: int = 5,
+    meal_type: Optional[str] = Query(None),
+    diet: Optional[str] = Query(None),
+    prep_time: Optional[str] = Query(None),
+    exclude_ingredients: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db)
+):
+    # 0. Popular searches: the encoded answer of an identical, fully local search
+    key = make_key("/recipes/search", {
+        "title": title, "number": number, "meal_type": meal_type, "diet": diet, "prep_time": prep_time,
+        "exclude_ingredients": ",".join(exclude_ingredients) if exclude_ingredients else None,
+    })
+    body = payloads.responses.get(key)
+    if body is not MISSING:
+        return payloads.json_response(body, {"X-Data-Source": "local"})
+
+    # 1. Search the recipe in the database (local-first)
+    local_ids = await run_in_threadpool(
+        _search_local_recipes, db, title, number, meal_type, diet, prep_time, exclude_ingredients
     )
-    
 
-    if response.status_code != 200:
-        raise HTTPException(status_code=500,detail="Error fetching data from API")
-    data = response.json()
+    if len(local_ids) >= number:
+        body = await run_in_threadpool(payloads.recipe_list, db, local_ids)
+        payloads.responses.set(key, body, SEARCH_TTL)
+        return payloads.json_response(body, {"X-Data-Source": "local"})
+
+    # 2. Ask the Spoonacular API only for the missing recipes
+    # (offset skips the results we most likely cached from this same search before)
+    try:
+        data = await spoonacular.get_json(
+            "/recipes/complexSearch",
+            {
+                "query": title,
+                "number": number - len(local_ids),
+                "offset": len(local_ids),
+                **_upstream_filters(meal_type, diet, prep_time, exclude_ingredients),
+            },
+        )
+    except HTTPException:
+        if not local_ids:
+            raise
+        # Upstream failure: the partial local answer is still better than an error
+        body = await run_in_threadpool(payloads.recipe_list, db, local_ids)
+        return payloads.json_response(body, {"X-Data-Source": "local"})
+
     results = data.get("results", [])
 
-    if not results:
+    if not results and not local_ids:
         raise HTTPException(status_code=404,detail="Recipe not found")
 
-    # 3. Save the recipes to the database
-    saved_recipes = []
-    for recipe in results:
-        # Check if the recipe already exists in the database
-        existing_recipe = db.query(Recipe).filter_by(spoonacular_id=recipe["id"]).first()
-
-        if existing_recipe:
-            saved_recipes.append(existing_recipe)
-            continue
-
-        new_recipe = Recipe(
-            title=recipe["title"],
-            image=recipe["image"],
-            spoonacular_id=recipe["id"],
-            instructions="",
-            cached=True
-        )
-        # Add the new recipe to the database
-        db.add(new_recipe)
-        saved_recipes.append(new_recipe)
+    # 3. Save the recipes to the database and merge with the local ones
+    body = await run_in_threadpool(_save_search_results, db, local_ids, results, number)
+    return payloads.json_response(body, {"X-Data-Source": "local+spoonacular" if local_ids else "spoonacular"})
 
-        
-    db.commit()
+#       ------------------      Endpoint to get recipes by ingredient for SpoonacularAPI | User search by ingredient       ------------------
 
+def _prep_time_range(prep_time: Optional[str]):
+    if prep_time == "10-60":
+        return 10, 60
+    if prep_time == "60-90":
+        return 60, 90
+    if prep_time == "+90":
+        return 90, 1000
+    return None
 
-    all_recipes = {recipe.spoonacular_id: recipe for recipe in local_recipes + saved_recipes}
 
-    return list(all_recipes.values())   
+def _split_list(value: Optional[str]) -> list[str]:
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
 
-#       ------------------      Endpoint to get recipes by ingredient for SpoonacularAPI | User search by ingredient       ------------------
 
-@router.get("/ingredients/")
-def search_recipes_by_ingredients(
+def _rank_local_recipes(db: Session, ingredients, number, meal_type, diet, prep_time, exclude_ingredients):
+    # numpy-backed index: imported on first use to keep worker boot fast
+    from app.services import recipe_index
+
+    return recipe_index.get_index(db).rank(
+        _split_list(ingredients),
+        number,
+        meal_type=meal_type,
+        diet=diet,
+        prep_range=_prep_time_range(prep_time),
+        exclude=_split_list(exclude_ingredients),
+    )
+
+
+# Search-box suggestions | in-memory prefix index over cached recipe titles and ingredient names
+@router.get("/autocomplete", response_model=AutocompleteResult)
+async def autocomplete_search(
+    query: str = Query(..., min_length=1, description="What the user has typed so far"),
+    number: int = Query(5, ge=1, le=autocomplete.MAX_RESULTS, description="Suggestions per kind"),
+):
+    # Built at startup; only a request arriving before that finishes waits for it
+    if not autocomplete.ready():
+        await run_in_threadpool(autocomplete.ensure_built)
+    return autocomplete.suggest(query, number)
+
+
+@router.get("/ingredients/", response_model=list[RecipeRecommendation])
+async def search_recipes_by_ingredients(
+    response: Response,
     ingredients: str = Query(..., description="Comma-separated list of ingredients"),
-    number: int = Query(5, description="Number of recipes to return"),
+    number: int = Query(5, ge=1, description="Number of recipes to return"),
     meal_type: Optional[str] = Query(None, description="Tipo de comida: desayuno, almuerzo, cena, onces"),
     diet: Optional[str] = Query(None, description="Tipo de dieta: vegano, vegetariano, etc."),
     prep_time: Optional[str] = Query(None, description="Tiempo de preparación: 10-60, 60-90, +90"),
     exclude_ingredients: Optional[str] = Query(None, description="Comma-separated list of ingredients to exclude"),
+    db: Session = Depends(get_db),
 ):
-    # 1️⃣ Armar los parámetros para Spoonacular
+    # 0️⃣ Rank the cached recipes first (in-memory ingredient index)
+    local_recipes = await run_in_threadpool(
+        _rank_local_recipes, db, ingredients, number, meal_type, diet, prep_time, exclude_ingredients
+    )
+
+    if len(local_recipes) >= number:
+        response.headers["X-Data-Source"] = "local"
+        return local_recipes
+
+    # 1️⃣ Armar los parámetros para Spoonacular (local coverage is thin)
     params = {
         "ingredients": ingredients,
         "number": number,
-        "apiKey": API_KEY,
     }
 
     if diet:
@@ -133,195 +221,156 @@ def search_recipes_by_ingredients(
     if exclude_ingredients:
         params["excludeIngredients"] = exclude_ingredients
 
-    url = f"{BASE_URL}/recipes/findByIngredients"
-    response = requests.get(url, params=params)
+    try:
+        data = await spoonacular.get_json("/recipes/findByIngredients", params)
+    except HTTPException:
+        if not local_recipes:
+            raise
+        response.headers["X-Data-Source"] = "local"
+        return local_recipes
 
-    if response.status_code != 200:
-        raise HTTPException(status_code=500, detail="Error fetching data from API")
-    
-    data = response.json()
-
-    if not data:
+    if not data and not local_recipes:
         raise HTTPException(status_code=404, detail="No recipes found")
 
     # 2️⃣ Filtrar por tiempo de preparación manualmente (Spoonacular no lo soporta directo)
-    if prep_time:
-        min_time, max_time = 0, 1000
-        if prep_time == "10-60":
-            min_time, max_time = 10, 60
-        elif prep_time == "60-90":
-            min_time, max_time = 60, 90
-        elif prep_time == "+90":
-            min_time = 90
+    time_range = _prep_time_range(prep_time)
+    if time_range:
+        min_time, max_time = time_range
 
         # Filtrar localmente (si Spoonacular devuelve `readyInMinutes`)
         data = [recipe for recipe in data if min_time <= recipe.get("readyInMinutes", 0) <= max_time]
 
-    return data
+    # Local matches first, then upstream ones we don't already have
+    seen = {recipe["id"] for recipe in local_recipes}
+    merged = local_recipes + [recipe for recipe in data if recipe["id"] not in seen]
 
+    response.headers["X-Data-Source"] = "local+spoonacular" if local_recipes else "spoonacular"
+    return merged[:number]
 
-#       ------------------       Endpoint to get similar recipes for SpoonacularAPI | Recommendation recipes by user search (cache)       ------------------      
 
-@router.get("/{recipe_id}/similar_recipes", response_model=RecipesWithSimilarSchema)
-def get_similar_recipes(
-    title: str = Query(..., description="Title of the recipe"),
-    number: int = Query(5, description="Number of similar recipes to return"),
-    db: Session = Depends(get_db),
-):
-    # 1. Search the recipe in the database
-    recipe = db.query(Recipe).filter(Recipe.title.ilike(f"%{title}%")).first()
-
-    if recipe:
-        similar_recipes = db.query(SimilarRecipe).filter(SimilarRecipe.recipe_id == recipe.id).all()
-
-        if similar_recipes:
-            return RecipesWithSimilarSchema(
-                spoonacular_id=recipe.spoonacular_id,
-                title=recipe.title,
-                image=recipe.image,
-                ingredients=recipe.ingredients,
-                similar_recipes=[
-                    SimilarRecipesSchema(
-                        similar_spoonacular_id=sr.similar_recipe_id,
-                        title=sr.title,
-                        image=sr.image,
-                    ) for sr in similar_recipes]
-            )
-
-    # 2. If not found in the database, search in the Spoonacular API
-    search_url = f"{BASE_URL}/recipes/complexSearch"
-    search_params = {
-        "query": title,
-        "number": number,
-        "apiKey": API_KEY,
-    }
+#       ------------------       Endpoint to get similar recipes for SpoonacularAPI | Recommendation recipes by recipe id (precomputed graph)       ------------------
 
-    search_response = requests.get(search_url, params=search_params)
+def _read_similar(db: Session, recipe_id: int, number: int):
+    # Single indexed read: recipe by spoonacular_id + its best edges
+    rows = (
+        db.query(Recipe, SimilarRecipe)
+        .options(selectinload(Recipe.ingredients))
+        .outerjoin(SimilarRecipe, SimilarRecipe.recipe_id == Recipe.id)
+        .filter(Recipe.spoonacular_id == recipe_id)
+        .order_by(SimilarRecipe.score.desc().nulls_last(), SimilarRecipe.id)
+        .limit(number)
+        .all()
+    )
+    if not rows:
+        return None, []
+    return rows[0][0], [similar for _, similar in rows if similar is not None]
 
-    if search_response.status_code != 200 or not search_response.json().get("results"):
-        raise HTTPException(status_code=500, detail="Error fetching data from API")
 
-    # Getting the recipe ID from the first result
-    first_result = search_response.json()["results"][0]
-    spoonacular_id = first_result["id"]
-    title = first_result["title"]
-    image = first_result["image"]
+def _similar_response(recipe: Recipe, similar_recipes: list[SimilarRecipe]):
+    return RecipesWithSimilarSchema(
+        spoonacular_id=recipe.spoonacular_id,
+        title=recipe.title,
+        image=recipe.image,
+        ingredients=recipe.ingredients,
+        similar_recipes=[
+            SimilarRecipesSchema(
+                similar_spoonacular_id=sr.similar_recipe_id,
+                title=sr.title,
+                image=sr.image,
+            ) for sr in similar_recipes]
+    )
 
-    # Verify if the recipe already exists in the database
-    existing_recipe = db.query(Recipe).filter(Recipe.spoonacular_id == spoonacular_id).first()
-    if existing_recipe:
-        recipe = existing_recipe
-    else:
-        # Save in the database if not exists
-        recipe = Recipe(
-            spoonacular_id=spoonacular_id,
-            title=title,
-            image=image,
-            ingredients=""
-        )
-        db.add(recipe)
-        db.commit()
-        db.refresh(recipe)
 
-    # Get similar recipes in the Spoonacular API
-    similar_url = f"{BASE_URL}/recipes/{spoonacular_id}/similar"
-    similar_params = {
-        "number": number,
-        "apiKey": API_KEY,
-    }
+def _get_cached_similar(db: Session, recipe_id: int, number: int):
+    recipe, similar_recipes = _read_similar(db, recipe_id, number)
+    if recipe is None:
+        return False, None
+    if not similar_recipes:
+        return True, None
+    return True, _similar_response(recipe, similar_recipes)
+
 
-    response = requests.get(similar_url, params=similar_params)
+def _save_similar_recipes(db: Session, recipe_id: int, information: Optional[dict], similar_data: list[dict], number: int):
+    from app.services import similarity
 
-    if response.status_code != 200:
-        raise HTTPException(status_code=500, detail="Error fetching data from API")
+    if information:
+        bulk.upsert_recipes(db, [spoonacular.recipe_row(information)])
 
-    similar_data = response.json()
+    recipe = db.query(Recipe).filter(Recipe.spoonacular_id == recipe_id).first()
+    if recipe is None:
+        # Neither cached nor returned by Spoonacular: nothing to attach edges to
+        raise HTTPException(status_code=404, detail="Recipe not found")
 
-    if not similar_data:
+    # Upstream edges, or local ingredient-overlap neighbours when Spoonacular has nothing
+    edges = similarity.edges_from_spoonacular(recipe.id, similar_data) if similar_data else similarity.local_edges(db, recipe, number)
+    if not edges:
         raise HTTPException(status_code=404, detail="No similar recipes found")
+    similarity.save_edges(db, edges)
 
-    # Save similar recipes in the database
-    similar_recipes_list = []
-    for item in similar_data:
-        similar_recipe = SimilarRecipe(
-            recipe_id=recipe.id,
-            similar_recipe_id=item["id"],
-            title=item["title"],
-            image=item["image"],
+    recipe, similar_recipes = _read_similar(db, recipe_id, number)
+    return _similar_response(recipe, similar_recipes)
+
+
+async def _fetch_information(recipe_id: int) -> Optional[dict]:
+    # None when Spoonacular does not know the id: _save_similar_recipes answers 404 unless it is cached
+    try:
+        return await spoonacular.get_json(f"/recipes/{recipe_id}/information", {"includeNutrition": "true"})
+    except HTTPException as error:
+        if error.status_code == 404:
+            return None
+        raise
+
+
+async def _fetch_similar(recipe_id: int, number: int) -> list[dict]:
+    try:
+        return await spoonacular.get_json(f"/recipes/{recipe_id}/similar", {"number": number})
+    except HTTPException:
+        return []
+
+
+@router.get("/{recipe_id}/similar_recipes", response_model=RecipesWithSimilarSchema)
+async def get_similar_recipes(
+    recipe_id: int,
+    number: int = Query(5, description="Number of similar recipes to return"),
+    db: Session = Depends(get_db),
+):
+    # 1. Precomputed edges in the database
+    known, cached = await run_in_threadpool(_get_cached_similar, db, recipe_id, number)
+    if cached:
+        return cached
+
+    # 2. Not computed yet: Spoonacular similar (+ recipe information when unknown), fetched concurrently
+    information = None
+    if known:
+        similar_data = await _fetch_similar(recipe_id, number)
+    else:
+        information, similar_data = await asyncio.gather(
+            _fetch_information(recipe_id),
+            _fetch_similar(recipe_id, number),
         )
-        db.add(similar_recipe)
 
-        similar_recipes_list.append(SimilarRecipesSchema(
-            similar_spoonacular_id=item["id"],
-            title=item["title"],
-            image=item["image"],
-        ))
+    # 3. Save the edges (local fallback) and return them
+    return await run_in_threadpool(_save_similar_recipes, db, recipe_id, information, similar_data, number)
 
-    db.commit()
+    #       ------------------      Endpoint to get random recipes for SpoonacularAPI | Random recipes       ------------------
 
-    # Return similar recipes
-    return RecipesWithSimilarSchema(
-        spoonacular_id=recipe.spoonacular_id,
-        title=recipe.title,
-        image=recipe.image,
-        ingredients=recipe.ingredients,
-        similar_recipes=similar_recipes_list
+def _save_random_recipes(db: Session, results: list[dict]) -> bytes:
+    # Random results carry full details: fill them in for recipes cached by a search
+    saved_recipes = bulk.upsert_recipes(
+        db,
+        [spoonacular.recipe_row(item) for item in results],
+        update_fields=enrichment.ENRICHED_FIELDS,
     )
+    return payloads.recipe_list(db, [recipe.id for recipe in saved_recipes], loaded=saved_recipes)
 
-    #       ------------------      Endpoint to get random recipes for SpoonacularAPI | Random recipes       ------------------      
 
 @router.get("/random", response_model=list[RecipeSchema])
-def get_random_recipes(
+async def get_random_recipes(
     number: int = Query(5, ge=1, le=20, description="Number of random recipes to return"),
     db: Session = Depends(get_db)
 ):
-    url = f"{BASE_URL}/recipes/random"
-    params = {
-        "number": number,
-        "apiKey": API_KEY,
-    }
-
-    response = requests.get(url, params=params)
+    data = await spoonacular.get_json("/recipes/random", {"number": number, "includeNutrition": "true"})
 
-    if response.status_code != 200:
-        raise HTTPException(status_code=500, detail="Error fetching data from API")
-
-    data = response.json()
     results = data.get("recipes", [])
-    saved_recipes = []
-
-    for item in results:
-        spoonacular_id = item["id"]
-        title = item["title"]
-        image = item["image"]
-        instructions = item.get("instructions", "")
-
-        # Verifica si ya está en la base de datos
-        existing = db.query(Recipe).filter(Recipe.spoonacular_id == spoonacular_id).first()
-        if existing:
-            saved_recipes.append(existing)
-            continue
-
-        ingredients = [
-            RecipeIngredient(
-                ingredients=ing["original"],
-                quantity=str(ing.get("amount", "")),
-                unit=ing.get("unit", "")
-            )
-            for ing in item.get("extendedIngredients", [])
-        ]
-
-        recipe = Recipe(
-            title=title,
-            image=image,
-            spoonacular_id=spoonacular_id,
-            instructions=instructions,
-            ingredients=ingredients,
-            cached=True
-        )
-        db.add(recipe)
-        db.commit()
-        db.refresh(recipe)
-        saved_recipes.append(recipe)
 
-    return saved_recipes
\ No newline at end of file
+    return payloads.json_response(await run_in_threadpool(_save_random_recipes, db, results))
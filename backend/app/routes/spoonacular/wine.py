@@ -1,4 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session
+from app.db.database import get_db
+from app.schemas.wine import WinePairingSchema, WineDishesSchema
+from app.services import wine as wine_service
 from dotenv import load_dotenv
 import os
 
@@ -9,7 +13,8 @@ router = APIRouter(
     prefix="/wine",
     tags=["Wine"],
     responses={
-        404: {"description": "Ingredient not found"},
+        404: {"description": "Unknown dish or wine"},
+        502: {"description": "Upstream lookup failed, retry after the Retry-After delay"},
         500: {"description": "Internal Server Error"},
     },
 )
@@ -17,7 +22,47 @@ router = APIRouter(
 API_KEY = os.getenv("SPOONACULAR_API_KEY")
 BASE_URL = "https://api.spoonacular.com"
 
+# Seconds the client should wait before asking again for a queued lookup
+PENDING_RETRY_AFTER = "5"
+
+
+def _lookup(db: Session, response: Response, kind: str, term: str) -> tuple[str, dict]:
+    term = wine_service.normalize_term(term)
+    if not term:
+        raise HTTPException(status_code=400, detail="Empty search term")
+    result = wine_service.lookup(db, kind, term)
+    if result["status"] == "unknown":
+        raise HTTPException(status_code=404, detail=f"No wine pairing known for '{term}'")
+    if result["status"] == "failed":
+        # Every attempt of the queued fetch failed: an error, not another 202 to poll forever
+        raise HTTPException(
+            status_code=502,
+            detail="Wine pairing lookup failed upstream, retry later",
+            headers={"Retry-After": str(result["retry_after"])},
+        )
+    if result["status"] == "pending":
+        response.status_code = 202
+        response.headers["Retry-After"] = PENDING_RETRY_AFTER
+    return term, result
+
+
+# Endpoint Wine pairing for a dish | wines that go well with a food, ingredient or cuisine
+@router.get("/pairing", response_model=WinePairingSchema)
+def get_wine_pairing(
+    response: Response,
+    food: str = Query(..., description="Dish, ingredient or cuisine, e.g. steak, salmon, italian"),
+    db: Session = Depends(get_db),
+):
+    term, result = _lookup(db, response, wine_service.DISH, food)
+    return {"food": term, "wines": result["values"], "text": result["text"], "status": result["status"]}
+
+
 # Endpoint Dish pairing for wine | User search a recipe that goes well with a wine
-@router.get("/wine")
-def wine():
-    return {"message": "Wine endpoint"}
\ No newline at end of file
+@router.get("/dishes", response_model=WineDishesSchema)
+def get_wine_dishes(
+    response: Response,
+    wine: str = Query(..., description="Wine name or type, e.g. malbec, merlot, riesling"),
+    db: Session = Depends(get_db),
+):
+    term, result = _lookup(db, response, wine_service.WINE, wine)
+    return {"wine": term, "dishes": result["values"], "text": result["text"], "status": result["status"]}
@@ -1,34 +1,88 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from app.models.db_users import User as UserModel
-from app.schemas.users import User, UserLogin, UserCreate
-from app.db.database import get_db
+from app.schemas.users import User, UserLogin, UserCreate, CurrentUser, UserPublic
+from app.db.database import get_db, get_async_db, SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models import db_users
-from passlib.context import CryptContext
-from app.routes.auth import create_access_token, verify_password, hash_password
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.services import shopping
+from app.routes.auth import create_access_token, hash_password_async, verify_password_async, get_current_user, invalidate_user
 
 router = APIRouter(
     prefix="/user",
     tags=["Users"]   
 )
 
-# Get all users
-@router.get("/")
-def get_users(db: Session = Depends(get_db)):
-    data = db.query(db_users.User).all()
-    return data
+# Columns exposed by the listing (never the password hash)
+USER_PUBLIC_COLUMNS = (
+    UserModel.id, UserModel.username, UserModel.full_name, UserModel.phone,
+    UserModel.email, UserModel.created_at, UserModel.status,
+)
+STREAM_CHUNK_SIZE = 1000
+
+
+def _stream_users(after_id: int):
+    # Own session: the stream outlives the request dependency. yield_per = server-side cursor.
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            select(*USER_PUBLIC_COLUMNS)
+            .where(UserModel.id > after_id)
+            .order_by(UserModel.id)
+            .execution_options(yield_per=STREAM_CHUNK_SIZE)
+        )
+        for rows in result.partitions():
+            yield "".join(UserPublic.model_validate(row).model_dump_json() + "\n" for row in rows)
+    finally:
+        db.close()
+
+
+# Get all users | keyset pagination on id (?after_id=<X-Next-Cursor>), or ?stream=true for NDJSON
+@router.get("/", response_model=list[UserPublic])
+def get_users(
+    response: Response,
+    after_id: int = Query(0, ge=0, description="Return users with id greater than this cursor"),
+    limit: int = Query(50, ge=1, le=500, description="Page size"),
+    stream: bool = Query(False, description="Stream every user as NDJSON instead of one page"),
+    db: Session = Depends(get_db),
+):
+    if stream:
+        return StreamingResponse(_stream_users(after_id), media_type="application/x-ndjson")
+
+    data = (
+        db.query(*USER_PUBLIC_COLUMNS)
+        .filter(UserModel.id > after_id)
+        .order_by(UserModel.id)
+        .limit(limit)
+        .all()
+    )
+    if len(data) == limit:
+        response.headers["X-Next-Cursor"] = str(data[-1].id)
+    return [UserPublic.model_validate(row) for row in data]
 
 # Create a new user
-@router.post("/register")
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
+def _check_available(db: Session, user: UserCreate):
     existing_email = db.query(db_users.User).filter(db_users.User.email == user.email).first()
     existing_username = db.query(db_users.User).filter(db_users.User.username == user.username).first()
     if existing_email:
         raise HTTPException(status_code=400, detail="Email already registered")
     if existing_username:
         raise HTTPException(status_code=400, detail="Username already taken")
+
+
+def _save_user(db: Session, new_user: UserModel):
+    db.add(new_user)
+    db.commit()
+    db.refresh(new_user)
+
+
+# Password hashing runs on the bounded hashing pool (app/routes/auth.py), DB work in the threadpool
+@router.post("/register")
+async def create_user(user: UserCreate, db: Session = Depends(get_db)):
+    await run_in_threadpool(_check_available, db, user)
     
     # Crear nuevo usuario
     new_user = UserModel(
@@ -36,23 +90,38 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
         full_name=user.full_name,
         phone=user.phone,
         email=user.email,
-        password=hash_password(user.password)
+        password=await hash_password_async(user.password)
     )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await run_in_threadpool(_save_user, db, new_user)
     return {"message": "User created successfully"}
 
 # Login user
+def _get_user_by_email(db: Session, email: str):
+    return db.query(UserModel).filter(UserModel.email == email).first()
+
+
+def _update_password_hash(db: Session, user: UserModel, new_hash: str):
+    user.password = new_hash
+    db.commit()
+
+
 @router.post("/login")
-def login_user(user_login: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(UserModel).filter(UserModel.email == user_login.email).first()
+async def login_user(user_login: UserLogin, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(_get_user_by_email, db, user_login.email)
+
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await verify_password_async(user_login.password, user.password)
 
-    if not user or not verify_password(user_login.password, user.password):
+    if not valid:
         raise HTTPException(
             status_code=404,
             detail="User not found"
         )
+
+    # Stored hash uses an old bcrypt cost factor: upgrade it transparently
+    if new_hash:
+        await run_in_threadpool(_update_password_hash, db, user, new_hash)
     
     token = create_access_token(data={"sub": user.email, "name": user.username})
 
@@ -66,33 +135,57 @@ def login_user(user_login: UserLogin, db: Session = Depends(get_db)):
     }
 
 
-# Get User by ID
+# Get the authenticated user (Authorization: Bearer <token>)
+@router.get("/me", response_model=CurrentUser)
+async def get_me(current_user: CurrentUser = Depends(get_current_user)):
+    return current_user
+
+
+# Get User by ID | plain read on the async engine, no threadpool slot
 @router.post("/{user_id}")
-def get_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(db_users.User).filter(db_users.User.id == user_id).first()
+async def get_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(UserModel).where(UserModel.id == user_id))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 # Delete user by ID
-@router.delete("/{user_id}")
-def delete_user(user_id: int, db: Session = Depends(get_db)):
+def _delete_user(db: Session, user_id: int):
     user = db.query(UserModel).filter(UserModel.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    email = user.email
+    # Same transaction; the ON DELETE CASCADE foreign keys cover other writers, but SQLite does not enforce them
+    shopping.clear(db, user_id, commit=False)
     db.delete(user)
     db.commit()
+    return email
+
+
+@router.delete("/{user_id}")
+async def delete_user(user_id: int, db: Session = Depends(get_db)):
+    email = await run_in_threadpool(_delete_user, db, user_id)
+    # Drop the cached user so its tokens stop authenticating right away
+    invalidate_user(email)
     return {"message": "User delete successfully"}
 
 # Update user by ID
-@router.put("/{user_id}")
-def update_user(user_id: int, user: User, db: Session = Depends(get_db)):
+def _update_user(db: Session, user_id: int, user: User, password_hash: str):
     existing_user = db.query(UserModel).filter(UserModel.id == user_id).first()
     if not existing_user:
         raise HTTPException(status_code=404, detail="User not found")
+    previous_email = existing_user.email
     existing_user.name = user.name
     existing_user.email = user.email
-    existing_user.password = user.password
+    existing_user.password = password_hash
     db.commit()
     db.refresh(existing_user)
+    return previous_email
+
+
+@router.put("/{user_id}")
+async def update_user(user_id: int, user: User, db: Session = Depends(get_db)):
+    password_hash = await hash_password_async(user.password)
+    previous_email = await run_in_threadpool(_update_user, db, user_id, user, password_hash)
+    invalidate_user(previous_email, user.email)
     return {"message": "User updated successfully"}
\ No newline at end of file
@@ -0,0 +1,70 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+# Schema of daily nutrition targets (per day, all optional)
+class NutritionTargets(BaseModel):
+    calories: float | None = Field(None, gt=0)
+    protein: float | None = Field(None, gt=0)
+    carbs: float | None = Field(None, gt=0)
+    fat: float | None = Field(None, gt=0)
+
+# Schema of a meal-plan request
+class MealPlanRequest(BaseModel):
+    days: int = Field(7, ge=1, le=7)
+    meals: List[str] = Field(["breakfast", "lunch", "dinner"], min_length=1, max_length=6)
+    diet: str | None = None
+    max_prep_time: int | None = Field(None, gt=0)     # minutes
+    exclude_ingredients: List[str] = []
+    targets: NutritionTargets = NutritionTargets()
+    seed: int | None = None                            # same seed + same corpus -> same plan
+
+class PlannedMeal(BaseModel):
+    slot: str
+    id: int | None = None           # spoonacular recipe id (None: no recipe matched the filters)
+    title: str | None = None
+    image: str | None = None
+    prep_time: int | None = None
+    calories: float | None = None
+    protein: float | None = None
+    carbs: float | None = None
+    fat: float | None = None
+
+class NutritionTotals(BaseModel):
+    calories: float = 0
+    protein: float = 0
+    carbs: float = 0
+    fat: float = 0
+
+class MealPlanDay(BaseModel):
+    day: int
+    meals: List[PlannedMeal]
+    totals: NutritionTotals
+
+class MealPlan(BaseModel):
+    days: List[MealPlanDay]
+    unfilled: int
+    distinct_recipes: int
+    cost: float                     # distance to the targets + repeat penalty (lower is better)
+    elapsed_ms: float
+
+
+# Schema of a batched shopping-list change (spoonacular recipe ids)
+class ShoppingListUpdate(BaseModel):
+    add: List[int] = Field([], max_length=500)
+    remove: List[int] = Field([], max_length=500)
+
+class ShoppingListUpdateResult(BaseModel):
+    added: int
+    removed: int
+    items_changed: int
+    unknown: List[int] = []         # ids not cached locally (nothing to merge)
+
+class ShoppingListItem(BaseModel):
+    id: int
+    name: str
+    unit: str | None = None
+    amount: float | None = None     # None: the recipes give no parseable amount
+
+class ShoppingList(BaseModel):
+    recipes: List[int]
+    items: List[ShoppingListItem]
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import List
+
+class ProductSchema(BaseModel):
+    id: int                         # spoonacular product id
+    title: str
+    image: str | None = None
+
+class ProductPage(BaseModel):
+    query: str
+    offset: int
+    number: int
+    next_offset: int | None = None  # None: no more results
+    products: List[ProductSchema]
@@ -14,7 +14,7 @@ class IngredientSchema(BaseModel):
 class RecipeSchema(BaseModel):
     id: int
     title: str
-    image: str
+    image: Optional[str] = None   # Spoonacular omits it for some recipes and ingredients
     spoonacular_id: int
     instructions: Optional[str]
     ingredients: list[IngredientSchema] = []
@@ -37,7 +37,7 @@ class SimilarRecipesSchema(BaseModel):
 class RecipesWithSimilarSchema(BaseModel):
     spoonacular_id: int
     title: str
-    image: str
+    image: Optional[str] = None
     ingredients: List[IngredientSchema] = []
     similar_recipes: List[SimilarRecipesSchema] = []
 
@@ -49,7 +49,7 @@ class Ingredient(BaseModel):
     id: int
     spoonacular_id: int
     name: str
-    image: str
+    image: Optional[str] = None
 
     model_config = {
         "from_attributes": True
@@ -64,6 +64,70 @@ class IngredientInfo(BaseModel):
     fat: float | None = None
     protein: float | None = None
 
+class NutritionFacts(BaseModel):
+    calories: float | None = None
+    carbs: float | None = None
+    fat: float | None = None
+    protein: float | None = None
+    fiber: float | None = None
+    sugar: float | None = None
+    sodium: float | None = None
+
+class IngredientNutritionFacts(NutritionFacts):
+    id: int | None = None           # spoonacular ingredient id
+    name: str
+    grams: float | None = None      # amount the values refer to (None: amount could not be converted)
+
+class NutritionRequest(BaseModel):
+    ingredient_ids: List[int] = []  # spoonacular ingredient ids, 100 g each
+    recipe_id: int | None = None    # spoonacular recipe id, amounts from the recipe
+
+class Conversion(BaseModel):
+    amount: float | str             # 2, 1.5, "1 1/2", "½"
+    from_unit: str | None = None
+    to_unit: str
+    ingredient: str | None = None   # needed for mass <-> volume (density) and piece weights
+
+class ConversionRequest(BaseModel):
+    conversions: List[Conversion]
+
+class ConversionResult(Conversion):
+    result: float | None = None
+    error: str | None = None
+
+class NutritionSummary(BaseModel):
+    ingredients: List[IngredientNutritionFacts]
+    totals: NutritionFacts
+    missing: List[str] = []         # ingredients without nutrition data or a convertible amount
+
+class GlycemicItem(BaseModel):
+    name: str
+    amount: float | str = 100
+    unit: str | None = "g"
+
+class GlycemicRequest(BaseModel):
+    ingredients: List[GlycemicItem] = []
+    servings: int | None = None
+    recipe_id: int | None = None    # spoonacular recipe id, uses the precomputed figures
+
+class IngredientGlycemic(BaseModel):
+    name: str
+    grams: float | None = None
+    glycemic_index: float | None = None
+    classification: str | None = None   # low | medium | high
+    carbs: float | None = None
+    glycemic_load: float | None = None
+
+class GlycemicSummary(BaseModel):
+    ingredients: List[IngredientGlycemic] = []
+    glycemic_index: float | None = None
+    glycemic_load: float
+    glycemic_load_per_serving: float | None = None
+    classification: str | None = None   # of the load per serving (total when servings is unknown)
+    servings: int | None = None
+    matched: int
+    unmatched: int
+
 class IngredientSubstitute(BaseModel):
     ingredient: str
     substitutes: List[str]
@@ -72,6 +136,20 @@ class IngredientSubstitute(BaseModel):
 class RecipeRecommendation(BaseModel):
     id: int
     title: str
-    image: str
+    image: Optional[str] = None
     usedIngredientCount: int
-    missedIngredientCount: int
\ No newline at end of file
+    missedIngredientCount: int
+
+class RecipeSuggestion(BaseModel):
+    id: int                         # spoonacular recipe id
+    title: str
+    image: str | None = None
+
+class IngredientSuggestion(BaseModel):
+    id: int                         # spoonacular ingredient id
+    name: str
+    image: str | None = None
+
+class AutocompleteResult(BaseModel):
+    recipes: List[RecipeSuggestion] = []
+    ingredients: List[IngredientSuggestion] = []
@@ -27,4 +27,33 @@ class UserCreate(BaseModel):
 # Schema of User Login
 class UserLogin(BaseModel):
     email: EmailStr
-    password: str   
\ No newline at end of file
+    password: str   
+
+
+# Schema of User listings (password excluded)
+class UserPublic(BaseModel):
+    id: int
+    username: str
+    full_name: str
+    phone: int
+    email: str
+    created_at: datetime | None = None
+    status: bool | None = None
+
+    model_config = {
+        "from_attributes": True
+    }
+
+
+# Authenticated user (see app/routes/auth.get_current_user), password excluded
+class CurrentUser(BaseModel):
+    id: int
+    username: str
+    full_name: str
+    email: EmailStr
+    status: bool
+
+    model_config = {
+        "from_attributes": True,
+        "frozen": True
+    }
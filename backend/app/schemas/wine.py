@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import List
+
+# status: "ready" (answered from the local pairing table) | "pending" (fetch queued, retry later)
+class WinePairingSchema(BaseModel):
+    food: str
+    wines: List[str] = []
+    text: str | None = None
+    status: str
+
+class WineDishesSchema(BaseModel):
+    wine: str
+    dishes: List[str] = []
+    text: str | None = None
+    status: str
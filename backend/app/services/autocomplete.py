@@ -0,0 +1,227 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.db import bulk
+from app.db.database import SessionLocal
+from app.models.db_recipes import Recipe, RecipeIngredient, Ingredient
+from app.services.normalize import normalize_ingredient
+from bisect import bisect_left, insort
+import heapq, logging, re, threading, time, unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Search-box autocomplete over cached recipe titles and ingredient names, answered from memory.
+# Each index is a sorted array of (key, item) pairs searched with bisect; every word start of a
+# label is a key, so "tikka" finds "Chicken Tikka Masala". Ranked by popularity: Spoonacular
+# likes for recipes, number of recipe lines using it for ingredients.
+
+MAX_RESULTS = 20
+KEY_LENGTH = 24             # keys are truncated; longer queries are checked against the label
+CACHED_PREFIX_LENGTH = 3    # top results of short prefixes (the large ranges) are kept precomputed
+MAX_INDEX_AGE = 600         # rebuilt in the background after this long, for popularity changes and other workers
+
+
+def fold(text: str | None) -> str:
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode().lower()
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+class PrefixIndex:
+    def __init__(self, rows: list):
+        self.items = []         # (id, label, image, popularity)
+        self.folded = []        # fold(label), for queries longer than KEY_LENGTH
+        self.positions: dict[int, int] = {}     # id -> position in items
+        self.top: dict[str, list[int]] = {}
+        entries = []
+        for row in rows:
+            item = self._add_item(row)
+            if item is not None:
+                entries.extend(self._keys(item))
+        entries.sort()
+        self.entries = entries
+        self._lock = threading.Lock()
+
+    def _add_item(self, row) -> int | None:
+        item_id, label, image, popularity = row
+        if item_id in self.positions or not fold(label):
+            return None
+        self.positions[item_id] = len(self.items)
+        self.items.append((item_id, label, image, popularity or 0))
+        self.folded.append(fold(label))
+        return len(self.items) - 1
+
+    def _keys(self, item: int) -> list[tuple[str, int]]:
+        words = self.folded[item].split()
+        return [(key, item) for key in dict.fromkeys(" ".join(words[i:])[:KEY_LENGTH] for i in range(len(words)))]
+
+    def _rank(self, item: int):
+        _, label, _, popularity = self.items[item]
+        return popularity, -len(label), -item
+
+    def _search(self, prefix: str, number: int) -> list[int]:
+        key = prefix[:KEY_LENGTH]
+        low = bisect_left(self.entries, (key,))
+        # Keys only hold [a-z0-9 ], so "~" sorts after every continuation of the prefix
+        high = bisect_left(self.entries, (key + "~",), low)
+        matches = {item for _, item in self.entries[low:high]}
+        if len(prefix) > KEY_LENGTH:
+            matches = {item for item in matches if f" {prefix}" in f" {self.folded[item]}"}
+        return heapq.nlargest(number, matches, key=self._rank)
+
+    def search(self, query: str, number: int) -> list[tuple]:
+        prefix = fold(query)
+        if not prefix:
+            return []
+        if len(prefix) > CACHED_PREFIX_LENGTH:
+            found = self._search(prefix, number)
+        else:
+            found = self.top.get(prefix)
+            if found is None:
+                found = self.top[prefix] = self._search(prefix, MAX_RESULTS)
+        return [self.items[item] for item in found[:number]]
+
+    def _update_item(self, item: int, row):
+        # Known id: re-key it when the label changed, re-rank it when the popularity did
+        item_id, label, image, popularity = row
+        if self.items[item] == (item_id, label, image, popularity or 0):
+            return
+        old_keys = self._keys(item)
+        self.items[item] = (item_id, label, image, popularity or 0)
+        self.folded[item] = fold(label)
+        new_keys = self._keys(item)
+        for key in old_keys:
+            position = bisect_left(self.entries, key)
+            if position < len(self.entries) and self.entries[position] == key:
+                del self.entries[position]
+        for key in new_keys:
+            insort(self.entries, key)
+        # Rankings the item was or now is part of are recomputed on the next search
+        for key, _ in old_keys + new_keys:
+            for length in range(1, min(len(key), CACHED_PREFIX_LENGTH) + 1):
+                self.top.pop(key[:length], None)
+
+    def add(self, rows: list):
+        """
+        Insert new items in place; cached short-prefix rankings are updated, not dropped.
+        Items already indexed are updated in place (new title, likes or image).
+        """
+        with self._lock:
+            for row in rows:
+                if row[0] in self.positions:
+                    self._update_item(self.positions[row[0]], row)
+                    continue
+                item = self._add_item(row)
+                if item is None:
+                    continue
+                for key in self._keys(item):
+                    insort(self.entries, key)
+                    for length in range(1, min(len(key[0]), CACHED_PREFIX_LENGTH) + 1):
+                        top = self.top.get(key[0][:length])
+                        if top is not None and item not in top:
+                            # Replaced, not mutated: concurrent readers keep a consistent list
+                            self.top[key[0][:length]] = sorted(top + [item], key=self._rank, reverse=True)[:MAX_RESULTS]
+
+
+#       ------------------      Process-wide indexes      ------------------
+
+_recipes: PrefixIndex | None = None
+_ingredients: PrefixIndex | None = None
+_built_at = 0.0
+_build_lock = threading.Lock()
+_rebuilding = False
+
+
+def _ingredient_rows(db: Session, spoonacular_ids: list[int] | None = None) -> list:
+    ingredients = db.query(Ingredient.spoonacular_id, Ingredient.name, Ingredient.image)
+    if spoonacular_ids is not None:
+        ingredients = ingredients.filter(Ingredient.spoonacular_id.in_(spoonacular_ids))
+    ingredients = ingredients.all()
+    names = {normalize_ingredient(name) for _, name, _ in ingredients}
+    usage = dict(
+        db.query(RecipeIngredient.name, func.count())
+        .filter(RecipeIngredient.name.in_(names))
+        .group_by(RecipeIngredient.name)
+    ) if names else {}
+    return [(sid, name, image, usage.get(normalize_ingredient(name), 0)) for sid, name, image in ingredients]
+
+
+def _recipe_rows(db: Session, recipe_ids: list[int] | None = None) -> list:
+    recipes = db.query(Recipe.spoonacular_id, Recipe.title, Recipe.image, Recipe.likes)
+    if recipe_ids is not None:
+        recipes = recipes.filter(Recipe.id.in_(recipe_ids))
+    return recipes.all()
+
+
+def _build():
+    global _recipes, _ingredients, _built_at
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        recipes, ingredients = PrefixIndex(_recipe_rows(db)), PrefixIndex(_ingredient_rows(db))
+    finally:
+        db.close()
+    _recipes, _ingredients, _built_at = recipes, ingredients, time.monotonic()
+    logger.info(
+        "Autocomplete index: %d recipes, %d ingredients in %.0f ms",
+        len(recipes.items), len(ingredients.items), (time.perf_counter() - started) * 1000,
+    )
+
+
+def ensure_built():
+    with _build_lock:
+        if _recipes is None:
+            _build()
+
+
+def _rebuild():
+    global _rebuilding
+    try:
+        with _build_lock:
+            _build()
+    except Exception:
+        logger.exception("Autocomplete index build failed")
+    finally:
+        _rebuilding = False
+
+
+def start_build():
+    # Startup: build off the event loop so the worker accepts requests meanwhile
+    global _rebuilding
+    _rebuilding = True
+    threading.Thread(target=_rebuild, name="autocomplete-build", daemon=True).start()
+
+
+def ready() -> bool:
+    return _recipes is not None
+
+
+def suggest(query: str, number: int) -> dict:
+    """
+    Top `number` recipes and ingredients whose words start with the query. Memory only, no DB access.
+    """
+    if time.monotonic() - _built_at > MAX_INDEX_AGE and not _rebuilding:
+        # Keep answering from the current index while a fresh one is built
+        start_build()
+    return {
+        "recipes": [
+            {"id": item_id, "title": label, "image": image}
+            for item_id, label, image, _ in _recipes.search(query, number)
+        ],
+        "ingredients": [
+            {"id": item_id, "name": label, "image": image}
+            for item_id, label, image, _ in _ingredients.search(query, number)
+        ],
+    }
+
+
+def recipes_written(db: Session, recipe_ids: list[int]):
+    if _recipes is not None:
+        _recipes.add(_recipe_rows(db, recipe_ids))
+
+
+def ingredients_written(db: Session, spoonacular_ids: list[int]):
+    if _ingredients is not None:
+        _ingredients.add(_ingredient_rows(db, spoonacular_ids))
+
+
+bulk.after_recipes_written.append(recipes_written)
+bulk.after_ingredients_written.append(ingredients_written)
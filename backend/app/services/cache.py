@@ -0,0 +1,168 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+import asyncio, logging, time
+
+logger = logging.getLogger(__name__)
+
+# Sentinel for "not in cache" (None is a valid cached value)
+MISSING = object()
+
+
+def make_key(path: str, params: dict | None = None) -> tuple:
+    """
+    Build a cache key from a request path and its params.
+    Strings are stripped/lowercased and comma lists sorted, so
+    "Chicken, rice" and "rice,chicken" share one entry.
+    """
+    normalized = []
+    for name, value in sorted((params or {}).items()):
+        if value is None or name == "apiKey":
+            continue
+        if isinstance(value, str):
+            value = " ".join(value.lower().split())
+            if "," in value:
+                value = ",".join(sorted(part.strip() for part in value.split(",") if part.strip()))
+        normalized.append((name, value))
+    return (path, tuple(normalized))
+
+
+class TTLCache:
+    """
+    Bounded in-memory LRU cache with per-entry TTL and stale-while-revalidate.
+    Values are shared between requests, treat them as read-only.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        # key -> (value, fresh_until, stale_until)
+        self._data: OrderedDict[Hashable, tuple[Any, float, float]] = OrderedDict()
+        # key -> running fetch task (single-flight)
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+        self.refreshes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _lookup(self, key: Hashable, now: float):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if now >= entry[2]:
+            del self._data[key]
+            self.expirations += 1
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def get(self, key: Hashable, allow_stale: bool = False):
+        entry = self._lookup(key, time.monotonic())
+        if entry is None:
+            self.misses += 1
+            return MISSING
+        value, fresh_until, _ = entry
+        if time.monotonic() < fresh_until:
+            self.hits += 1
+            return value
+        if allow_stale:
+            self.stale_hits += 1
+            return value
+        self.misses += 1
+        return MISSING
+
+    def set(self, key: Hashable, value: Any, ttl: float, stale_ttl: float = 0):
+        now = time.monotonic()
+        self._data[key] = (value, now + ttl, now + ttl + stale_ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def _start_fetch(self, key, flight, fetch, ttl, stale_ttl) -> asyncio.Task:
+        async def run():
+            value = await fetch()
+            self.set(key, value, ttl, stale_ttl)
+            return value
+
+        task = asyncio.ensure_future(run())
+        self._inflight[flight] = task
+        task.add_done_callback(lambda _: self._inflight.pop(flight, None))
+        return task
+
+    def _refresh_in_background(self, key, flight, fetch, ttl, stale_ttl):
+        if flight in self._inflight:
+            return
+        self.refreshes += 1
+        task = self._start_fetch(key, flight, fetch, ttl, stale_ttl)
+
+        def log_failure(t: asyncio.Task):
+            if not t.cancelled() and t.exception() is not None:
+                logger.warning("Background refresh failed for %s: %r", key, t.exception())
+
+        task.add_done_callback(log_failure)
+
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: float,
+        stale_ttl: float = 0,
+        flight: Hashable | None = None,
+    ):
+        """
+        Return the cached value for key, calling fetch() on a miss.
+        Concurrent misses for the same key share one fetch; stale entries
+        are served immediately while a single refresh runs in the background.
+        `flight` (default: key) narrows the sharing, e.g. to callers of the same priority.
+        Exceptions from fetch() are propagated and never cached.
+        """
+        flight = key if flight is None else flight
+        now = time.monotonic()
+        entry = self._lookup(key, now)
+
+        if entry is not None:
+            value, fresh_until, _ = entry
+            if now < fresh_until:
+                self.hits += 1
+                return value
+            self.stale_hits += 1
+            self._refresh_in_background(key, flight, fetch, ttl, stale_ttl)
+            return value
+
+        task = self._inflight.get(flight)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._start_fetch(key, flight, fetch, ttl, stale_ttl)
+
+        # shield: a cancelled caller must not cancel the fetch other callers wait on
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "inflight": len(self._inflight),
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,72 @@
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal
+from app.db import bulk
+from app.models.db_recipes import Recipe, RecipeIngredient
+from app.services import jobs, spoonacular
+import argparse, logging, os
+
+logger = logging.getLogger(__name__)
+
+# Recipe enrichment: recipes cached from a search only have id, title and image.
+# Their spoonacular ids are queued as "enrich_recipe" jobs; the worker fetches them in batches
+# through /recipes/informationBulk and fills instructions, ingredients and the filter and nutrition columns.
+
+ENRICH_KIND = "enrich_recipe"
+ENRICH_BATCH_SIZE = int(os.getenv("ENRICH_BATCH_SIZE", "50"))
+ENRICH_TIMEOUT = float(os.getenv("ENRICH_TIMEOUT", "30"))
+ENRICHED_FIELDS = (
+    "instructions", "meal_type", "diet", "cuisine", "prep_time", "servings", "likes",
+    "calories", "protein", "carbs", "fat",
+)
+
+
+def enqueue_recipes(db: Session, spoonacular_ids) -> int:
+    return jobs.enqueue(db, ENRICH_KIND, spoonacular_ids)
+
+
+def _save_enriched(rows: list[dict]):
+    db = SessionLocal()
+    try:
+        bulk.upsert_recipes(db, rows, update_fields=ENRICHED_FIELDS)
+    finally:
+        db.close()
+
+
+@jobs.register(ENRICH_KIND, batch_size=ENRICH_BATCH_SIZE)
+async def enrich_recipes(keys: list[str]):
+    # One upstream call for the whole batch; ids Spoonacular no longer knows are simply skipped
+    data = await spoonacular.get_json(
+        "/recipes/informationBulk",
+        {"ids": ",".join(keys), "includeNutrition": "true"},
+        error_detail="Error fetching recipe information",
+        timeout=ENRICH_TIMEOUT,
+        priority="background",
+    )
+    rows = [spoonacular.recipe_row(item) for item in data]
+    if rows:
+        await run_in_threadpool(_save_enriched, rows)
+    logger.info("Enriched %d of %d recipes", len(rows), len(keys))
+
+
+def recipes_without_details(db: Session) -> list[int]:
+    rows = (
+        db.query(Recipe.spoonacular_id)
+        .outerjoin(RecipeIngredient, RecipeIngredient.recipe_id == Recipe.id)
+        .filter(RecipeIngredient.id.is_(None))
+        .order_by(Recipe.id)
+    )
+    return [spoonacular_id for (spoonacular_id,) in rows]
+
+
+if __name__ == "__main__":
+    # python -m app.services.enrichment  (queue every cached recipe that still lacks details)
+    parser = argparse.ArgumentParser(description="Queue enrichment jobs for recipes without details")
+    parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        logger.info("Queued %d recipes", enqueue_recipes(db, recipes_without_details(db)))
+    finally:
+        db.close()
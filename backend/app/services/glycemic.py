@@ -0,0 +1,161 @@
+from sqlalchemy.orm import Session
+from app.db import bulk
+from app.models.db_recipes import Recipe, RecipeIngredient, RecipeGlycemic
+from app.services.normalize import name_suffixes
+from app.services import units
+
+# Glycemic index (GI) and load (GL) from a local reference table, no upstream calls.
+# GL of an ingredient = GI x available carbs (g) / 100. Recipe figures are precomputed into
+# recipe_glycemic whenever a recipe's ingredient rows are written (bulk.after_recipes_written).
+
+# normalized name -> (GI, carbs in g per 100 g). Foods without meaningful carbs count as GI 0.
+GI_TABLE = {
+    "rice": (73, 28), "white rice": (73, 28), "brown rice": (68, 23), "basmati rice": (58, 25),
+    "bread": (75, 49), "white bread": (75, 49), "whole wheat bread": (74, 41), "tortilla": (46, 48),
+    "pasta": (49, 25), "spaghetti": (49, 25), "noodle": (47, 25), "couscous": (65, 23), "quinoa": (53, 21),
+    "flour": (70, 76), "all purpose flour": (70, 76), "whole wheat flour": (69, 72), "cornstarch": (85, 91),
+    "oat": (55, 66), "rolled oat": (55, 66), "oatmeal": (55, 12), "barley": (28, 28), "cornflake": (81, 84),
+    "potato": (78, 17), "sweet potato": (63, 20), "corn": (52, 19), "pumpkin": (75, 7), "carrot": (39, 10),
+    "pea": (51, 14), "lentil": (32, 20), "chickpea": (28, 27), "bean": (30, 22), "kidney bean": (24, 22),
+    "black bean": (30, 24), "soybean": (16, 9), "tomato": (15, 4), "onion": (10, 9),
+    "apple": (36, 14), "banana": (51, 23), "orange": (43, 12), "grape": (59, 18), "mango": (51, 15),
+    "pineapple": (59, 13), "watermelon": (76, 8), "strawberry": (40, 8), "cherry": (22, 12), "pear": (38, 15),
+    "peach": (42, 10), "date": (42, 75), "raisin": (64, 79), "orange juice": (50, 10), "apple juice": (41, 11),
+    "milk": (39, 5), "yogurt": (41, 5), "ice cream": (51, 24),
+    "sugar": (65, 100), "brown sugar": (64, 98), "honey": (61, 82), "maple syrup": (54, 67), "agave": (15, 76),
+    "chocolate": (40, 60), "dark chocolate": (23, 46),
+    "chicken": (0, 0), "chicken breast": (0, 0), "chicken thigh": (0, 0), "ground beef": (0, 0), "beef": (0, 0), "pork": (0, 0), "fish": (0, 0), "salmon": (0, 0), "egg": (0, 0),
+    "butter": (0, 0), "oil": (0, 0), "cheese": (0, 1), "salt": (0, 0), "water": (0, 0),
+}
+
+LOW_GI, HIGH_GI = 55, 70            # low <= 55, medium 56-69, high >= 70
+LOW_GL, HIGH_GL = 10, 20            # per serving: low <= 10, medium 11-19, high >= 20
+
+
+def reference(name: str | None) -> tuple[float, float] | None:
+    for key in name_suffixes(name):
+        if key in GI_TABLE:
+            return GI_TABLE[key]
+    return None
+
+
+def classify_gi(gi: float | None) -> str | None:
+    if gi is None:
+        return None
+    return "low" if gi <= LOW_GI else "high" if gi >= HIGH_GI else "medium"
+
+
+def classify_gl(gl: float | None) -> str | None:
+    if gl is None:
+        return None
+    return "low" if gl <= LOW_GL else "high" if gl >= HIGH_GL else "medium"
+
+
+def compute(lines: list[tuple[str, float | None]], servings: int | None = None) -> dict:
+    """
+    lines: (ingredient name, grams). Returns per-ingredient figures and the totals.
+    """
+    ingredients = []
+    total_load = total_carbs = weighted_gi = 0.0
+    matched = 0
+    for name, grams in lines:
+        found = reference(name)
+        if found is None or grams is None:
+            ingredients.append({"name": name, "grams": grams, "glycemic_index": None, "classification": None,
+                                "carbs": None, "glycemic_load": None})
+            continue
+        gi, carbs_per_100 = found
+        carbs = grams * carbs_per_100 / 100
+        load = gi * carbs / 100
+        matched += 1
+        total_load += load
+        total_carbs += carbs
+        weighted_gi += gi * carbs
+        ingredients.append({"name": name, "grams": round(grams, 2), "glycemic_index": gi,
+                            "classification": classify_gi(gi), "carbs": round(carbs, 2),
+                            "glycemic_load": round(load, 2)})
+
+    per_serving = total_load / servings if servings else None
+    glycemic_index = weighted_gi / total_carbs if total_carbs else None
+    return {
+        "ingredients": ingredients,
+        "glycemic_index": round(glycemic_index, 1) if glycemic_index is not None else None,
+        "glycemic_load": round(total_load, 2),
+        "glycemic_load_per_serving": round(per_serving, 2) if per_serving is not None else None,
+        "classification": classify_gl(per_serving if per_serving is not None else total_load),
+        "servings": servings,
+        "matched": matched,
+        "unmatched": len(lines) - matched,
+    }
+
+
+#       ------------------      Per-recipe precompute (sync, runs after bulk writes)      ------------------
+
+SUMMARY_FIELDS = (
+    "glycemic_index", "glycemic_load", "glycemic_load_per_serving", "classification", "servings", "matched", "unmatched",
+)
+
+
+def precompute(db: Session, recipe_ids: list[int]):
+    """
+    Recompute recipe_glycemic rows for the given Recipe ids (one read, one upsert).
+    """
+    rows = (
+        db.query(RecipeIngredient.recipe_id, RecipeIngredient.name, RecipeIngredient.quantity, RecipeIngredient.unit,
+                 RecipeIngredient.amount, RecipeIngredient.base_unit, RecipeIngredient.base_amount, Recipe.servings)
+        .join(Recipe, Recipe.id == RecipeIngredient.recipe_id)
+        .filter(RecipeIngredient.recipe_id.in_(recipe_ids))
+        .order_by(RecipeIngredient.recipe_id, RecipeIngredient.id)
+    )
+    lines, servings = {}, {}
+    for row in rows:
+        lines.setdefault(row.recipe_id, []).append((row.name, units.line_grams(row)))
+        servings[row.recipe_id] = row.servings
+    if not lines:
+        return
+
+    values = []
+    for recipe_id, recipe_lines in lines.items():
+        summary = compute(recipe_lines, servings[recipe_id])
+        values.append({"recipe_id": recipe_id, **{field: summary[field] for field in SUMMARY_FIELDS}})
+
+    stmt = bulk.upsert_insert(db, RecipeGlycemic).values(values)
+    bulk.execute_upsert(db, stmt.on_conflict_do_update(
+        index_elements=["recipe_id"],
+        set_={field: getattr(stmt.excluded, field) for field in SUMMARY_FIELDS},
+    ))
+    db.commit()
+
+
+def recipe_summary(db: Session, recipe_id: int) -> dict | None:
+    """
+    Stored figures for a cached recipe (by spoonacular id); computed now if the recipe predates the table.
+    """
+    row = (
+        db.query(Recipe.id, RecipeGlycemic)
+        .outerjoin(RecipeGlycemic, RecipeGlycemic.recipe_id == Recipe.id)
+        .filter(Recipe.spoonacular_id == recipe_id)
+        .first()
+    )
+    if row is None:
+        return None
+    stored = row[1]
+    if stored is None:
+        precompute(db, [row[0]])
+        stored = db.query(RecipeGlycemic).filter(RecipeGlycemic.recipe_id == row[0]).first()
+        if stored is None:
+            return None
+    return {"ingredients": [], **{field: getattr(stored, field) for field in SUMMARY_FIELDS}}
+
+
+def backfill(db: Session, batch_size: int = 500) -> int:
+    recipe_ids = [
+        recipe_id for (recipe_id,) in
+        db.query(RecipeIngredient.recipe_id).distinct().order_by(RecipeIngredient.recipe_id)
+    ]
+    for start in range(0, len(recipe_ids), batch_size):
+        precompute(db, recipe_ids[start:start + batch_size])
+    return len(recipe_ids)
+
+
+bulk.after_recipes_written.append(precompute)
@@ -0,0 +1,257 @@
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal
+from app.db.bulk import upsert_insert, execute_upsert
+from app.models.db_jobs import Job
+from datetime import datetime, timedelta
+import argparse, asyncio, importlib, logging, os
+
+logger = logging.getLogger(__name__)
+
+# DB-backed job queue. Requests only enqueue (one INSERT ... ON CONFLICT DO NOTHING);
+# a worker claims pending jobs in batches per kind and runs the registered handler.
+# The worker runs inside each web process (RUN_JOB_WORKER, default on) or on its own:
+#   python -m app.services.jobs [--once]
+
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))      # seconds between polls when idle
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "30"))         # seconds, doubled on every attempt
+JOB_LEASE = float(os.getenv("JOB_LEASE", "600"))                    # running jobs older than this are re-claimed
+
+# Modules that register handlers, or after-write hooks for the recipes the handlers write
+# (glycemic precompute); imported when a worker starts, not at app boot
+HANDLER_MODULES = ["app.services.enrichment", "app.services.wine", "app.services.glycemic"]
+
+# kind -> (async handler(keys: list[str]), batch size)
+handlers: dict[str, tuple] = {}
+
+
+def register(kind: str, batch_size: int = 1):
+    def decorator(handler):
+        handlers[kind] = (handler, batch_size)
+        return handler
+    return decorator
+
+
+#       ------------------      Queue operations (sync, run in the threadpool)      ------------------
+
+def enqueue(db: Session, kind: str, keys) -> int:
+    keys = list(dict.fromkeys(str(key) for key in keys))
+    if not keys:
+        return 0
+    now = datetime.utcnow()
+    execute_upsert(
+        db,
+        upsert_insert(db, Job)
+        .values([{"kind": kind, "key": key, "status": "pending", "attempts": 0, "run_after": now} for key in keys])
+        .on_conflict_do_nothing(index_elements=["kind", "key"])
+    )
+    db.commit()
+    _wake_worker()
+    return len(keys)
+
+
+def claim(db: Session, kind: str, limit: int) -> list[tuple[int, str, int]]:
+    """
+    Mark up to `limit` due jobs as running and return (id, key, attempts) for each.
+    """
+    now = datetime.utcnow()
+    query = (
+        db.query(Job)
+        .filter(
+            Job.kind == kind,
+            or_(
+                and_(Job.status == "pending", Job.run_after <= now),
+                and_(Job.status == "running", Job.updated_at < now - timedelta(seconds=JOB_LEASE)),
+            ),
+        )
+        .order_by(Job.id)
+        .limit(limit)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        # Several workers can claim concurrently without blocking on each other's rows
+        query = query.with_for_update(skip_locked=True)
+
+    jobs = query.all()
+    for job in jobs:
+        job.status = "running"
+        job.attempts += 1
+        job.updated_at = now
+    db.commit()
+    return [(job.id, job.key, job.attempts) for job in jobs]
+
+
+def finish(db: Session, job_ids: list[int]):
+    db.execute(update(Job).where(Job.id.in_(job_ids)).values(status="done", last_error=None))
+    db.commit()
+
+
+def fail(db: Session, claimed: list[tuple[int, str, int]], error: str):
+    now = datetime.utcnow()
+    for job_id, _, attempts in claimed:
+        if attempts >= JOB_MAX_ATTEMPTS:
+            values = {"status": "failed"}
+        else:
+            values = {"status": "pending", "run_after": now + timedelta(seconds=JOB_RETRY_DELAY * 2 ** (attempts - 1))}
+        db.execute(update(Job).where(Job.id == job_id).values(last_error=error[:1000], **values))
+    db.commit()
+
+
+def defer(db: Session, claimed: list[tuple[int, str, int]], seconds: float):
+    # Upstream asked us to wait (503 + Retry-After): back to pending, without using up an attempt
+    run_after = datetime.utcnow() + timedelta(seconds=seconds)
+    db.execute(
+        update(Job)
+        .where(Job.id.in_([job_id for job_id, _, _ in claimed]))
+        .values(status="pending", attempts=Job.attempts - 1, run_after=run_after)
+    )
+    db.commit()
+
+
+def failed_at(db: Session, kind: str, key: str) -> datetime | None:
+    """
+    When the (kind, key) job gave up after JOB_MAX_ATTEMPTS, or None if it has not.
+    """
+    return (
+        db.query(Job.updated_at)
+        .filter(Job.kind == kind, Job.key == str(key), Job.status == "failed")
+        .scalar()
+    )
+
+
+def retry_failed(db: Session, kind: str, keys) -> int:
+    # Failed jobs back to pending with a fresh set of attempts
+    retried = db.execute(
+        update(Job)
+        .where(Job.kind == kind, Job.key.in_([str(key) for key in keys]), Job.status == "failed")
+        .values(status="pending", attempts=0, run_after=datetime.utcnow())
+    ).rowcount
+    db.commit()
+    if retried:
+        _wake_worker()
+    return retried
+
+
+def stats(db: Session) -> dict:
+    counts = {}
+    for kind, status, count in db.query(Job.kind, Job.status, func.count()).group_by(Job.kind, Job.status):
+        counts.setdefault(kind, {})[status] = count
+    return counts
+
+
+def _with_session(fn, *args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+#       ------------------      Worker      ------------------
+
+class JobWorker:
+    def __init__(self):
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.wakeup: asyncio.Event | None = None
+
+    async def run_once(self) -> int:
+        processed = 0
+        for kind, (handler, batch_size) in list(handlers.items()):
+            claimed = await run_in_threadpool(_with_session, claim, kind, batch_size)
+            if not claimed:
+                continue
+            try:
+                await handler([key for _, key, _ in claimed])
+            except HTTPException as exc:
+                retry_after = (exc.headers or {}).get("Retry-After")
+                if exc.status_code == 503 and retry_after:
+                    logger.info("Job batch deferred %ss: %s x%d", retry_after, kind, len(claimed))
+                    await run_in_threadpool(_with_session, defer, claimed, float(retry_after))
+                else:
+                    logger.warning("Job batch failed: %s x%d: %s", kind, len(claimed), exc.detail)
+                    await run_in_threadpool(_with_session, fail, claimed, f"{exc.status_code}: {exc.detail}")
+            except Exception as exc:
+                logger.exception("Job batch failed: %s x%d", kind, len(claimed))
+                await run_in_threadpool(_with_session, fail, claimed, repr(exc))
+            else:
+                await run_in_threadpool(_with_session, finish, [job_id for job_id, _, _ in claimed])
+            processed += len(claimed)
+        return processed
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        while True:
+            try:
+                processed = await self.run_once()
+            except Exception:
+                # e.g. database unavailable: keep the worker alive and retry on the next poll
+                logger.exception("Job worker poll failed")
+                processed = 0
+            if not processed:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+
+_worker: JobWorker | None = None
+_worker_task: asyncio.Task | None = None
+
+
+def _wake_worker():
+    # Called from threadpool threads after an enqueue: poll now instead of at the next interval
+    if _worker is not None and _worker.loop is not None and _worker.wakeup is not None:
+        _worker.loop.call_soon_threadsafe(_worker.wakeup.set)
+
+
+def load_handlers():
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+
+
+def start_worker():
+    global _worker, _worker_task
+    if _worker_task is None:
+        load_handlers()
+        _worker = JobWorker()
+        _worker_task = asyncio.create_task(_worker.run())
+
+
+async def stop_worker():
+    global _worker, _worker_task
+    if _worker_task is not None:
+        _worker_task.cancel()
+        try:
+            await _worker_task
+        except asyncio.CancelledError:
+            pass
+        _worker, _worker_task = None, None
+
+
+async def _main(args):
+    from app.services import spoonacular
+
+    load_handlers()
+    worker = JobWorker()
+    try:
+        if args.once:
+            while await worker.run_once():
+                pass
+        else:
+            await worker.run()
+    finally:
+        await spoonacular.close_client()
+
+
+if __name__ == "__main__":
+    # python -m app.services.jobs [--once]
+    parser = argparse.ArgumentParser(description="Run the background job worker")
+    parser.add_argument("--once", action="store_true", help="Drain the due jobs and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(args))
@@ -0,0 +1,184 @@
+from sqlalchemy.orm import Session
+from app.services import recipe_index
+from app.services.recipe_index import RecipeIndex, NUTRIENT_COLUMNS
+import time
+import numpy as np
+
+# Weekly meal-plan generator over the cached recipe corpus (no Spoonacular meal-planner calls).
+# Works on the in-memory RecipeIndex feature arrays: filters are boolean masks, a greedy pass
+# fills the (days x meals) grid slot by slot, then a bounded local search swaps single slots
+# while that lowers the plan cost.
+# Cost = per day, sum over targeted nutrients of ((day total - target) / target)^2,
+#        plus REPEAT_PENALTY for every extra use of a recipe already in the plan.
+
+# Slot name -> Spoonacular dish types that can fill it (other names match the dish type itself)
+SLOT_MEAL_TYPES = {
+    "breakfast": ("breakfast", "brunch", "morning meal"),
+    "lunch": ("lunch", "main course", "main dish", "salad", "soup"),
+    "dinner": ("dinner", "main course", "main dish"),
+    "snack": ("snack", "appetizer", "fingerfood", "antipasti", "dessert"),
+}
+SLOT_MEAL_TYPES.update({
+    "desayuno": SLOT_MEAL_TYPES["breakfast"],
+    "almuerzo": SLOT_MEAL_TYPES["lunch"],
+    "cena": SLOT_MEAL_TYPES["dinner"],
+    "onces": SLOT_MEAL_TYPES["snack"],
+})
+
+REPEAT_PENALTY = 1.0
+GREEDY_SAMPLE = 2048          # candidates scored per greedy step
+SEARCH_SAMPLE = 256           # candidates scored per local-search step
+SEARCH_STEPS = 600
+MIN_IMPROVEMENT = 1e-4        # ~1% off a target, squared: smaller gains are not worth a swap
+STALE_STEPS = 100             # stop after this many steps without an improvement
+TIME_BUDGET = 0.05            # seconds of local search at most
+
+
+def _sample(rng: np.random.Generator, candidates: np.ndarray, size: int) -> np.ndarray:
+    # With replacement + unique: O(size), unlike choice(replace=False) which permutes all candidates
+    if len(candidates) <= size:
+        return candidates
+    return np.unique(candidates[rng.integers(0, len(candidates), size)])
+
+
+class Planner:
+    def __init__(
+        self,
+        index: RecipeIndex,
+        days: int,
+        meals: list[str],
+        diet: str | None = None,
+        max_prep_time: int | None = None,
+        exclude: list[str] | None = None,
+        targets: dict[str, float] | None = None,
+        seed: int | None = None,
+    ):
+        self.index = index
+        self.days = days
+        self.meals = meals
+        self.rng = np.random.default_rng(seed)
+
+        targets = {name: value for name, value in (targets or {}).items() if value}
+        columns = [NUTRIENT_COLUMNS.index(name) for name in targets]
+        self.target = np.array(list(targets.values()), dtype=np.float64)
+        self.features = index.nutrients[:, columns].astype(np.float64)
+
+        base = index.mask(diet=diet, prep_range=(0, max_prep_time) if max_prep_time else None, exclude=exclude)
+        if columns:
+            # A recipe can only be scored against a target when its nutrition is known
+            base &= ~np.isnan(self.features).any(axis=1)
+
+        self.candidates = []
+        for meal in meals:
+            slot_mask = base & index.mask(meal_types=list(SLOT_MEAL_TYPES.get(meal.lower(), (meal,))))
+            # No recipe of that dish type cached: any recipe passing the other filters
+            self.candidates.append(np.flatnonzero(slot_mask if slot_mask.any() else base))
+
+        self.plan = np.full((days, len(meals)), -1, dtype=np.int64)
+        self.totals = np.zeros((days, len(columns)))
+        self.uses = np.zeros(index.size, dtype=np.int32)     # times each recipe is in the plan
+
+    def _day_cost(self, totals: np.ndarray) -> np.ndarray:
+        # totals: (..., k) -> (...)
+        if not len(self.target):
+            return np.zeros(totals.shape[:-1])
+        return (((totals - self.target) / self.target) ** 2).sum(axis=-1)
+
+    def _assign(self, day: int, slot: int, position: int):
+        old = self.plan[day, slot]
+        if old >= 0:
+            self.totals[day] -= self.features[old]
+            self.uses[old] -= 1
+        self.plan[day, slot] = position
+        self.totals[day] += self.features[position]
+        self.uses[position] += 1
+
+    def greedy(self):
+        meal_count = len(self.meals)
+        for day in range(self.days):
+            for slot in range(meal_count):
+                pool = _sample(self.rng, self.candidates[slot], GREEDY_SAMPLE)
+                if not len(pool):
+                    continue
+                # Aim this slot at an even share of what the day still needs
+                share = (self.target - self.totals[day]) / (meal_count - slot)
+                cost = self._day_cost(self.target - share + self.features[pool])
+                cost += REPEAT_PENALTY * self.uses[pool]
+                # Random tie-break so plans without targets still vary
+                cost += self.rng.random(len(pool)) * 1e-6
+                self._assign(day, slot, int(pool[np.argmin(cost)]))
+
+    def local_search(self):
+        filled = np.argwhere(self.plan >= 0)
+        if not len(filled):
+            return
+        deadline = time.perf_counter() + TIME_BUDGET
+        stale = 0
+        for step in range(SEARCH_STEPS):
+            if stale >= STALE_STEPS or (step % 32 == 0 and time.perf_counter() > deadline):
+                break
+            stale += 1
+            day, slot = filled[self.rng.integers(len(filled))]
+            old = int(self.plan[day, slot])
+            pool = _sample(self.rng, self.candidates[slot], SEARCH_SAMPLE)
+            pool = pool[pool != old]
+            if not len(pool):
+                continue
+
+            old_cost = self._day_cost(self.totals[day]) + REPEAT_PENALTY * (self.uses[old] > 1)
+            new_cost = self._day_cost(self.totals[day] - self.features[old] + self.features[pool])
+            new_cost = new_cost + REPEAT_PENALTY * self.uses[pool]
+            best = int(np.argmin(new_cost))
+            if new_cost[best] < old_cost - MIN_IMPROVEMENT:
+                self._assign(day, slot, int(pool[best]))
+                stale = 0
+
+    def cost(self) -> float:
+        repeats = int(np.maximum(self.uses - 1, 0).sum())
+        return float(self._day_cost(self.totals).sum() + REPEAT_PENALTY * repeats)
+
+    def result(self) -> dict:
+        index = self.index
+        days = []
+        for day in range(self.days):
+            meals = []
+            for slot, meal in enumerate(self.meals):
+                position = int(self.plan[day, slot])
+                if position < 0:
+                    meals.append({"slot": meal})
+                    continue
+                facts = index.nutrients[position]
+                prep_time = index.prep_time[position]
+                meals.append({
+                    "slot": meal,
+                    "id": index.spoonacular_ids[position],
+                    "title": index.titles[position],
+                    "image": index.images[position],
+                    "prep_time": None if np.isnan(prep_time) else int(prep_time),
+                    **{name: None if np.isnan(value) else round(float(value), 1)
+                       for name, value in zip(NUTRIENT_COLUMNS, facts)},
+                })
+            positions = self.plan[day][self.plan[day] >= 0]
+            totals = np.nansum(index.nutrients[positions], axis=0)
+            days.append({
+                "day": day + 1,
+                "meals": meals,
+                "totals": {name: round(float(value), 1) for name, value in zip(NUTRIENT_COLUMNS, totals)},
+            })
+        return {
+            "days": days,
+            "unfilled": int((self.plan < 0).sum()),
+            "distinct_recipes": int(np.count_nonzero(self.uses)),
+            "cost": round(self.cost(), 4),
+        }
+
+
+def generate(db: Session, **options) -> dict:
+    """
+    Plan from the process-wide recipe index. Options: see Planner.
+    """
+    started = time.perf_counter()
+    planner = Planner(recipe_index.get_index(db), **options)
+    planner.greedy()
+    planner.local_search()
+    return {**planner.result(), "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)}
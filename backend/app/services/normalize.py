@@ -0,0 +1,71 @@
+import re, unicodedata
+
+# Canonical ingredient names, shared by the ingredient index, shopping lists, etc.
+# "Fresh  Tomatoes" -> "fresh tomato", "2 cups all-purpose flour" -> "all purpose flour"
+
+_LEADING_UNITS = {
+    "cup", "cups", "c", "tablespoon", "tablespoons", "tbsp", "tbs", "teaspoon", "teaspoons", "tsp",
+    "g", "gram", "grams", "kg", "kilogram", "kilograms", "mg", "oz", "ounce", "ounces", "lb", "lbs",
+    "pound", "pounds", "ml", "l", "liter", "liters", "litre", "litres", "pinch", "dash", "clove", "cloves",
+    "can", "cans", "package", "packages", "slice", "slices", "piece", "pieces", "handful", "large",
+    "medium", "small", "of",
+}
+
+
+def _singular(word: str) -> str:
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("oes"):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def normalize_ingredient(name: str | None) -> str:
+    if not name:
+        return ""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+    words = re.findall(r"[a-z0-9]+", text)
+    return " ".join(_singular(word) for word in words)
+
+
+def name_suffixes(name: str | None):
+    """
+    Candidate keys for reference tables, most specific first: "extra virgin olive oil" ->
+    "extra virgin olive oil", "virgin olive oil", "olive oil", "oil".
+    """
+    words = normalize_ingredient(name).split()
+    for start in range(len(words)):
+        yield " ".join(words[start:])
+
+
+def ingredient_name_from_text(original: str | None) -> str:
+    """
+    Best-effort name for free-text lines like "2 cups flour, sifted" (rows without a stored name).
+    """
+    if not original:
+        return ""
+    text = original.split(",")[0].split("(")[0]
+    words = re.findall(r"[A-Za-z]+", text)
+    while words and words[0].lower() in _LEADING_UNITS:
+        words.pop(0)
+    return normalize_ingredient(" ".join(words))
+
+
+# Multi-valued recipe tags (Recipe.meal_type / diet / cuisine) are stored as one lowercase,
+# comma-separated string: ["main course", "Dinner"] -> "main course,dinner". Spoonacular tag
+# values never contain a comma.
+TAG_SEPARATOR = ","
+
+
+def join_tags(values: list[str] | None) -> str | None:
+    tags = dict.fromkeys(value.strip().lower() for value in values or () if value and value.strip())
+    return TAG_SEPARATOR.join(tags) or None
+
+
+def split_tags(value: str | None) -> list[str]:
+    # Lowercased again for rows written before tags were normalized
+    return [tag.strip().lower() for tag in (value or "").split(TAG_SEPARATOR) if tag.strip()]
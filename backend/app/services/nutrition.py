@@ -0,0 +1,154 @@
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from app.db import bulk
+from app.models.db_recipes import Ingredient, IngredientNutrition, Recipe, RecipeIngredient
+from app.services import spoonacular
+import asyncio, os
+
+# Ingredient nutrition store: facts per 100 g, fetched from Spoonacular once per ingredient
+# and kept in ingredient_nutrition. Recipe nutrition = stored facts scaled by each ingredient's grams.
+
+PER_GRAMS = 100
+FETCH_CONCURRENCY = int(os.getenv("NUTRITION_FETCH_CONCURRENCY", "8"))
+
+# Spoonacular nutrient name -> IngredientNutrition column
+NUTRIENTS = {
+    "Calories": "calories",
+    "Carbohydrates": "carbs",
+    "Fat": "fat",
+    "Protein": "protein",
+    "Fiber": "fiber",
+    "Sugar": "sugar",
+    "Sodium": "sodium",
+}
+NUTRIENT_COLUMNS = tuple(NUTRIENTS.values())
+
+
+def nutrition_values(data: dict) -> dict:
+    """
+    Single pass over Spoonacular's nutrients list, picked by name (the list order is not fixed).
+    """
+    values = dict.fromkeys(NUTRIENT_COLUMNS)
+    for nutrient in data.get("nutrition", {}).get("nutrients", []):
+        column = NUTRIENTS.get(nutrient.get("name"))
+        if column:
+            values[column] = nutrient.get("amount")
+    return values
+
+
+#       ------------------      Store (sync, run in the threadpool)      ------------------
+
+def stored_nutrition(db: Session, spoonacular_ids: list[int]) -> dict[int, dict]:
+    rows = (
+        db.query(Ingredient.spoonacular_id, Ingredient.name, Ingredient.image,
+                 *(getattr(IngredientNutrition, column) for column in NUTRIENT_COLUMNS))
+        .join(IngredientNutrition, IngredientNutrition.ingredient_id == Ingredient.id)
+        .filter(Ingredient.spoonacular_id.in_(spoonacular_ids))
+    )
+    return {
+        row.spoonacular_id: {"id": row.spoonacular_id, "name": row.name, "image": row.image,
+                             **{column: getattr(row, column) for column in NUTRIENT_COLUMNS}}
+        for row in rows
+    }
+
+
+def save_nutrition(db: Session, payloads: list[dict]) -> dict[int, dict]:
+    ingredients = bulk.upsert_ingredients(db, [spoonacular.ingredient_row(data) for data in payloads])
+    ingredient_ids = {ingredient.spoonacular_id: ingredient.id for ingredient in ingredients}
+    rows = [
+        {"ingredient_id": ingredient_ids[data["id"]], "per_grams": PER_GRAMS, **nutrition_values(data)}
+        for data in payloads if data["id"] in ingredient_ids
+    ]
+    if rows:
+        bulk.execute_upsert(
+            db,
+            bulk.upsert_insert(db, IngredientNutrition).values(rows).on_conflict_do_nothing(index_elements=["ingredient_id"])
+        )
+        db.commit()
+    return stored_nutrition(db, list(ingredient_ids))
+
+
+def recipe_ingredients(db: Session, recipe_id: int) -> list:
+    return (
+        db.query(RecipeIngredient.spoonacular_ingredient_id, RecipeIngredient.name, RecipeIngredient.ingredients,
+                 RecipeIngredient.quantity, RecipeIngredient.unit, RecipeIngredient.amount,
+                 RecipeIngredient.base_unit, RecipeIngredient.base_amount)
+        .join(Recipe, Recipe.id == RecipeIngredient.recipe_id)
+        .filter(Recipe.spoonacular_id == recipe_id)
+        .order_by(RecipeIngredient.id)
+        .all()
+    )
+
+
+#       ------------------      Fetch on first use      ------------------
+
+async def _fetch_information(spoonacular_id: int) -> dict:
+    return await spoonacular.get_json(
+        f"/food/ingredients/{spoonacular_id}/information",
+        {"amount": PER_GRAMS, "unit": "g"},
+        error_detail="Failed to fetch ingredient info from API",
+    )
+
+
+async def get_nutrition(db: Session, spoonacular_id: int) -> dict:
+    stored = await run_in_threadpool(stored_nutrition, db, [spoonacular_id])
+    if spoonacular_id not in stored:
+        data = await _fetch_information(spoonacular_id)
+        stored = await run_in_threadpool(save_nutrition, db, [data])
+    if spoonacular_id not in stored:
+        raise HTTPException(status_code=404, detail="Ingredient not found")
+    return stored[spoonacular_id]
+
+
+async def ensure_nutrition(db: Session, spoonacular_ids: list[int]) -> dict[int, dict]:
+    """
+    Stored facts for every id, fetching the unseen ones concurrently (one upstream call each).
+    Ids Spoonacular cannot answer for are left out.
+    """
+    spoonacular_ids = list(dict.fromkeys(spoonacular_ids))
+    stored = await run_in_threadpool(stored_nutrition, db, spoonacular_ids)
+    unseen = [spoonacular_id for spoonacular_id in spoonacular_ids if spoonacular_id not in stored]
+    if not unseen:
+        return stored
+
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+    async def fetch(spoonacular_id: int):
+        async with semaphore:
+            try:
+                return await _fetch_information(spoonacular_id)
+            except HTTPException:
+                return None
+
+    payloads = [data for data in await asyncio.gather(*(fetch(i) for i in unseen)) if data and data.get("id")]
+    if payloads:
+        stored.update(await run_in_threadpool(save_nutrition, db, payloads))
+    return stored
+
+
+#       ------------------      Aggregation      ------------------
+
+def combine(items: list[dict], amounts: list[float | None]) -> tuple[list[dict], dict]:
+    """
+    Scale per-100 g facts by each item's grams and add them up, one (items x nutrients) array operation.
+    Unknown values count as 0 in the totals.
+    """
+    import numpy as np
+
+    if not items:
+        return [], dict.fromkeys(NUTRIENT_COLUMNS, 0.0)
+
+    facts = np.array(
+        [[np.nan if item.get(column) is None else item[column] for column in NUTRIENT_COLUMNS] for item in items],
+        dtype=np.float64,
+    )
+    scale = np.array([np.nan if amount is None else amount / PER_GRAMS for amount in amounts], dtype=np.float64)
+    scaled = np.round(facts * scale[:, None], 2)
+    totals = np.round(np.nansum(scaled, axis=0), 2)
+
+    rows = [
+        {column: (None if np.isnan(value) else float(value)) for column, value in zip(NUTRIENT_COLUMNS, row)}
+        for row in scaled
+    ]
+    return rows, {column: float(value) for column, value in zip(NUTRIENT_COLUMNS, totals)}
@@ -0,0 +1,101 @@
+from fastapi import Response
+from sqlalchemy.orm import Session
+from app.db import bulk, projections
+from app.models.db_recipes import Recipe
+from app.schemas.recipe import IngredientSchema, RecipeSchema
+from app.services.cache import MISSING, TTLCache
+import os, threading
+import orjson
+
+# Pre-encoded JSON for payloads that are the same for every caller. Routes on this path return
+# raw Response bytes: no Pydantic model construction and no JSON encoding on a cache hit.
+#   recipe_fragments  recipe primary key -> orjson bytes of one RecipeSchema object; a recipe list
+#                     is b"[" + fragments + b"]". Dropped when the recipe is written (bulk hook).
+#   responses         whole response bodies (popular searches, ingredient info), short-lived.
+# Keys follow the schema field order, so bytes match what response_model would have produced.
+# Values must validate against the schema too: nulls in required fields get the defaults below,
+# and a recipe without a spoonacular_id is left out, like an unknown id.
+
+FRAGMENT_CACHE_SIZE = int(os.getenv("RECIPE_PAYLOAD_CACHE_SIZE", "10000"))
+FRAGMENT_TTL = 600          # bounds staleness from recipes written by other workers
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_PAYLOAD_CACHE_SIZE", "2048"))
+
+RECIPE_KEYS = tuple(RecipeSchema.model_fields)
+INGREDIENT_KEYS = tuple(IngredientSchema.model_fields)
+# Required schema fields whose columns are nullable (legacy rows)
+RECIPE_DEFAULTS = {"title": "", "cached": True}
+INGREDIENT_DEFAULTS = {"ingredients": ""}
+
+recipe_fragments = TTLCache(maxsize=FRAGMENT_CACHE_SIZE)
+responses = TTLCache(maxsize=RESPONSE_CACHE_SIZE)
+# Fragments are read and written from threadpool workers; TTLCache itself is not thread-safe
+_fragments_lock = threading.Lock()
+
+
+def dumps(value) -> bytes:
+    return orjson.dumps(value)
+
+
+def json_response(body: bytes, headers: dict | None = None) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _conform(values: dict, keys: tuple, defaults: dict) -> dict:
+    return {key: defaults[key] if values[key] is None and key in defaults else values[key] for key in keys}
+
+
+def _recipe_fragment(recipe: dict) -> bytes | None:
+    if recipe["spoonacular_id"] is None:
+        return None
+    ingredients = [_conform(ingredient, INGREDIENT_KEYS, INGREDIENT_DEFAULTS) for ingredient in recipe["ingredients"]]
+    return dumps(_conform({**recipe, "ingredients": ingredients}, RECIPE_KEYS, RECIPE_DEFAULTS))
+
+
+def _orm_dict(recipe: Recipe) -> dict:
+    return {
+        **{key: getattr(recipe, key) for key in RECIPE_KEYS if key != "ingredients"},
+        "ingredients": [
+            {key: getattr(ingredient, key) for key in INGREDIENT_KEYS} for ingredient in recipe.ingredients
+        ],
+    }
+
+
+def recipe_list(db: Session, recipe_ids: list[int], loaded: list[Recipe] = ()) -> bytes:
+    """
+    JSON array of RecipeSchema objects for the given primary keys, in input order.
+    Cached fragments are reused; `loaded` Recipe rows (ingredients loaded) are encoded without a query,
+    the remaining misses are read with projections.recipe_dicts (2 queries). Unknown ids, and recipes
+    without a spoonacular_id, are skipped.
+    """
+    with _fragments_lock:
+        fragments = {recipe_id: recipe_fragments.get(recipe_id) for recipe_id in recipe_ids}
+
+    encoded = {}
+    for recipe in loaded:
+        if fragments.get(recipe.id) is MISSING:
+            encoded[recipe.id] = _recipe_fragment(_orm_dict(recipe))
+    missing = [recipe_id for recipe_id, fragment in fragments.items() if fragment is MISSING and recipe_id not in encoded]
+    for recipe in projections.recipe_dicts(db, missing):
+        encoded[recipe["id"]] = _recipe_fragment(recipe)
+
+    if encoded:
+        fragments.update(encoded)
+        with _fragments_lock:
+            for recipe_id, fragment in encoded.items():
+                if fragment is not None:
+                    recipe_fragments.set(recipe_id, fragment, FRAGMENT_TTL)
+    found = (fragments[recipe_id] for recipe_id in recipe_ids)
+    return b"[" + b",".join(fragment for fragment in found if fragment is not MISSING and fragment is not None) + b"]"
+
+
+def recipes_written(db: Session, recipe_ids: list[int]):
+    with _fragments_lock:
+        for recipe_id in recipe_ids:
+            recipe_fragments.delete(recipe_id)
+
+
+def stats() -> dict:
+    return {"recipe_fragments": recipe_fragments.stats(), "responses": responses.stats()}
+
+
+bulk.after_recipes_written.append(recipes_written)
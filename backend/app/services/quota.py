@@ -0,0 +1,188 @@
+from fastapi import HTTPException
+from datetime import datetime, timedelta, timezone
+import asyncio, logging, time
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# Retry-After (seconds) when the bucket never refills (rate 0: upstream calls disabled)
+NO_RATE_RETRY_AFTER = 60
+
+
+def _next_utc_midnight() -> float:
+    # Spoonacular quotas reset at midnight UTC
+    tomorrow = datetime.now(timezone.utc).date() + timedelta(days=1)
+    return datetime.combine(tomorrow, datetime.min.time(), tzinfo=timezone.utc).timestamp()
+
+
+class QuotaScheduler:
+    """
+    Admission control for a points-billed upstream API (one instance per worker process).
+    - Token bucket (rate/s, burst) smooths bursts; interactive callers go before background ones.
+    - Points left (from the quota response headers) decide the mode:
+      normal -> background paused (below background_reserve) -> cache only (below min_points).
+    - A 402 means the daily quota is gone: cache only until the next reset.
+    Rejections are HTTPException(503) with Retry-After, like the rest of the upstream errors.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        min_points: float = 0,
+        background_reserve: float = 0,
+        max_wait: float = 2.0,
+        background_max_wait: float = 60.0,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.min_points = min_points
+        self.background_reserve = background_reserve
+        self.max_wait = {INTERACTIVE: max_wait, BACKGROUND: background_max_wait}
+
+        self.tokens = float(burst)
+        self.refilled_at = time.monotonic()
+        self.paused_until = 0.0          # monotonic; set by 429 answers
+        self.exhausted_until = 0.0       # wall clock; set by 402 answers or an empty quota
+
+        # Last values reported by the upstream headers (None until the first call), valid until the reset
+        self.points_valid_until = 0.0
+        self.points_left: float | None = None
+        self.points_used: float | None = None
+        self.last_request_points: float | None = None
+
+        self.waiting = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.calls = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.throttled = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.rejected = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.cache_only_answers = 0
+        self.rate_limited = 0
+
+    #       ------------------      Mode      ------------------
+
+    def mode(self) -> str:
+        if self.points_valid_until and time.time() >= self.points_valid_until:
+            # New quota day: forget the old numbers until the next response reports them
+            self.exhausted_until = self.points_valid_until = 0.0
+            self.points_left = None
+        if self.exhausted_until:
+            return "cache_only"
+        if self.points_left is not None:
+            if self.points_left <= self.min_points:
+                return "cache_only"
+            if self.points_left <= self.background_reserve:
+                return "background_paused"
+        return "normal"
+
+    def allows(self, priority: str = INTERACTIVE) -> bool:
+        mode = self.mode()
+        return mode == "normal" or (mode == "background_paused" and priority == INTERACTIVE)
+
+    def _retry_after(self, until_reset: bool) -> int:
+        # Points only come back with the daily reset; rate limits clear within seconds
+        if until_reset:
+            return max(1, int((self.exhausted_until or _next_utc_midnight()) - time.time()))
+        refill = int(1 / self.rate) + 1 if self.rate > 0 else NO_RATE_RETRY_AFTER
+        return max(1, int(self.paused_until - time.monotonic()) + 1, refill)
+
+    def unavailable(
+        self,
+        detail: str = "Recipe service temporarily limited, please retry later",
+        until_reset: bool = True,
+    ) -> HTTPException:
+        return HTTPException(status_code=503, detail=detail, headers={"Retry-After": str(self._retry_after(until_reset))})
+
+    #       ------------------      Token bucket      ------------------
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    async def acquire(self, priority: str = INTERACTIVE):
+        """
+        Wait for a token (at most max_wait[priority] seconds) or raise 503.
+        """
+        if not self.allows(priority):
+            self.rejected[priority] += 1
+            raise self.unavailable()
+
+        deadline = time.monotonic() + self.max_wait[priority]
+        self.waiting[priority] += 1
+        try:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                # Background callers yield to any waiting interactive one
+                if now >= self.paused_until and self.tokens >= 1 and (
+                    priority == INTERACTIVE or not self.waiting[INTERACTIVE]
+                ):
+                    self.tokens -= 1
+                    self.calls[priority] += 1
+                    return
+
+                refill = (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+                delay = max(self.paused_until - now, refill, 0.01)
+                if now + delay > deadline:
+                    self.throttled[priority] += 1
+                    raise self.unavailable("Too many requests to the recipe service, please retry", until_reset=False)
+                await asyncio.sleep(delay)
+                if not self.allows(priority):
+                    self.rejected[priority] += 1
+                    raise self.unavailable()
+        finally:
+            self.waiting[priority] -= 1
+
+    #       ------------------      Upstream feedback      ------------------
+
+    def record(self, status_code: int, headers):
+        """
+        Update the budget from one upstream response (quota headers, 402, 429).
+        """
+        for header, attribute in (
+            ("X-API-Quota-Left", "points_left"),
+            ("X-API-Quota-Used", "points_used"),
+            ("X-API-Quota-Request", "last_request_points"),
+        ):
+            value = headers.get(header)
+            if value is not None:
+                try:
+                    setattr(self, attribute, float(value))
+                except ValueError:
+                    continue
+                self.points_valid_until = _next_utc_midnight()
+
+        if status_code == 402 or (self.points_left is not None and self.points_left <= 0):
+            if not self.exhausted_until:
+                logger.warning("Spoonacular quota exhausted, serving cached answers only until the reset")
+            self.exhausted_until = self.points_valid_until = _next_utc_midnight()
+        elif status_code == 429:
+            self.rate_limited += 1
+            try:
+                retry_after = float(headers.get("Retry-After", 1))
+            except ValueError:
+                retry_after = 1.0
+            self.paused_until = time.monotonic() + retry_after
+            self.tokens = 0.0
+
+    def stats(self) -> dict:
+        self._refill(time.monotonic())
+        return {
+            "mode": self.mode(),
+            "points_left": self.points_left,
+            "points_used": self.points_used,
+            "last_request_points": self.last_request_points,
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "tokens": round(self.tokens, 2),
+            "waiting": dict(self.waiting),
+            "calls": dict(self.calls),
+            "throttled": dict(self.throttled),
+            "rejected": dict(self.rejected),
+            "rate_limited": self.rate_limited,
+            "cache_only_answers": self.cache_only_answers,
+            "exhausted_until": (
+                datetime.fromtimestamp(self.exhausted_until, timezone.utc).isoformat() if self.exhausted_until else None
+            ),
+        }
@@ -0,0 +1,264 @@
+from sqlalchemy.orm import Session
+from app.models.db_recipes import Recipe, RecipeIngredient
+from app.services.normalize import normalize_ingredient, ingredient_name_from_text, split_tags
+from app.db import bulk
+from app.db.database import SessionLocal
+import logging, threading, time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# In-memory index over the cached recipe corpus.
+# Recipes are stored by position (0..n-1) in parallel numpy arrays; every ingredient name
+# (and every word of it) maps to a sorted int32 array of recipe positions (inverted index).
+
+# Columns of RecipeIndex.nutrients (per serving)
+NUTRIENT_COLUMNS = ("calories", "protein", "carbs", "fat")
+
+# Rebuild at most this often after new recipes are cached (seconds)
+MIN_REBUILD_INTERVAL = 30
+# Rebuild anyway after this long, to pick up rows written by other workers (seconds)
+MAX_INDEX_AGE = 600
+
+
+class RecipeIndex:
+    def __init__(self, recipes: list, ingredient_rows: list):
+        positions = {}
+        self.spoonacular_ids = []
+        self.titles = []
+        self.images = []
+        meal_types, diets, prep_times, nutrients = [], [], [], []
+        for recipe_id, spoonacular_id, title, image, meal_type, diet, prep_time, *facts in recipes:
+            positions[recipe_id] = len(self.spoonacular_ids)
+            self.spoonacular_ids.append(spoonacular_id)
+            self.titles.append(title)
+            self.images.append(image)
+            meal_types.append(meal_type)
+            diets.append(diet)
+            prep_times.append(prep_time)
+            nutrients.append([np.nan if value is None else value for value in facts])
+
+        self.size = len(self.spoonacular_ids)
+        self.position_of = {sid: position for position, sid in enumerate(self.spoonacular_ids)}
+        self.prep_time = np.array([np.nan if p is None else p for p in prep_times], dtype=np.float32)
+        self.meal_type_codes, self.meal_type = self._encode(meal_types)
+        self.diet_codes, self.diet = self._encode(diets)
+        # (n, len(NUTRIENT_COLUMNS)) feature matrix, NaN where unknown
+        self.nutrients = np.array(nutrients, dtype=np.float32).reshape(self.size, len(NUTRIENT_COLUMNS))
+
+        # (name, position) pairs, one per distinct ingredient of a recipe
+        names = {}
+        for recipe_id, name, original in ingredient_rows:
+            position = positions.get(recipe_id)
+            name = name or ingredient_name_from_text(original)
+            if position is None or not name:
+                continue
+            names.setdefault(name, set()).add(position)
+
+        self.ingredient_count = np.zeros(self.size, dtype=np.int32)
+        words = {}
+        self.postings = {}
+        for name, members in names.items():
+            array = np.fromiter(sorted(members), dtype=np.int32, count=len(members))
+            self.postings[name] = array
+            np.add.at(self.ingredient_count, array, 1)
+            for word in name.split():
+                words.setdefault(word, []).append(array)
+        # Word-level postings let "chicken" match "chicken breast" when there is no exact name
+        self.word_postings = {word: np.unique(np.concatenate(arrays)) for word, arrays in words.items()}
+
+    @staticmethod
+    def _encode(values: list):
+        # Tag column -> (tag -> code, (n, tags) boolean membership matrix); a recipe can have several
+        tags = [split_tags(value) for value in values]
+        codes = {}
+        for recipe_tags in tags:
+            for tag in recipe_tags:
+                codes.setdefault(tag, len(codes))
+        encoded = np.zeros((len(values), len(codes)), dtype=bool)
+        for position, recipe_tags in enumerate(tags):
+            encoded[position, [codes[tag] for tag in recipe_tags]] = True
+        return codes, encoded
+
+    def _posting(self, term: str):
+        posting = self.postings.get(term)
+        if posting is None:
+            posting = self.word_postings.get(term)
+        return posting
+
+    def mask(
+        self,
+        meal_types: list[str] | None = None,
+        diet: str | None = None,
+        prep_range: tuple[int, int] | None = None,
+        exclude: list[str] | None = None,
+    ) -> np.ndarray:
+        """
+        Boolean mask of the recipes passing every filter (meal_types: any of them).
+        """
+        mask = np.ones(self.size, dtype=bool)
+        if meal_types:
+            wanted = {m.strip().lower() for m in meal_types}
+            codes = [code for tag, code in self.meal_type_codes.items() if tag in wanted]
+            mask &= self.meal_type[:, codes].any(axis=1)
+        if diet:
+            code = self.diet_codes.get(diet.strip().lower())
+            mask &= self.diet[:, code] if code is not None else False
+        if prep_range:
+            mask &= (self.prep_time >= prep_range[0]) & (self.prep_time <= prep_range[1])
+        for term in exclude or []:
+            posting = self._posting(normalize_ingredient(term))
+            if posting is not None:
+                mask[posting] = False
+        return mask
+
+    def rank(
+        self,
+        pantry: list[str],
+        number: int,
+        meal_type: str | None = None,
+        diet: str | None = None,
+        prep_range: tuple[int, int] | None = None,
+        exclude: list[str] | None = None,
+    ) -> list[dict]:
+        """
+        Rank recipes by used ingredients (desc) then missed ingredients (asc).
+        Output matches the RecipeRecommendation schema.
+        """
+        terms = {normalize_ingredient(item) for item in pantry} - {""}
+        postings = [p for p in (self._posting(term) for term in terms) if p is not None]
+        if not postings or not self.size:
+            return []
+
+        # Vectorized set intersection: how many pantry items each recipe uses
+        used = np.bincount(np.concatenate(postings), minlength=self.size)
+        mask = (used > 0) & self.mask([meal_type] if meal_type else None, diet, prep_range, exclude)
+
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            return []
+
+        used = used[candidates]
+        missed = np.maximum(self.ingredient_count[candidates] - used, 0)
+        score = used.astype(np.int64) * 100_000 - missed
+
+        # Top-k without sorting every candidate
+        if len(candidates) > number:
+            top = np.argpartition(-score, number - 1)[:number]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-score[top], kind="stable")]
+
+        return [
+            {
+                "id": self.spoonacular_ids[candidates[i]],
+                "title": self.titles[candidates[i]],
+                "image": self.images[candidates[i]],
+                "usedIngredientCount": int(used[i]),
+                "missedIngredientCount": int(missed[i]),
+            }
+            for i in top
+        ]
+
+    def jaccard_neighbors(self, spoonacular_id: int, names: set[str], number: int) -> list[dict]:
+        """
+        Exact ingredient-set Jaccard similarity of one recipe against the whole corpus.
+        """
+        postings = [self.postings[name] for name in names if name in self.postings]
+        if not postings or not self.size:
+            return []
+
+        shared = np.bincount(np.concatenate(postings), minlength=self.size)
+        union = self.ingredient_count + len(names) - shared
+        score = np.divide(shared, union, out=np.zeros(self.size), where=union > 0)
+        own = self.position_of.get(spoonacular_id)
+        if own is not None:
+            score[own] = 0
+
+        top = np.argpartition(-score, number - 1)[:number] if self.size > number else np.arange(self.size)
+        top = top[np.argsort(-score[top], kind="stable")]
+
+        return [
+            {
+                "id": self.spoonacular_ids[i],
+                "title": self.titles[i],
+                "image": self.images[i],
+                "score": float(score[i]),
+            }
+            for i in top if score[i] > 0
+        ]
+
+
+#       ------------------      Process-wide index lifecycle      ------------------
+
+_index: RecipeIndex | None = None
+_built_at = 0.0
+_dirty = False
+_rebuilding = False
+_lock = threading.Lock()
+
+
+def mark_dirty(*_):
+    global _dirty
+    _dirty = True
+
+
+def build_index(db: Session) -> RecipeIndex:
+    recipes = db.query(
+        Recipe.id, Recipe.spoonacular_id, Recipe.title, Recipe.image,
+        Recipe.meal_type, Recipe.diet, Recipe.prep_time,
+        *(getattr(Recipe, column) for column in NUTRIENT_COLUMNS),
+    ).all()
+    ingredient_rows = db.query(RecipeIngredient.recipe_id, RecipeIngredient.name, RecipeIngredient.ingredients).all()
+    return RecipeIndex(recipes, ingredient_rows)
+
+
+def _rebuild():
+    global _index, _built_at, _rebuilding
+    try:
+        db = SessionLocal()
+        try:
+            index = build_index(db)
+        finally:
+            db.close()
+        # Requests keep using the old index until this single reference swap
+        _index, _built_at = index, time.monotonic()
+    except Exception:
+        logger.exception("Recipe index rebuild failed")
+    finally:
+        _rebuilding = False
+
+
+def _start_rebuild():
+    global _rebuilding, _dirty
+    with _lock:
+        if _rebuilding:
+            return
+        _rebuilding = True
+        # Recipes written during the build mark it dirty again for the next one
+        _dirty = False
+    threading.Thread(target=_rebuild, name="recipe-index-build", daemon=True).start()
+
+
+def get_index(db: Session) -> RecipeIndex:
+    """
+    Current index. Only the first call builds it inline; afterwards a stale index (older than
+    MAX_INDEX_AGE, or new recipes cached and older than MIN_REBUILD_INTERVAL) is rebuilt in a
+    background thread while requests keep being answered from the current one.
+    """
+    global _index, _built_at, _dirty
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _dirty = False
+                _index = build_index(db)
+                _built_at = time.monotonic()
+        return _index
+
+    age = time.monotonic() - _built_at
+    if age >= MAX_INDEX_AGE or (_dirty and age >= MIN_REBUILD_INTERVAL):
+        _start_rebuild()
+    return _index
+
+
+bulk.after_recipes_written.append(mark_dirty)
@@ -0,0 +1,170 @@
+from sqlalchemy import case, delete, false, update
+from sqlalchemy.orm import Session
+from app.db import bulk
+from app.models.db_recipes import Recipe, RecipeIngredient
+from app.models.db_shopping import ShoppingListRecipe, ShoppingListItem
+from app.services.normalize import ingredient_name_from_text
+from app.services import units
+
+# Incremental shopping lists: adding or removing recipes only touches the items those recipes
+# contribute to. Each change is a signed delta (amount, recipe lines) per (name, unit), applied
+# with one upsert (amount = amount + delta); items whose recipe_count drops to 0 are deleted.
+# Items the user deletes are only hidden, so later deltas still land on a consistent row; adding a
+# recipe that needs the item again shows it again.
+# Each list recipe keeps the lines it added (ShoppingListRecipe.items): removing it subtracts exactly
+# those, even when enrichment changed the recipe's ingredients in between.
+
+UPSERT_BATCH_SIZE = 500
+
+
+def _line_key(row) -> tuple[str, str, float] | None:
+    name = row.name or ingredient_name_from_text(row.ingredients)
+    if not name:
+        return None
+    # Typed base amounts (g / ml / piece) merge "1 cup" with "2 tbsp"; otherwise keep the recipe unit
+    if row.base_unit and row.base_amount is not None:
+        return name, row.base_unit, row.base_amount
+    amount = row.amount if row.amount is not None else units.parse_quantity(row.quantity)
+    return name, units.normalize_unit(row.unit) or (row.unit or "").strip().lower(), amount or 0.0
+
+
+def _contributions(db: Session, recipe_ids: list[int]) -> dict[int, list[list]]:
+    # recipe id -> [[name, unit, amount], ...] from its current ingredients
+    lines = {recipe_id: [] for recipe_id in recipe_ids}
+    if not recipe_ids:
+        return lines
+    rows = (
+        db.query(RecipeIngredient.recipe_id, RecipeIngredient.name, RecipeIngredient.ingredients, RecipeIngredient.quantity,
+                 RecipeIngredient.unit, RecipeIngredient.amount, RecipeIngredient.base_unit, RecipeIngredient.base_amount)
+        .filter(RecipeIngredient.recipe_id.in_(recipe_ids))
+        .order_by(RecipeIngredient.id)
+    )
+    for row in rows:
+        key = _line_key(row)
+        if key is not None:
+            lines[row.recipe_id].append(list(key))
+    return lines
+
+
+def _add_deltas(deltas: dict[tuple[str, str], list], lines: list[list], sign: int):
+    for name, unit, amount in lines:
+        delta = deltas.setdefault((name, unit), [0.0, 0])
+        delta[0] += sign * amount
+        delta[1] += sign
+
+
+def _apply(db: Session, user_id: int, deltas: dict[tuple[str, str], list]) -> int:
+    rows = [
+        {"user_id": user_id, "name": name, "unit": unit, "amount": amount, "recipe_count": count}
+        for (name, unit), (amount, count) in deltas.items() if count or amount
+    ]
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        stmt = bulk.upsert_insert(db, ShoppingListItem).values(rows[start:start + UPSERT_BATCH_SIZE])
+        bulk.execute_upsert(db, stmt.on_conflict_do_update(
+            index_elements=["user_id", "name", "unit"],
+            set_={
+                "amount": ShoppingListItem.amount + stmt.excluded.amount,
+                "recipe_count": ShoppingListItem.recipe_count + stmt.excluded.recipe_count,
+                "hidden": case((stmt.excluded.recipe_count > 0, false()), else_=ShoppingListItem.hidden),
+            },
+        ))
+    if any(count < 0 for _, count in deltas.values()):
+        db.execute(
+            delete(ShoppingListItem)
+            .where(ShoppingListItem.user_id == user_id, ShoppingListItem.recipe_count <= 0)
+        )
+    return len(rows)
+
+
+def update_list(db: Session, user_id: int, add: list[int], remove: list[int]) -> dict:
+    """
+    Add and remove recipes (spoonacular ids) in one transaction.
+    Recipes already on (or not on) the list are skipped, so repeating a call changes nothing.
+    """
+    spoonacular_ids = set(add) | set(remove)
+    recipe_ids = dict(
+        db.query(Recipe.spoonacular_id, Recipe.id).filter(Recipe.spoonacular_id.in_(spoonacular_ids)).all()
+    ) if spoonacular_ids else {}
+
+    # Only recipes whose membership actually changed contribute a delta
+    deltas = {}
+    removed = []
+    to_remove = [recipe_ids[sid] for sid in dict.fromkeys(remove) if sid in recipe_ids]
+    if to_remove:
+        removed = db.execute(
+            delete(ShoppingListRecipe)
+            .where(ShoppingListRecipe.user_id == user_id, ShoppingListRecipe.recipe_id.in_(to_remove))
+            .returning(ShoppingListRecipe.recipe_id, ShoppingListRecipe.items)
+        ).all()
+        # Recipes added before contributions were stored: their current ingredients
+        current = _contributions(db, [recipe_id for recipe_id, items in removed if items is None])
+        for recipe_id, items in removed:
+            _add_deltas(deltas, items if items is not None else current[recipe_id], -1)
+
+    added = []
+    removing = set(remove)
+    to_add = [recipe_ids[sid] for sid in dict.fromkeys(add) if sid in recipe_ids and sid not in removing]
+    if to_add:
+        contributions = _contributions(db, to_add)
+        added = list(bulk.execute_upsert(
+            db,
+            bulk.upsert_insert(db, ShoppingListRecipe)
+            .values([
+                {"user_id": user_id, "recipe_id": recipe_id, "items": contributions[recipe_id]} for recipe_id in to_add
+            ])
+            .on_conflict_do_nothing(index_elements=["user_id", "recipe_id"])
+            .returning(ShoppingListRecipe.recipe_id)
+        ).scalars())
+        for recipe_id in added:
+            _add_deltas(deltas, contributions[recipe_id], 1)
+
+    changed = _apply(db, user_id, deltas)
+    db.commit()
+
+    return {
+        "added": len(added),
+        "removed": len(removed),
+        "items_changed": changed,
+        "unknown": sorted(sid for sid in spoonacular_ids if sid not in recipe_ids),
+    }
+
+
+def get_list(db: Session, user_id: int) -> dict:
+    items = (
+        db.query(ShoppingListItem.id, ShoppingListItem.name, ShoppingListItem.unit, ShoppingListItem.amount)
+        .filter(ShoppingListItem.user_id == user_id, ShoppingListItem.hidden.is_(False))
+        .order_by(ShoppingListItem.name, ShoppingListItem.unit)
+        .all()
+    )
+    recipes = (
+        db.query(Recipe.spoonacular_id)
+        .join(ShoppingListRecipe, ShoppingListRecipe.recipe_id == Recipe.id)
+        .filter(ShoppingListRecipe.user_id == user_id)
+        .order_by(ShoppingListRecipe.id)
+    )
+    return {
+        "recipes": [spoonacular_id for (spoonacular_id,) in recipes],
+        "items": [
+            {"id": item.id, "name": item.name, "unit": item.unit or None,
+             "amount": round(item.amount, 2) if item.amount > 1e-9 else None}
+            for item in items
+        ],
+    }
+
+
+def delete_item(db: Session, user_id: int, item_id: int) -> bool:
+    # Hidden, not deleted: amounts keep following recipe changes and the row goes with its last recipe
+    hidden = db.execute(
+        update(ShoppingListItem)
+        .where(ShoppingListItem.id == item_id, ShoppingListItem.user_id == user_id, ShoppingListItem.hidden.is_(False))
+        .values(hidden=True)
+    ).rowcount
+    db.commit()
+    return bool(hidden)
+
+
+def clear(db: Session, user_id: int, commit: bool = True):
+    db.execute(delete(ShoppingListItem).where(ShoppingListItem.user_id == user_id))
+    db.execute(delete(ShoppingListRecipe).where(ShoppingListRecipe.user_id == user_id))
+    if commit:
+        db.commit()
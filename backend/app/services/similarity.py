@@ -0,0 +1,256 @@
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal
+from app.db.bulk import upsert_insert, execute_upsert
+from app.models.db_recipes import Recipe, RecipeIngredient, SimilarRecipe
+from app.services import spoonacular, recipe_index
+from app.services.normalize import ingredient_name_from_text
+import argparse, asyncio, logging, zlib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Precomputed similar-recipe graph (SimilarRecipe rows = edges recipe -> similar spoonacular id).
+# Edges come from Spoonacular's /recipes/{id}/similar; when it has nothing, from local
+# ingredient overlap: exact Jaccard on the request path, MinHash + LSH for the corpus job.
+
+NUM_HASHES = 64
+BANDS = 16                  # 16 bands x 4 rows: pairs with Jaccard ~0.5 collide with p ~0.65
+MAX_BUCKET_SIZE = 500       # ignore degenerate LSH buckets (e.g. "salt, water" recipes)
+UPSTREAM_CONCURRENCY = 8
+BATCH_LIMIT = 500           # recipes per job run: one upstream call each, on the background quota
+
+_PRIME = 2147483647         # 2^31 - 1, so a * x + b stays inside uint64
+_rng = np.random.default_rng(1234)
+_HASH_A = _rng.integers(1, _PRIME, NUM_HASHES, dtype=np.uint64)
+_HASH_B = _rng.integers(0, _PRIME, NUM_HASHES, dtype=np.uint64)
+
+
+#       ------------------      Edge helpers      ------------------
+
+def edges_from_spoonacular(recipe_id: int, similar_data: list[dict]) -> list[dict]:
+    # Spoonacular returns its own ranking without a score: keep the order
+    return [
+        {
+            "recipe_id": recipe_id,
+            "similar_recipe_id": item["id"],
+            "title": item["title"],
+            "image": item.get("image"),
+            "score": 1.0 - position / (len(similar_data) + 1),
+            "source": "spoonacular",
+        }
+        for position, item in enumerate(similar_data)
+    ]
+
+
+def save_edges(db: Session, edges: list[dict], batch_size: int = 500):
+    for start in range(0, len(edges), batch_size):
+        execute_upsert(
+            db,
+            upsert_insert(db, SimilarRecipe)
+            .values(edges[start:start + batch_size])
+            .on_conflict_do_nothing(index_elements=["recipe_id", "similar_recipe_id"])
+        )
+    db.commit()
+
+
+def _ingredient_names(db: Session, recipe_ids: list[int] | None = None) -> dict[int, set[str]]:
+    names = {}
+    rows = db.query(RecipeIngredient.recipe_id, RecipeIngredient.name, RecipeIngredient.ingredients)
+    if recipe_ids is not None:
+        rows = rows.filter(RecipeIngredient.recipe_id.in_(recipe_ids))
+    for recipe_id, name, original in rows:
+        name = name or ingredient_name_from_text(original)
+        if name:
+            names.setdefault(recipe_id, set()).add(name)
+    return names
+
+
+def local_edges(db: Session, recipe: Recipe, number: int) -> list[dict]:
+    """
+    Exact Jaccard neighbours of one recipe, using the in-memory ingredient index.
+    """
+    names = _ingredient_names(db, [recipe.id]).get(recipe.id)
+    if not names:
+        return []
+    neighbours = recipe_index.get_index(db).jaccard_neighbors(recipe.spoonacular_id, names, number)
+    return [
+        {
+            "recipe_id": recipe.id,
+            "similar_recipe_id": item["id"],
+            "title": item["title"],
+            "image": item["image"],
+            "score": item["score"],
+            "source": "local",
+        }
+        for item in neighbours
+    ]
+
+
+#       ------------------      MinHash / LSH over the whole corpus      ------------------
+
+def minhash_signatures(sets: list[list[str]]) -> np.ndarray:
+    """
+    (n, NUM_HASHES) MinHash signature matrix; every set must be non-empty.
+    """
+    lengths = np.fromiter((len(s) for s in sets), dtype=np.int64, count=len(sets))
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    values = np.fromiter(
+        (zlib.crc32(name.encode()) % _PRIME for s in sets for name in s), dtype=np.uint64, count=int(lengths.sum())
+    )
+
+    signatures = np.empty((len(sets), NUM_HASHES), dtype=np.uint64)
+    # A few hash functions at a time keeps the (hashes x values) matrix small
+    for start in range(0, NUM_HASHES, 8):
+        a = _HASH_A[start:start + 8, None]
+        b = _HASH_B[start:start + 8, None]
+        hashed = (a * values[None, :] + b) % _PRIME
+        signatures[:, start:start + 8] = np.minimum.reduceat(hashed, offsets, axis=1).T
+    return signatures
+
+
+def minhash_neighbours(signatures: np.ndarray, targets: list[int], number: int) -> dict[int, list[tuple[int, float]]]:
+    """
+    Top-`number` (position, estimated Jaccard) neighbours for each target position, via LSH banding.
+    """
+    rows = NUM_HASHES // BANDS
+    candidates = {target: set() for target in targets}
+
+    for band in range(BANDS):
+        _, buckets = np.unique(signatures[:, band * rows:(band + 1) * rows], axis=0, return_inverse=True)
+        buckets = buckets.ravel()
+        order = np.argsort(buckets, kind="stable")
+        starts = np.searchsorted(buckets[order], buckets[targets], side="left")
+        ends = np.searchsorted(buckets[order], buckets[targets], side="right")
+        for target, start, end in zip(targets, starts, ends):
+            if 1 < end - start <= MAX_BUCKET_SIZE:
+                candidates[target].update(order[start:end].tolist())
+
+    neighbours = {}
+    for target, members in candidates.items():
+        members.discard(target)
+        if not members:
+            neighbours[target] = []
+            continue
+        members = np.fromiter(members, dtype=np.int64, count=len(members))
+        scores = (signatures[members] == signatures[target]).mean(axis=1)
+        top = np.argsort(-scores, kind="stable")[:number]
+        neighbours[target] = [(int(members[i]), float(scores[i])) for i in top if scores[i] > 0]
+    return neighbours
+
+
+def populate_local(db: Session, recipe_ids: list[int], number: int) -> int:
+    """
+    Write MinHash edges for the given recipes, comparing against every cached recipe.
+    """
+    corpus = db.query(Recipe.id, Recipe.spoonacular_id, Recipe.title, Recipe.image).all()
+    names = _ingredient_names(db)
+    corpus = [row for row in corpus if row.id in names]
+    if not corpus:
+        return 0
+
+    signatures = minhash_signatures([sorted(names[row.id]) for row in corpus])
+    position_of = {row.id: position for position, row in enumerate(corpus)}
+    targets = [position_of[recipe_id] for recipe_id in recipe_ids if recipe_id in position_of]
+
+    edges = [
+        {
+            "recipe_id": corpus[target].id,
+            "similar_recipe_id": corpus[position].spoonacular_id,
+            "title": corpus[position].title,
+            "image": corpus[position].image,
+            "score": score,
+            "source": "local",
+        }
+        for target, found in minhash_neighbours(signatures, targets, number).items()
+        for position, score in found
+    ]
+    save_edges(db, edges)
+    return len(edges)
+
+
+#       ------------------      Background job      ------------------
+
+def _recipes_without_edges(db: Session, limit: int):
+    query = (
+        db.query(Recipe.id, Recipe.spoonacular_id)
+        .outerjoin(SimilarRecipe, SimilarRecipe.recipe_id == Recipe.id)
+        .filter(SimilarRecipe.id.is_(None))
+        .order_by(Recipe.id)
+    )
+    return query.limit(limit).all()
+
+
+async def populate_similar_recipes(number: int = 10, limit: int = BATCH_LIMIT, use_upstream: bool = True):
+    """
+    Fill the SimilarRecipe table for up to `limit` cached recipes that have no edges yet.
+    Run it again (cron) for the next batch.
+    """
+    db = SessionLocal()
+    try:
+        pending = await run_in_threadpool(_recipes_without_edges, db, limit)
+        without_upstream = [recipe_id for recipe_id, _ in pending]
+
+        deferred = []
+        if use_upstream and pending:
+            semaphore = asyncio.Semaphore(UPSTREAM_CONCURRENCY)
+            quota_limited = False
+
+            async def fetch(spoonacular_id: int):
+                nonlocal quota_limited
+                async with semaphore:
+                    if quota_limited:
+                        return None
+                    try:
+                        return await spoonacular.get_json(
+                            f"/recipes/{spoonacular_id}/similar", {"number": number}, priority="background"
+                        )
+                    except HTTPException as error:
+                        if error.status_code == 503:
+                            # Quota or rate limit: leave the rest for the next run instead of local edges
+                            quota_limited = True
+                            return None
+                        return []
+
+            results = await asyncio.gather(*(fetch(spoonacular_id) for _, spoonacular_id in pending))
+            edges = []
+            without_upstream = []
+            for (recipe_id, _), similar_data in zip(pending, results):
+                if similar_data is None:
+                    deferred.append(recipe_id)
+                elif similar_data:
+                    edges.extend(edges_from_spoonacular(recipe_id, similar_data))
+                else:
+                    without_upstream.append(recipe_id)
+            await run_in_threadpool(save_edges, db, edges)
+
+        local_count = 0
+        if without_upstream:
+            local_count = await run_in_threadpool(populate_local, db, without_upstream, number)
+
+        logger.info(
+            "Similar recipes: %d recipes processed, %d without upstream data, %d local edges, %d deferred (quota)",
+            len(pending) - len(deferred), len(without_upstream), local_count, len(deferred),
+        )
+    finally:
+        db.close()
+
+
+async def _main(args):
+    try:
+        await populate_similar_recipes(args.number, args.limit, use_upstream=not args.local_only)
+    finally:
+        await spoonacular.close_client()
+
+
+if __name__ == "__main__":
+    # python -m app.services.similarity [--number 10] [--limit 500] [--local-only]
+    parser = argparse.ArgumentParser(description="Populate the similar-recipe graph")
+    parser.add_argument("--number", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=BATCH_LIMIT)
+    parser.add_argument("--local-only", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(args))
@@ -0,0 +1,221 @@
+from fastapi import HTTPException
+from dotenv import load_dotenv
+from app.services.cache import TTLCache, MISSING, make_key
+from app.services.quota import QuotaScheduler, INTERACTIVE
+from app.services.normalize import normalize_ingredient, join_tags
+from app.services import units
+from typing import TYPE_CHECKING
+import os, re
+
+if TYPE_CHECKING:
+    import httpx
+
+# Import environment variables
+load_dotenv()
+
+API_KEY = os.getenv("SPOONACULAR_API_KEY")
+BASE_URL = "https://api.spoonacular.com"
+
+# Client config (seconds / connection counts)
+REQUEST_TIMEOUT = float(os.getenv("SPOONACULAR_TIMEOUT", "10"))
+CONNECT_TIMEOUT = float(os.getenv("SPOONACULAR_CONNECT_TIMEOUT", "5"))
+MAX_CONNECTIONS = int(os.getenv("SPOONACULAR_MAX_CONNECTIONS", "200"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("SPOONACULAR_MAX_KEEPALIVE", "50"))
+
+# Response cache: (path pattern, ttl, stale_ttl) in seconds. Unlisted paths (e.g. /recipes/random) are never cached.
+CACHE_SIZE = int(os.getenv("SPOONACULAR_CACHE_SIZE", "2048"))
+CACHE_POLICIES = [
+    (re.compile(r"^/recipes/complexSearch$"), 600, 3600),
+    (re.compile(r"^/recipes/findByIngredients$"), 600, 3600),
+    (re.compile(r"^/recipes/\d+/similar$"), 86400, 7 * 86400),
+    (re.compile(r"^/recipes/\d+/information$"), 86400, 7 * 86400),
+    (re.compile(r"^/food/ingredients/search$"), 3600, 86400),
+    (re.compile(r"^/food/ingredients/substitutes$"), 86400, 7 * 86400),
+    (re.compile(r"^/food/ingredients/\d+/information$"), 86400, 7 * 86400),
+    (re.compile(r"^/food/products/search$"), 3600, 86400),
+]
+
+response_cache = TTLCache(maxsize=CACHE_SIZE)
+
+# Upstream budget, per worker process: requests/second + burst, and the points (X-API-Quota-Left)
+# below which background jobs pause and, lower still, everything is answered from the cache only
+scheduler = QuotaScheduler(
+    rate=float(os.getenv("SPOONACULAR_RATE", "5")),
+    burst=int(os.getenv("SPOONACULAR_BURST", "10")),
+    min_points=float(os.getenv("SPOONACULAR_MIN_POINTS", "2")),
+    background_reserve=float(os.getenv("SPOONACULAR_BACKGROUND_RESERVE", "30")),
+    max_wait=float(os.getenv("SPOONACULAR_MAX_WAIT", "2")),
+    background_max_wait=float(os.getenv("SPOONACULAR_BACKGROUND_MAX_WAIT", "60")),
+)
+
+# One pooled client per worker process, created on first use (httpx is imported then too, not at boot)
+_client: "httpx.AsyncClient | None" = None
+
+
+def get_client() -> "httpx.AsyncClient":
+    global _client
+    if _client is None or _client.is_closed:
+        import httpx
+        _client = httpx.AsyncClient(
+            base_url=BASE_URL,
+            timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _cache_policy(path: str):
+    for pattern, ttl, stale_ttl in CACHE_POLICIES:
+        if pattern.match(path):
+            return ttl, stale_ttl
+    return None
+
+
+async def _fetch_json(path: str, params: dict | None, error_detail: str, timeout: float | None, priority: str):
+    import httpx
+
+    await scheduler.acquire(priority)
+
+    request_params = {**(params or {}), "apiKey": API_KEY}
+    request_timeout = httpx.Timeout(timeout, connect=CONNECT_TIMEOUT) if timeout else httpx.USE_CLIENT_DEFAULT
+
+    try:
+        response = await get_client().get(path, params=request_params, timeout=request_timeout)
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail="Spoonacular API timed out")
+    except httpx.HTTPError:
+        raise HTTPException(status_code=502, detail="Could not reach Spoonacular API")
+
+    scheduler.record(response.status_code, response.headers)
+    # Out of points / rate limited: callers see a retryable 503, not a generic 500
+    if response.status_code == 402:
+        raise scheduler.unavailable()
+    if response.status_code == 429:
+        raise scheduler.unavailable("Too many requests to the recipe service, please retry", until_reset=False)
+
+    # Unknown id upstream: let routes answer 404 instead of a server error
+    if response.status_code == 404:
+        raise HTTPException(status_code=404, detail=error_detail)
+    if response.status_code != 200:
+        raise HTTPException(status_code=500, detail=error_detail)
+
+    return response.json()
+
+
+async def get_json(
+    path: str,
+    params: dict | None = None,
+    error_detail: str = "Error fetching data from API",
+    timeout: float | None = None,
+    priority: str = INTERACTIVE,
+):
+    """
+    GET a Spoonacular endpoint and return the decoded JSON body.
+    Non-200 answers are raised as HTTPException(500, error_detail), or 404 when upstream answered 404.
+    Cacheable paths (CACHE_POLICIES) are served from response_cache, and
+    concurrent identical misses share a single upstream request.
+    Calls go through the quota scheduler; priority="background" for jobs.
+    When the budget is nearly spent, cached (even stale) answers are served
+    and anything else is a 503 with Retry-After.
+    """
+    policy = _cache_policy(path)
+
+    if not scheduler.allows(priority):
+        cached = response_cache.get(make_key(path, params), allow_stale=True) if policy else MISSING
+        if cached is MISSING:
+            scheduler.rejected[priority] += 1
+            raise scheduler.unavailable()
+        scheduler.cache_only_answers += 1
+        return cached
+
+    if policy is None:
+        return await _fetch_json(path, params, error_detail, timeout, priority)
+
+    ttl, stale_ttl = policy
+    key = make_key(path, params)
+    return await response_cache.get_or_fetch(
+        key,
+        lambda: _fetch_json(path, params, error_detail, timeout, priority),
+        ttl,
+        stale_ttl,
+        # Per-priority flights: a user request must not wait behind a job's call in the background queue
+        flight=(key, priority),
+    )
+
+
+#     ------------------      Spoonacular payload -> row dicts (see app/db/bulk.py)      ------------------
+
+def recipe_row(item: dict) -> dict:
+    row = {
+        "spoonacular_id": item["id"],
+        "title": item["title"],
+        "image": item.get("image"),
+        "instructions": item.get("instructions") or None,
+        # Filter columns; only present in full recipe payloads (information, informationBulk, random)
+        "meal_type": join_tags(item.get("dishTypes")),
+        "diet": join_tags(item.get("diets")),
+        "cuisine": join_tags(item.get("cuisines")),
+        "prep_time": item.get("readyInMinutes"),
+        "servings": item.get("servings"),
+        "likes": item.get("aggregateLikes"),
+        **_recipe_nutrition(item),
+    }
+    if "extendedIngredients" in item:
+        row["ingredients"] = [_recipe_ingredient_row(ing) for ing in item["extendedIngredients"]]
+    return row
+
+
+# Spoonacular nutrient name -> Recipe column (per serving; payloads requested with includeNutrition=true)
+RECIPE_NUTRIENTS = {"Calories": "calories", "Protein": "protein", "Carbohydrates": "carbs", "Fat": "fat"}
+
+
+def _recipe_nutrition(item: dict) -> dict:
+    values = dict.fromkeys(RECIPE_NUTRIENTS.values())
+    for nutrient in (item.get("nutrition") or {}).get("nutrients", []):
+        column = RECIPE_NUTRIENTS.get(nutrient.get("name"))
+        if column:
+            values[column] = nutrient.get("amount")
+    return values
+
+
+def _recipe_ingredient_row(ing: dict) -> dict:
+    name = normalize_ingredient(ing.get("nameClean") or ing.get("name"))
+    amount = units.parse_quantity(ing.get("amount"))
+    base_unit, base_amount = units.to_base(amount, ing.get("unit", ""), name)
+    return {
+        "ingredients": ing["original"],
+        "name": name,
+        "spoonacular_ingredient_id": ing.get("id"),
+        "quantity": str(ing.get("amount", "")),
+        "unit": ing.get("unit", ""),
+        "amount": amount,
+        "base_unit": base_unit,
+        "base_amount": base_amount,
+    }
+
+
+def ingredient_row(item: dict) -> dict:
+    return {
+        "spoonacular_id": item["id"],
+        "name": item["name"],
+        "image": item.get("image"),
+    }
+
+
+def product_row(item: dict) -> dict:
+    return {
+        "spoonacular_id": item["id"],
+        "title": item["title"],
+        "image": item.get("image"),
+        "image_type": item.get("imageType"),
+    }
@@ -0,0 +1,236 @@
+from functools import lru_cache
+from app.services.normalize import name_suffixes
+import re, unicodedata
+
+# Local unit conversion: no Spoonacular /recipes/convert calls.
+# Every unit belongs to a dimension with a base unit (mass -> g, volume -> ml, count -> piece).
+# Mass <-> volume goes through the ingredient's density (g/ml); count -> mass through a
+# per-piece weight. Recipe ingredient rows store amount + base_unit/base_amount at ingestion.
+
+MASS, VOLUME, COUNT = "mass", "volume", "count"
+BASE_UNITS = {MASS: "g", VOLUME: "ml", COUNT: "piece"}
+
+# canonical unit -> (dimension, size in the base unit)
+UNITS = {
+    "mg": (MASS, 0.001), "g": (MASS, 1.0), "kg": (MASS, 1000.0),
+    "oz": (MASS, 28.349523), "lb": (MASS, 453.59237),
+    "ml": (VOLUME, 1.0), "cl": (VOLUME, 10.0), "dl": (VOLUME, 100.0), "l": (VOLUME, 1000.0),
+    "tsp": (VOLUME, 4.92892159375), "tbsp": (VOLUME, 14.78676478125), "fl oz": (VOLUME, 29.5735295625),
+    "cup": (VOLUME, 236.5882365), "pint": (VOLUME, 473.176473), "quart": (VOLUME, 946.352946),
+    "gallon": (VOLUME, 3785.411784), "pinch": (VOLUME, 0.308), "dash": (VOLUME, 0.616),
+    "piece": (COUNT, 1.0), "clove": (COUNT, 1.0), "slice": (COUNT, 1.0), "can": (COUNT, 1.0),
+    "package": (COUNT, 1.0), "bunch": (COUNT, 1.0), "serving": (COUNT, 1.0), "stalk": (COUNT, 1.0),
+    "head": (COUNT, 1.0), "sprig": (COUNT, 1.0), "leaf": (COUNT, 1.0),
+}
+
+ALIASES = {
+    "": "piece", "milligram": "mg", "milligrams": "mg", "gram": "g", "grams": "g", "gr": "g",
+    "kilogram": "kg", "kilograms": "kg", "kgs": "kg", "ounce": "oz", "ounces": "oz",
+    "pound": "lb", "pounds": "lb", "lbs": "lb",
+    "milliliter": "ml", "milliliters": "ml", "millilitre": "ml", "millilitres": "ml", "mls": "ml",
+    "liter": "l", "liters": "l", "litre": "l", "litres": "l",
+    "teaspoon": "tsp", "teaspoons": "tsp", "tsps": "tsp", "t": "tsp",
+    "tablespoon": "tbsp", "tablespoons": "tbsp", "tbsps": "tbsp", "tbs": "tbsp", "tb": "tbsp",
+    "fluid ounce": "fl oz", "fluid ounces": "fl oz", "floz": "fl oz",
+    "cups": "cup", "c": "cup", "pints": "pint", "pt": "pint", "quarts": "quart", "qt": "quart",
+    "gallons": "gallon", "gal": "gallon", "pinches": "pinch", "dashes": "dash",
+    "pieces": "piece", "pc": "piece", "pcs": "piece", "whole": "piece", "large": "piece",
+    "medium": "piece", "small": "piece", "cloves": "clove", "slices": "slice", "cans": "can",
+    "packages": "package", "pkg": "package", "bunches": "bunch", "servings": "serving",
+    "stalks": "stalk", "heads": "head", "sprigs": "sprig", "leaves": "leaf",
+}
+
+# g/ml, by normalized ingredient name (longest matching suffix wins: "extra virgin olive oil" -> "olive oil")
+DENSITIES = {
+    "water": 1.0, "milk": 1.03, "buttermilk": 1.03, "cream": 1.01, "heavy cream": 0.99, "yogurt": 1.03,
+    "butter": 0.96, "oil": 0.92, "olive oil": 0.91, "honey": 1.42, "maple syrup": 1.32, "syrup": 1.33,
+    "flour": 0.53, "all purpose flour": 0.53, "whole wheat flour": 0.51, "almond flour": 0.41,
+    "sugar": 0.85, "brown sugar": 0.93, "powdered sugar": 0.51, "salt": 1.22, "kosher salt": 0.54,
+    "baking powder": 0.9, "baking soda": 0.92, "cocoa powder": 0.42, "rice": 0.85, "oat": 0.41,
+    "rolled oat": 0.41, "breadcrumb": 0.45, "cheese": 0.45, "parmesan cheese": 0.42, "peanut butter": 1.09,
+    "vinegar": 1.01, "soy sauce": 1.15, "broth": 1.0, "stock": 1.0, "juice": 1.04, "lemon juice": 1.03,
+    "wine": 0.99, "ketchup": 1.15, "mayonnaise": 0.91, "tomato sauce": 1.03, "coconut milk": 0.97,
+}
+
+# grams per piece, by normalized ingredient name (same suffix matching), optionally per count unit
+PIECE_WEIGHTS = {
+    "egg": 50.0, "garlic": 5.0, ("garlic", "clove"): 5.0, "onion": 110.0, "shallot": 30.0,
+    "tomato": 120.0, "potato": 170.0, "carrot": 60.0, "lemon": 85.0, "lime": 65.0, "apple": 180.0,
+    "banana": 120.0, "avocado": 170.0, "bell pepper": 120.0, "chicken breast": 170.0,
+    ("bread", "slice"): 30.0, ("bacon", "slice"): 12.0, ("celery", "stalk"): 40.0,
+}
+
+
+class ConversionError(ValueError):
+    pass
+
+
+#       ------------------      Parsing      ------------------
+
+# "1 1/2" | "3/4" | "2" / "0.25"
+_NUMBER = re.compile(r"(\d+)\s+(\d+)/(\d+)|(\d+)/(\d+)|(\d+(?:\.\d+)?)")
+
+
+def parse_quantity(text) -> float | None:
+    """
+    "2" -> 2.0, "1 1/2" -> 1.5, "½" -> 0.5, "1½" -> 1.5, "2-3" -> 2.5 (ranges average), "" -> None.
+    """
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    text = "".join(
+        f" {unicodedata.numeric(char)} " if unicodedata.category(char) == "No" else char for char in str(text)
+    )
+    values = []
+    for part in re.split(r"\s*(?:-|–|\bto\b)\s*", text.strip())[:2]:
+        total, found = 0.0, False
+        for match in _NUMBER.finditer(part):
+            whole, numerator, denominator, fraction_n, fraction_d, number = match.groups()
+            if number is not None:
+                total += float(number)
+            elif whole is not None:
+                total += int(whole) + (int(numerator) / int(denominator) if int(denominator) else 0)
+            elif int(fraction_d):
+                total += int(fraction_n) / int(fraction_d)
+            found = True
+        if found:
+            values.append(total)
+    return sum(values) / len(values) if values else None
+
+
+@lru_cache(maxsize=1024)
+def normalize_unit(unit: str | None) -> str | None:
+    raw = (unit or "").strip().rstrip(".")
+    # Recipe shorthand: capital T = tablespoon, lowercase t = teaspoon
+    if raw == "T":
+        return "tbsp"
+    lowered = " ".join(raw.lower().split())
+    canonical = ALIASES.get(lowered, lowered)
+    return canonical if canonical in UNITS else None
+
+
+def dimension(unit: str | None) -> str | None:
+    canonical = normalize_unit(unit)
+    return UNITS[canonical][0] if canonical else None
+
+
+def _lookup(table: dict, ingredient: str | None, unit: str | None = None):
+    for name in name_suffixes(ingredient):
+        if unit and (name, unit) in table:
+            return table[(name, unit)]
+        if name in table:
+            return table[name]
+    return None
+
+
+#       ------------------      Conversion      ------------------
+
+@lru_cache(maxsize=4096)
+def _factor(from_unit: str, to_unit: str, ingredient: str | None) -> float:
+    source, target = normalize_unit(from_unit), normalize_unit(to_unit)
+    if source is None:
+        raise ConversionError(f"Unknown unit: {from_unit}")
+    if target is None:
+        raise ConversionError(f"Unknown unit: {to_unit}")
+
+    (source_dim, source_size), (target_dim, target_size) = UNITS[source], UNITS[target]
+    if source_dim == target_dim:
+        if source_dim == COUNT and source != target and target != "piece":
+            raise ConversionError(f"Cannot convert {source} to {target}")
+        return source_size / target_size
+
+    # Through grams: count -> mass (piece weight), volume <-> mass (density)
+    if source_dim == COUNT:
+        weight = _lookup(PIECE_WEIGHTS, ingredient, source)
+        if weight is None:
+            raise ConversionError(f"No piece weight for {ingredient or 'this ingredient'}")
+        grams_per_source = weight * source_size
+    elif source_dim == VOLUME:
+        density = _lookup(DENSITIES, ingredient)
+        if density is None:
+            raise ConversionError(f"No density for {ingredient or 'this ingredient'}")
+        grams_per_source = source_size * density
+    else:
+        grams_per_source = source_size
+
+    if target_dim == MASS:
+        return grams_per_source / target_size
+    if target_dim == VOLUME:
+        density = _lookup(DENSITIES, ingredient)
+        if density is None:
+            raise ConversionError(f"No density for {ingredient or 'this ingredient'}")
+        return grams_per_source / density / target_size
+    raise ConversionError(f"Cannot convert {source} to {target}")
+
+
+def convert(amount, from_unit: str | None, to_unit: str, ingredient: str | None = None) -> float:
+    value = parse_quantity(amount)
+    if value is None:
+        raise ConversionError(f"Invalid amount: {amount}")
+    return value * _factor(from_unit or "", to_unit, ingredient or None)
+
+
+def to_base(amount, unit: str | None, ingredient: str | None = None) -> tuple[str | None, float | None]:
+    """
+    (base unit, amount in it) for storage; mass and volume stay in their own dimension.
+    """
+    value = parse_quantity(amount)
+    canonical = normalize_unit(unit)
+    if value is None or canonical is None:
+        return None, None
+    dim, size = UNITS[canonical]
+    if dim == COUNT:
+        # A known piece weight turns "2 cloves garlic" into grams, which aggregates better
+        weight = _lookup(PIECE_WEIGHTS, ingredient, canonical)
+        if weight is not None:
+            return "g", value * weight
+    return BASE_UNITS[dim], value * size
+
+
+def grams(amount, unit: str | None, ingredient: str | None = None) -> float | None:
+    try:
+        return convert(amount, unit, "g", ingredient)
+    except ConversionError:
+        return None
+
+
+def line_grams(row) -> float | None:
+    # Grams of one RecipeIngredient row: stored base amount when it is already mass, else convert
+    if row.base_unit == "g" and row.base_amount is not None:
+        return row.base_amount
+    return grams(row.amount if row.amount is not None else row.quantity, row.unit, row.name)
+
+
+#       ------------------      Backfill of typed columns      ------------------
+
+def backfill_recipe_ingredients(db, batch_size: int = 1000) -> int:
+    """
+    Fill amount/base_unit/base_amount for RecipeIngredient rows written before those columns existed.
+    """
+    from sqlalchemy import update
+    from app.models.db_recipes import RecipeIngredient
+
+    updated, last_id = 0, 0
+    while True:
+        rows = (
+            db.query(RecipeIngredient.id, RecipeIngredient.quantity, RecipeIngredient.unit, RecipeIngredient.name)
+            .filter(RecipeIngredient.id > last_id, RecipeIngredient.amount.is_(None))
+            .order_by(RecipeIngredient.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return updated
+        last_id = rows[-1].id
+        values = []
+        for row in rows:
+            amount = parse_quantity(row.quantity)
+            if amount is None:
+                continue
+            base_unit, base_amount = to_base(amount, row.unit, row.name)
+            values.append({"id": row.id, "amount": amount, "base_unit": base_unit, "base_amount": base_amount})
+        if values:
+            db.execute(update(RecipeIngredient), values)
+            db.commit()
+            updated += len(values)
@@ -0,0 +1,324 @@
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal
+from app.db import bulk
+from app.models.db_recipes import Ingredient, Recipe, RecipeIngredient
+from app.models.db_wine import WinePairing, WineLookup
+from app.services import jobs, spoonacular
+from app.services.normalize import name_suffixes, split_tags
+from datetime import datetime
+import argparse, asyncio, logging, math, os, threading, time
+
+logger = logging.getLogger(__name__)
+
+# Wine pairing: answers come from the wine_pairings table through an in-memory index
+# (dish -> wines, wine -> dishes). Terms never looked up are queued as background jobs that call
+# /food/wine/pairing or /food/wine/dishes once; the request gets 202 meanwhile. Only terms from a
+# known vocabulary are queued (foods, cuisines, cached ingredients, wines), so arbitrary input
+# cannot fill the job queue or spend upstream points.
+# Cached recipes queue their cuisine and main ingredient as they are written.
+
+DISH, WINE = "dish", "wine"
+JOB_KINDS = {DISH: "wine_pairing", WINE: "wine_dishes"}
+WINE_BATCH_SIZE = int(os.getenv("WINE_BATCH_SIZE", "5"))
+
+# Rebuild after this long, to pick up rows written by a separate worker process (seconds)
+MAX_INDEX_AGE = 600
+# A lookup whose job failed every attempt is answered as failed for this long, then queued again (seconds)
+FAILED_LOOKUP_COOLDOWN = 3600
+
+# Ingredients worth a pairing lookup when they appear in a recipe (first match = main ingredient)
+WINE_FOODS = {
+    "beef", "steak", "veal", "lamb", "pork", "ham", "sausage", "venison", "chicken", "turkey", "duck",
+    "salmon", "tuna", "cod", "fish", "shrimp", "lobster", "crab", "scallop", "mussel", "oyster",
+    "mushroom", "cheese", "goat cheese", "blue cheese", "pasta", "pizza", "chocolate", "tofu",
+}
+# Spoonacular's cuisines, also accepted as dishes
+CUISINES = {
+    "african", "american", "asian", "british", "cajun", "caribbean", "chinese", "eastern european", "european",
+    "french", "german", "greek", "indian", "irish", "italian", "japanese", "jewish", "korean", "latin american",
+    "mediterranean", "mexican", "middle eastern", "nordic", "southern", "spanish", "thai", "vietnamese",
+}
+# Wines accepted for a dishes lookup, besides any wine already paired with a dish
+WINES = {
+    "white wine", "dry white wine", "red wine", "dry red wine", "rose wine", "sparkling wine", "dessert wine",
+    "albarino", "assyrtiko", "chardonnay", "chenin blanc", "gewurztraminer", "gruener veltliner", "moscato",
+    "muscadet", "pinot blanc", "pinot grigio", "riesling", "dry riesling", "sauvignon blanc", "semillon",
+    "soave", "torrontes", "verdejo", "vermentino", "viognier", "white burgundy", "white bordeaux", "sauternes",
+    "aglianico", "barbera wine", "bordeaux", "cabernet franc", "cabernet sauvignon", "carmenere", "gamay",
+    "grenache", "lambrusco", "malbec", "merlot", "montepulciano", "nebbiolo", "nero d'avola", "petite sirah",
+    "pinot noir", "pinotage", "primitivo", "rioja", "sangiovese", "shiraz", "syrah", "tempranillo", "zinfandel",
+    "champagne", "cava", "prosecco", "port", "sherry", "madeira", "marsala",
+}
+
+
+def normalize_term(term: str | None) -> str:
+    return " ".join((term or "").lower().replace("_", " ").split())
+
+
+class PairingIndex:
+    def __init__(self, pairings: list, lookups: list):
+        # Insertion-ordered sets: first answers from Spoonacular come first
+        self.wines: dict[str, dict[str, None]] = {}
+        self.dishes: dict[str, dict[str, None]] = {}
+        self.texts: dict[str, dict[str, str | None]] = {DISH: {}, WINE: {}}
+        for dish, wine in pairings:
+            self.add_pairing(dish, wine)
+        for kind, term, text in lookups:
+            self.texts[kind][term] = text
+
+    def add_pairing(self, dish: str, wine: str):
+        self.wines.setdefault(dish, {})[wine] = None
+        self.dishes.setdefault(wine, {})[dish] = None
+
+    def add_lookup(self, kind: str, term: str, values: list[str], text: str | None):
+        for value in values:
+            if kind == DISH:
+                self.add_pairing(term, value)
+            else:
+                self.add_pairing(value, term)
+        self.texts[kind][term] = text
+
+    def get(self, kind: str, term: str) -> tuple[bool, list[str], str | None]:
+        """
+        (looked up already, paired terms, description)
+        """
+        paired = (self.wines if kind == DISH else self.dishes).get(term, {})
+        return term in self.texts[kind], list(paired), self.texts[kind].get(term)
+
+
+#       ------------------      Process-wide index lifecycle      ------------------
+
+_index: PairingIndex | None = None
+_built_at = 0.0
+_rebuilding = False
+_lock = threading.Lock()
+
+
+def build_index(db: Session) -> PairingIndex:
+    pairings = db.query(WinePairing.dish, WinePairing.wine).order_by(WinePairing.id).all()
+    lookups = db.query(WineLookup.kind, WineLookup.term, WineLookup.text).all()
+    return PairingIndex(pairings, lookups)
+
+
+def _rebuild():
+    global _index, _built_at, _rebuilding
+    try:
+        db = SessionLocal()
+        try:
+            index = build_index(db)
+        finally:
+            db.close()
+        # Lookups saved during the build are found again by the miss path (_load_term)
+        _index, _built_at = index, time.monotonic()
+    except Exception:
+        logger.exception("Wine pairing index rebuild failed")
+    finally:
+        _rebuilding = False
+
+
+def _start_rebuild():
+    global _rebuilding
+    with _lock:
+        if _rebuilding:
+            return
+        _rebuilding = True
+    threading.Thread(target=_rebuild, name="wine-index-build", daemon=True).start()
+
+
+def get_index(db: Session) -> PairingIndex:
+    """
+    Current index. Only the first call builds it inline; afterwards an index older than
+    MAX_INDEX_AGE is rebuilt in a background thread while requests use the current one.
+    """
+    global _index, _built_at
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = build_index(db)
+                _built_at = time.monotonic()
+        return _index
+    if time.monotonic() - _built_at >= MAX_INDEX_AGE:
+        _start_rebuild()
+    return _index
+
+
+def _load_term(db: Session, index: PairingIndex, kind: str, term: str) -> bool:
+    # Miss path only: another process may have fetched it since the last build
+    lookup = db.query(WineLookup.text).filter(WineLookup.kind == kind, WineLookup.term == term).first()
+    if lookup is None:
+        return False
+    column, other = (WinePairing.dish, WinePairing.wine) if kind == DISH else (WinePairing.wine, WinePairing.dish)
+    values = [value for (value,) in db.query(other).filter(column == term).order_by(WinePairing.id)]
+    index.add_lookup(kind, term, values, lookup.text)
+    return True
+
+
+def known_term(db: Session, index: PairingIndex, kind: str, term: str) -> bool:
+    # Vocabulary for new lookups: fixed lists, terms already paired, then cached ingredient names
+    if kind == WINE:
+        return term in WINES or term in index.dishes
+    if term in WINE_FOODS or term in CUISINES or term in index.wines:
+        return True
+    return db.query(
+        db.query(Ingredient.id).filter(Ingredient.name == term).exists()
+        | db.query(RecipeIngredient.id).filter(RecipeIngredient.name == term).exists()
+    ).scalar()
+
+
+def lookup(db: Session, kind: str, term: str) -> dict:
+    """
+    Pairings for a dish (kind=DISH) or a wine (kind=WINE). status "pending" means a fetch was queued;
+    "failed" means the last fetch gave up, with retry_after seconds until it is queued again;
+    "unknown" means the term is outside the vocabulary and nothing was queued.
+    """
+    index = get_index(db)
+    found, values, text = index.get(kind, term)
+    if not found and _load_term(db, index, kind, term):
+        found, values, text = index.get(kind, term)
+    if found:
+        return {"values": values, "text": text, "status": "ready"}
+    if not known_term(db, index, kind, term):
+        return {"values": [], "text": None, "status": "unknown"}
+
+    failed_at = jobs.failed_at(db, JOB_KINDS[kind], term)
+    if failed_at is None:
+        jobs.enqueue(db, JOB_KINDS[kind], [term])
+    else:
+        wait = FAILED_LOOKUP_COOLDOWN - (datetime.utcnow() - failed_at).total_seconds()
+        if wait > 0:
+            return {"values": [], "text": None, "status": "failed", "retry_after": math.ceil(wait)}
+        jobs.retry_failed(db, JOB_KINDS[kind], [term])
+    return {"values": [], "text": None, "status": "pending"}
+
+
+#       ------------------      Background fetch      ------------------
+
+def save_lookups(db: Session, kind: str, results: list[tuple[str, list[str], str | None]]):
+    edges = [
+        {"dish": term, "wine": value, "source": kind} if kind == DISH else {"dish": value, "wine": term, "source": kind}
+        for term, values, _ in results for value in values
+    ]
+    if edges:
+        bulk.execute_upsert(db, bulk.upsert_insert(db, WinePairing).values(edges).on_conflict_do_nothing(index_elements=["dish", "wine"]))
+    bulk.execute_upsert(
+        db,
+        bulk.upsert_insert(db, WineLookup)
+        .values([{"kind": kind, "term": term, "text": text} for term, _, text in results])
+        .on_conflict_do_nothing(index_elements=["kind", "term"])
+    )
+    db.commit()
+    if _index is not None:
+        for term, values, text in results:
+            _index.add_lookup(kind, term, values, text)
+
+
+def _known_terms(kind: str, terms: list[str]) -> set[str]:
+    db = SessionLocal()
+    try:
+        return {term for (term,) in db.query(WineLookup.term).filter(WineLookup.kind == kind, WineLookup.term.in_(terms))}
+    finally:
+        db.close()
+
+
+def _save(kind: str, results: list):
+    db = SessionLocal()
+    try:
+        save_lookups(db, kind, results)
+    finally:
+        db.close()
+
+
+async def _fetch(kind: str, term: str) -> tuple[str, list[str], str | None]:
+    if kind == DISH:
+        data = await spoonacular.get_json(
+            "/food/wine/pairing", {"food": term}, error_detail="Error fetching wine pairing", priority="background"
+        )
+        values, text = data.get("pairedWines"), data.get("pairingText")
+    else:
+        data = await spoonacular.get_json(
+            "/food/wine/dishes", {"wine": term}, error_detail="Error fetching wine dishes", priority="background"
+        )
+        values, text = data.get("pairings"), data.get("text")
+    # Unknown terms come back as {"status": "failure", "message": ...}: stored as an empty answer
+    return term, [normalize_term(value) for value in values or [] if value], text or data.get("message")
+
+
+async def _fetch_batch(kind: str, keys: list[str]):
+    known = await run_in_threadpool(_known_terms, kind, keys)
+    results = await asyncio.gather(*(_fetch(kind, key) for key in keys if key not in known), return_exceptions=True)
+    fetched = [result for result in results if not isinstance(result, BaseException)]
+    if fetched:
+        await run_in_threadpool(_save, kind, fetched)
+    # Saved terms are skipped when the batch is retried
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+@jobs.register(JOB_KINDS[DISH], batch_size=WINE_BATCH_SIZE)
+async def fetch_dish_pairings(keys: list[str]):
+    await _fetch_batch(DISH, keys)
+
+
+@jobs.register(JOB_KINDS[WINE], batch_size=WINE_BATCH_SIZE)
+async def fetch_wine_dishes(keys: list[str]):
+    await _fetch_batch(WINE, keys)
+
+
+#       ------------------      Precompute for cached recipes      ------------------
+
+def main_ingredient(names: list[str]) -> str | None:
+    for name in names:
+        for candidate in name_suffixes(name):
+            if candidate in WINE_FOODS:
+                return candidate
+        for word in (name or "").split():
+            if word in WINE_FOODS:
+                return word
+    return None
+
+
+def queue_recipe_pairings(db: Session, recipe_ids: list[int]):
+    """
+    Queue dish lookups for the cuisines and main ingredients of the given recipes (after-write hook).
+    """
+    terms = {
+        normalize_term(cuisine) for (cuisines,) in
+        db.query(Recipe.cuisine).filter(Recipe.id.in_(recipe_ids), Recipe.cuisine.isnot(None)).distinct()
+        for cuisine in split_tags(cuisines)
+    }
+    names = {}
+    rows = (
+        db.query(RecipeIngredient.recipe_id, RecipeIngredient.name)
+        .filter(RecipeIngredient.recipe_id.in_(recipe_ids))
+        .order_by(RecipeIngredient.id)
+    )
+    for recipe_id, name in rows:
+        names.setdefault(recipe_id, []).append(name)
+    terms.update(main_ingredient(recipe_names) for recipe_names in names.values())
+    terms.discard(None)
+    terms.discard("")
+    if terms:
+        # (kind, key) is unique in the job table: terms queued or fetched before are skipped
+        jobs.enqueue(db, JOB_KINDS[DISH], sorted(terms))
+
+
+bulk.after_recipes_written.append(queue_recipe_pairings)
+
+
+if __name__ == "__main__":
+    # python -m app.services.wine  (queue pairing lookups for every cached recipe)
+    parser = argparse.ArgumentParser(description="Queue wine pairing lookups for cached recipes")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        recipe_ids = [recipe_id for (recipe_id,) in db.query(Recipe.id).order_by(Recipe.id)]
+        for start in range(0, len(recipe_ids), args.batch_size):
+            queue_recipe_pairings(db, recipe_ids[start:start + args.batch_size])
+        logger.info("Queued pairing lookups for %d recipes", len(recipe_ids))
+    finally:
+        db.close()
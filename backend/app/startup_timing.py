@@ -0,0 +1,64 @@
+import logging, os, time
+
+# Boot-time report: where a worker spends its time between process start and the first request.
+# app.main imports this module first and calls mark() after each boot phase.
+
+logger = logging.getLogger("uvicorn.error")
+
+_origin = time.perf_counter()
+_phases: list[tuple[str, float]] = []
+_first_request_at: float | None = None
+
+
+def _process_age() -> float | None:
+    # Seconds since the OS started this process (Linux only): covers interpreter + uvicorn boot
+    try:
+        with open("/proc/self/stat") as stat:
+            started = int(stat.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as uptime:
+            return float(uptime.read().split()[0]) - started / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+_boot_offset = _process_age() or 0.0
+
+
+def mark(phase: str):
+    _phases.append((phase, time.perf_counter()))
+
+
+def report() -> dict:
+    phases = []
+    previous = _origin
+    for phase, at in _phases:
+        phases.append({
+            "phase": phase,
+            "took_ms": round((at - previous) * 1000, 1),
+            "at_ms": round((at - _origin) * 1000, 1),
+        })
+        previous = at
+    return {
+        "before_app_import_ms": round(_boot_offset * 1000, 1),
+        "phases": phases,
+        "time_to_first_request_ms": (
+            round((_first_request_at - _origin + _boot_offset) * 1000, 1) if _first_request_at else None
+        ),
+    }
+
+
+class FirstRequestTimer:
+    """
+    ASGI middleware: records and logs the time to the first HTTP request, then gets out of the way.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _first_request_at
+        if _first_request_at is None and scope["type"] == "http":
+            _first_request_at = time.perf_counter()
+            mark("first_request")
+            logger.info("Startup timing: %s", report())
+        await self.app(scope, receive, send)
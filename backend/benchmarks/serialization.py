@@ -0,0 +1,106 @@
+import argparse, asyncio, os, time
+from types import SimpleNamespace
+
+# Per-request CPU of a recipe list response: response_model path vs the pre-encoded payload path.
+#
+#   cd backend && python -m benchmarks.serialization [--recipes 20] [--ingredients 12]
+#
+# response_model   RecipeSchema.model_validate per recipe in the route helper, then FastAPI's own
+#                  serialize_response (revalidation against list[RecipeSchema]) and JSONResponse.render
+# orjson, miss     payloads: one orjson fragment per recipe, joined (first request for those recipes)
+# orjson, hit      payloads.recipe_list with every fragment cached (no DB access, no models)
+# response hit     payloads.responses lookup of a whole encoded answer (popular searches)
+# No database is used: rows are built in memory, so only serialization is measured.
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", "sqlite://")
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from app.routes.spoonacular import recipes as recipe_routes
+from app.schemas.recipe import RecipeSchema
+from app.services import payloads
+from app.services.cache import make_key
+
+
+def _rows(recipe_count: int, ingredient_count: int) -> list[SimpleNamespace]:
+    return [
+        SimpleNamespace(
+            id=recipe_id,
+            title=f"Grilled chicken with lemon and herbs {recipe_id}",
+            image=f"https://img.spoonacular.com/recipes/{recipe_id}-556x370.jpg",
+            spoonacular_id=600000 + recipe_id,
+            instructions="Season the chicken. Grill 6 minutes per side. Rest, slice and serve with the sauce. " * 4,
+            cached=True,
+            ingredients=[
+                SimpleNamespace(id=recipe_id * 100 + i, ingredients=f"2 tablespoons ingredient number {i}",
+                                quantity="2.0", unit="tablespoons")
+                for i in range(ingredient_count)
+            ],
+        )
+        for recipe_id in range(1, recipe_count + 1)
+    ]
+
+
+def _measure(function, iterations: int) -> float:
+    # CPU seconds per call (process time: excludes waiting, includes every thread's work)
+    function()
+    started = time.process_time()
+    for _ in range(iterations):
+        function()
+    return (time.process_time() - started) / iterations
+
+
+def run(recipe_count: int, ingredient_count: int, iterations: int) -> list[tuple[str, float]]:
+    rows = _rows(recipe_count, ingredient_count)
+    dicts = [payloads._orm_dict(row) for row in rows]
+    recipe_ids = [row.id for row in rows]
+    field = next(route for route in recipe_routes.router.routes if route.path == "/recipes/random").response_field
+    loop = asyncio.new_event_loop()
+
+    def response_model():
+        content = [RecipeSchema.model_validate(row) for row in rows]
+        encodable = loop.run_until_complete(serialize_response(field=field, response_content=content))
+        return JSONResponse(encodable).body
+
+    def orjson_miss():
+        return b"[" + b",".join(payloads._recipe_fragment(recipe) for recipe in dicts) + b"]"
+
+    payloads.recipe_list(None, recipe_ids, loaded=rows)
+
+    def orjson_hit():
+        return payloads.recipe_list(None, recipe_ids)
+
+    key = make_key("/recipes/search", {"title": "chicken", "number": recipe_count})
+    payloads.responses.set(key, orjson_hit(), 60)
+
+    def response_hit():
+        return payloads.json_response(payloads.responses.get(key)).body
+
+    assert response_model() == orjson_miss() == orjson_hit() == response_hit(), "payload bytes differ"
+    try:
+        return [
+            ("response_model", _measure(response_model, iterations)),
+            ("orjson, miss", _measure(orjson_miss, iterations)),
+            ("orjson, hit", _measure(orjson_hit, iterations)),
+            ("response hit", _measure(response_hit, iterations)),
+        ]
+    finally:
+        loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recipe list serialization: response_model vs pre-encoded payloads")
+    parser.add_argument("--recipes", type=int, default=20)
+    parser.add_argument("--ingredients", type=int, default=12)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    results = run(args.recipes, args.ingredients, args.iterations)
+    baseline = results[0][1]
+    print(f"{args.recipes} recipes x {args.ingredients} ingredients, CPU per request:")
+    for name, seconds in results:
+        print(f"  {name:<16} {seconds * 1e6:9.1f} us   {baseline / seconds:6.1f}x   saved {(baseline - seconds) * 1e6:9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import os, tempfile
+
+# Configuration is read at import time: point the app at a throwaway SQLite database first
+_DB_DIR = tempfile.mkdtemp(prefix="culinarytech-tests-")
+os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{_DB_DIR}/test.db"
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ["SPOONACULAR_API_KEY"] = "test"
+os.environ["AUTO_CREATE_TABLES"] = "true"
+os.environ["RUN_JOB_WORKER"] = "false"
+os.environ["AUTOCOMPLETE_WARM"] = "false"
+os.environ["DEBUG_QUERY_COUNT"] = "true"
+
+import httpx, pytest
+from fastapi.testclient import TestClient
+from app.bootstrap import setup_schema
+from app.db.database import Base, SessionLocal, engine
+from app.main import app
+from app.routes import auth
+from app.services import autocomplete, payloads, recipe_index, spoonacular, wine
+from app.services.quota import QuotaScheduler
+from tests.fakes import FakeSpoonacular
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    setup_schema()
+
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    # Every test starts from empty tables and cold in-process caches
+    with engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+    spoonacular.response_cache.clear()
+    payloads.recipe_fragments.clear()
+    payloads.responses.clear()
+    auth.token_cache.clear()
+    auth.user_cache.clear()
+    recipe_index._index = None
+    autocomplete._recipes = autocomplete._ingredients = None
+    wine._index = None
+    # Fresh, generous budget: quota behaviour has its own tests
+    monkeypatch.setattr(spoonacular, "scheduler", QuotaScheduler(rate=1000, burst=1000))
+    yield
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def upstream():
+    """
+    Spoonacular stand-in: tests register responses per path, calls are recorded.
+    """
+    fake = FakeSpoonacular()
+    spoonacular._client = httpx.AsyncClient(base_url=spoonacular.BASE_URL, transport=httpx.MockTransport(fake.handle))
+    yield fake
+    spoonacular._client = None
+
+
+@pytest.fixture
+def client(upstream):
+    with TestClient(app) as test_client:
+        # The lifespan closes the client on exit only; install the fake for the requests in between
+        spoonacular._client = httpx.AsyncClient(
+            base_url=spoonacular.BASE_URL, transport=httpx.MockTransport(upstream.handle)
+        )
+        yield test_client
+
+
+def query_count(response) -> int:
+    # X-DB-Queries header from QueryCountMiddleware (DEBUG_QUERY_COUNT=true above)
+    return int(response.headers["x-db-queries"])
@@ -0,0 +1,61 @@
+import httpx, re
+
+# Spoonacular payloads and a fake API for the tests (see the `upstream` fixture in conftest.py)
+
+
+def recipe_payload(spoonacular_id: int, title: str | None = None, ingredients=("chicken", "rice", "garlic"), **extra) -> dict:
+    """
+    A full recipe as /recipes/{id}/information, /informationBulk and /random return it.
+    """
+    return {
+        "id": spoonacular_id,
+        "title": title or f"Chicken dish {spoonacular_id}",
+        "image": f"https://img.spoonacular.com/recipes/{spoonacular_id}-556x370.jpg",
+        "instructions": "Cook everything.",
+        "readyInMinutes": 30,
+        "servings": 2,
+        "aggregateLikes": 10,
+        "dishTypes": ["main course", "dinner"],
+        "diets": ["gluten free"],
+        "cuisines": ["Italian"],
+        "nutrition": {"nutrients": [
+            {"name": "Calories", "amount": 450}, {"name": "Protein", "amount": 30},
+            {"name": "Carbohydrates", "amount": 40}, {"name": "Fat", "amount": 12},
+        ]},
+        "extendedIngredients": [
+            {"id": 1000 + position, "name": name, "nameClean": name, "original": f"1 cup {name}", "amount": 1.0, "unit": "cup"}
+            for position, name in enumerate(ingredients)
+        ],
+        **extra,
+    }
+
+
+def search_result(spoonacular_id: int, title: str | None = None) -> dict:
+    # complexSearch results only carry id / title / image
+    return {"id": spoonacular_id, "title": title or f"Chicken dish {spoonacular_id}", "image": f"{spoonacular_id}.jpg"}
+
+
+class FakeSpoonacular:
+    def __init__(self):
+        self.routes: list[tuple[re.Pattern, object]] = []
+        self.calls: list[httpx.Request] = []
+
+    def add(self, path: str, response):
+        """
+        Answer GET `path` (a regex matched against the whole URL path) with `response`:
+        JSON data, an httpx.Response, or a callable(request) returning either.
+        Later registrations win.
+        """
+        self.routes.insert(0, (re.compile(path), response))
+
+    def paths(self) -> list[str]:
+        return [request.url.path for request in self.calls]
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(request)
+        for pattern, response in self.routes:
+            if pattern.fullmatch(request.url.path):
+                if callable(response):
+                    response = response(request)
+                return response if isinstance(response, httpx.Response) else httpx.Response(200, json=response)
+        return httpx.Response(404, json={"status": "failure", "code": 404})
@@ -0,0 +1,34 @@
+from app.services.autocomplete import PrefixIndex
+
+
+def _ids(index, query, number=5):
+    return [item[0] for item in index.search(query, number)]
+
+
+def test_words_anywhere_in_the_label_match_ranked_by_popularity():
+    index = PrefixIndex([(1, "Chicken Tikka Masala", None, 5), (2, "Tikka Paneer", None, 9), (3, "Rice", None, 1)])
+    assert _ids(index, "tik") == [2, 1]
+    assert _ids(index, "chicken tikka m") == [1]
+    assert _ids(index, "xyz") == []
+
+
+def test_add_inserts_new_items_into_cached_rankings():
+    index = PrefixIndex([(1, "Chicken Curry", None, 5)])
+    assert _ids(index, "ch") == [1]
+    index.add([(2, "Chili", None, 7)])
+    assert _ids(index, "ch") == [2, 1]
+
+
+def test_add_updates_known_items_in_place():
+    index = PrefixIndex([(1, "Chicken Curry", None, 5), (2, "Chili", None, 7)])
+    assert _ids(index, "ch") == [2, 1]
+    assert _ids(index, "cu") == [1]
+
+    index.add([(1, "Lamb Curry", "1.jpg", 10), (2, "Chili", None, 1)])
+
+    assert _ids(index, "chicken") == []
+    assert _ids(index, "lamb") == [1]
+    assert _ids(index, "ch") == [2]
+    assert _ids(index, "cu") == [1]
+    assert index.search("lamb", 1) == [(1, "Lamb Curry", "1.jpg", 10)]
+    assert len(index.items) == 2
@@ -0,0 +1,83 @@
+from sqlalchemy import event, insert, select
+
+from app.db import bulk
+from app.models.db_recipes import Ingredient, Recipe, RecipeIngredient
+from app.services import spoonacular
+from tests.fakes import recipe_payload, search_result
+
+
+def test_portable_upsert_do_nothing_and_do_update(db):
+    stmt = bulk.PortableUpsert(Ingredient)
+    bulk.execute_upsert(db, stmt.values([{"spoonacular_id": 1, "name": "salt"}]).on_conflict_do_nothing(["spoonacular_id"]))
+    bulk.execute_upsert(db, stmt.values([{"spoonacular_id": 1, "name": "sea salt"}]).on_conflict_do_nothing(["spoonacular_id"]))
+    assert db.scalar(select(Ingredient.name).where(Ingredient.spoonacular_id == 1)) == "salt"
+
+    update = stmt.values([{"spoonacular_id": 1, "name": "sea salt"}, {"spoonacular_id": 2, "name": "pepper"}])
+    update = update.on_conflict_do_update(["spoonacular_id"], set_={"name": stmt.excluded.name})
+    bulk.execute_upsert(db, update)
+    db.commit()
+    assert dict(db.execute(select(Ingredient.spoonacular_id, Ingredient.name)).all()) == {1: "sea salt", 2: "pepper"}
+
+
+def test_portable_upsert_returning(db):
+    stmt = (
+        bulk.PortableUpsert(Ingredient)
+        .values([{"spoonacular_id": 5, "name": "basil"}])
+        .on_conflict_do_nothing(["spoonacular_id"])
+        .returning(Ingredient.spoonacular_id)
+    )
+    assert list(bulk.execute_upsert(db, stmt).scalars()) == [5]
+    # Nothing inserted on conflict, nothing returned
+    assert bulk.execute_upsert(db, stmt).all() == []
+
+
+def test_upsert_recipes_keeps_input_order_and_ingredients(db):
+    rows = [spoonacular.recipe_row(recipe_payload(sid)) for sid in (3, 1, 2, 1)]
+    recipes = bulk.upsert_recipes(db, rows)
+    assert [recipe.spoonacular_id for recipe in recipes] == [3, 1, 2]
+    assert sorted(ingredient.name for ingredient in recipes[0].ingredients) == ["chicken", "garlic", "rice"]
+
+    # A second write of the same recipes does not duplicate their ingredients
+    recipes = bulk.upsert_recipes(db, rows)
+    assert len(recipes[0].ingredients) == 3
+
+
+def test_ingredients_written_meanwhile_are_not_duplicated(db):
+    bulk.upsert_recipes(db, [spoonacular.recipe_row(search_result(1))])
+    row = spoonacular.recipe_row(recipe_payload(1))
+    engine = db.get_bind()
+
+    # Another worker stores the same lines between our "has ingredients?" check and our insert
+    def other_writer(connection, cursor, statement, *args):
+        if statement.startswith("INSERT INTO recipe_ingredients") and not other_writer.done:
+            other_writer.done = True
+            with engine.begin() as other:
+                recipe_id = other.scalar(select(Recipe.id).where(Recipe.spoonacular_id == 1))
+                other.execute(insert(RecipeIngredient), [
+                    {"recipe_id": recipe_id, "position": position, "ingredients": line["ingredients"]}
+                    for position, line in enumerate(row["ingredients"])
+                ])
+    other_writer.done = False
+
+    event.listen(engine, "before_cursor_execute", other_writer)
+    try:
+        (recipe,) = bulk.upsert_recipes(db, [row])
+    finally:
+        event.remove(engine, "before_cursor_execute", other_writer)
+    assert other_writer.done
+    assert len(recipe.ingredients) == 3
+
+
+def test_failing_after_write_callback_does_not_fail_the_write(db, monkeypatch, caplog):
+    called = []
+
+    def failing(db, recipe_ids):
+        raise RuntimeError("index rebuild failed")
+
+    monkeypatch.setattr(bulk, "after_recipes_written", [failing, lambda db, recipe_ids: called.append(recipe_ids)])
+
+    (recipe,) = bulk.upsert_recipes(db, [spoonacular.recipe_row(recipe_payload(1))])
+
+    assert recipe.spoonacular_id == 1
+    assert called == [[recipe.id]]
+    assert "index rebuild failed" in caplog.text
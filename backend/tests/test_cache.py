@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from app.services.cache import MISSING, TTLCache
+
+
+def test_get_set_and_lru_eviction():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    assert cache.get("a") == 1
+    cache.set("c", 3, ttl=60)
+    # "b" was the least recently used entry
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_stale_entries_need_allow_stale():
+    cache = TTLCache()
+    cache.set("a", 1, ttl=0, stale_ttl=60)
+    assert cache.get("a") is MISSING
+    assert cache.get("a", allow_stale=True) == 1
+
+    cache.set("b", 2, ttl=0)
+    assert cache.get("b", allow_stale=True) is MISSING
+    assert cache.expirations == 1
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = TTLCache()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_fetch("k", fetch, ttl=60) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["value"] * 5
+    assert calls == 1
+    assert cache.misses == 1 and cache.coalesced == 4
+
+
+def test_flights_are_shared_per_flight_key():
+    cache = TTLCache()
+    calls = []
+
+    def fetcher(name):
+        async def fetch():
+            calls.append(name)
+            await asyncio.sleep(0.01)
+            return name
+        return fetch
+
+    async def main():
+        return await asyncio.gather(
+            cache.get_or_fetch("k", fetcher("interactive"), ttl=60, flight=("k", "interactive")),
+            cache.get_or_fetch("k", fetcher("interactive"), ttl=60, flight=("k", "interactive")),
+            cache.get_or_fetch("k", fetcher("background"), ttl=60, flight=("k", "background")),
+        )
+
+    assert asyncio.run(main()) == ["interactive", "interactive", "background"]
+    assert sorted(calls) == ["background", "interactive"]
+
+
+def test_errors_are_propagated_and_not_cached():
+    cache = TTLCache()
+
+    async def failing():
+        raise RuntimeError("upstream down")
+
+    async def ok():
+        return 1
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await cache.get_or_fetch("k", failing, ttl=60)
+        return await cache.get_or_fetch("k", ok, ttl=60)
+
+    assert asyncio.run(main()) == 1
+    assert cache.stats()["inflight"] == 0
+
+
+def test_stale_hit_refreshes_in_background():
+    cache = TTLCache()
+    cache.set("k", "old", ttl=0, stale_ttl=60)
+
+    async def fetch():
+        return "new"
+
+    async def main():
+        first = await cache.get_or_fetch("k", fetch, ttl=60)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return first, cache.get("k")
+
+    assert asyncio.run(main()) == ("old", "new")
+    assert cache.stale_hits == 1 and cache.refreshes == 1
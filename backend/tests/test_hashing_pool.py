@@ -0,0 +1,53 @@
+import asyncio, threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.routes.auth import HashingPool
+
+
+def test_pending_follows_the_work_not_the_caller():
+    pool = HashingPool(workers=1, queue_depth=0)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_hash():
+        started.set()
+        release.wait(5)
+        return "hash"
+
+    async def main():
+        caller = asyncio.create_task(pool.run(slow_hash))
+        await asyncio.to_thread(started.wait, 5)
+        caller.cancel()
+        await asyncio.sleep(0)
+        # The bcrypt call is still running: the slot stays taken
+        assert pool.pending == 1
+        with pytest.raises(HTTPException):
+            await pool.run(slow_hash)
+
+        release.set()
+        while pool.pending:
+            await asyncio.sleep(0.01)
+        return await pool.run(lambda: "next")
+
+    assert asyncio.run(main()) == "next"
+    assert pool.stats()["rejected"] == 1
+    assert pool.completed == 2
+
+
+def test_failures_are_counted_separately():
+    pool = HashingPool(workers=2, queue_depth=2)
+
+    def broken():
+        raise ValueError("bad hash")
+
+    async def main():
+        with pytest.raises(ValueError):
+            await pool.run(broken)
+        await pool.run(lambda: "ok")
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    stats = pool.stats()
+    assert (stats["completed"], stats["failed"]) == (1, 1)
+    assert pool.pending == 0
@@ -0,0 +1,31 @@
+import pytest
+
+from app.db import bulk
+from app.services import spoonacular
+from tests.fakes import recipe_payload
+
+
+@pytest.fixture
+def recipes(db):
+    bulk.upsert_recipes(db, [spoonacular.recipe_row(recipe_payload(sid)) for sid in range(1, 11)])
+
+
+@pytest.mark.parametrize("encoding", ["br", "gzip"])
+def test_large_bodies_are_compressed(client, recipes, encoding):
+    response = client.get("/recipes/search/chicken", params={"number": 10}, headers={"Accept-Encoding": encoding})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["etag"].endswith(f'-{encoding}"')
+    assert len(response.json()) == 10
+
+
+def test_matching_etag_is_not_modified(client, recipes):
+    first = client.get("/recipes/search/chicken", params={"number": 10}, headers={"Accept-Encoding": "br"})
+
+    # Same body in another encoding: the weak comparison still matches
+    response = client.get(
+        "/recipes/search/chicken", params={"number": 10},
+        headers={"Accept-Encoding": "identity", "If-None-Match": first.headers["etag"]},
+    )
+    assert response.status_code == 304
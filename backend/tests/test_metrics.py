@@ -0,0 +1,18 @@
+from app.models.db_users import User
+from app.routes import auth
+
+ROUTES = ("/metrics/cache", "/metrics/payloads", "/metrics/hashing", "/metrics/startup", "/metrics/jobs", "/metrics/spoonacular")
+
+
+def test_metrics_need_a_signed_in_user(client):
+    for route in ROUTES:
+        assert client.get(route).status_code == 401, route
+
+
+def test_metrics_for_a_signed_in_user(client, db):
+    db.add(User(username="ops", full_name="Ops", phone=1, email="ops@example.com", password="x"))
+    db.commit()
+    headers = {"Authorization": f"Bearer {auth.create_access_token({'sub': 'ops@example.com'})}"}
+
+    for route in ROUTES:
+        assert client.get(route, headers=headers).status_code == 200, route
@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.db import migrations
+from app.db.database import Base
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_fresh_schema_applies_every_step_once(engine):
+    Base.metadata.create_all(engine)
+    versions = [version for version, _ in migrations.MIGRATIONS]
+    with engine.begin() as connection:
+        assert migrations.pending(connection) == versions
+        assert migrations.migrate(connection) == versions
+    with engine.begin() as connection:
+        assert migrations.pending(connection) == []
+        assert migrations.migrate(connection) == []
+    migrations.check(engine)
+
+
+def test_check_refuses_a_schema_that_is_behind(engine):
+    Base.metadata.create_all(engine)
+    with pytest.raises(RuntimeError, match="schema is behind"):
+        migrations.check(engine)
+
+
+def test_add_columns_brings_old_tables_up_to_date(engine):
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for index in inspect(connection).get_indexes("recipes"):
+            if index["column_names"] == ["likes"]:
+                connection.execute(text(f"DROP INDEX {index['name']}"))
+        connection.execute(text("ALTER TABLE recipes DROP COLUMN likes"))
+    with engine.begin() as connection:
+        migrations.migrate(connection)
+        assert "likes" in {column["name"] for column in inspect(connection).get_columns("recipes")}
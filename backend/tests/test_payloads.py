@@ -0,0 +1,42 @@
+from pydantic import TypeAdapter
+
+from app.db import bulk
+from app.models.db_recipes import Recipe, RecipeIngredient
+from app.schemas.recipe import RecipeSchema
+from app.services import payloads, spoonacular
+from tests.fakes import recipe_payload, search_result
+
+recipe_list_schema = TypeAdapter(list[RecipeSchema])
+
+
+def _legacy_recipe(db, **values) -> int:
+    # Rows cached by older code: nullable columns the schema requires
+    recipe = Recipe(**values)
+    recipe.ingredients.append(RecipeIngredient(ingredients=None, quantity=None, unit=None))
+    db.add(recipe)
+    db.commit()
+    return recipe.id
+
+
+def test_recipe_list_validates_against_the_schema(db):
+    recipes = bulk.upsert_recipes(db, [
+        spoonacular.recipe_row(recipe_payload(1)), spoonacular.recipe_row(search_result(2)),
+    ])
+    legacy_id = _legacy_recipe(db, spoonacular_id=3, title=None, cached=None)
+    recipe_ids = [recipe.id for recipe in recipes] + [legacy_id]
+
+    # Encoded from loaded rows (the legacy one from projections), then from the cached fragments
+    for body in (
+        payloads.recipe_list(db, recipe_ids, loaded=recipes),
+        payloads.recipe_list(db, recipe_ids),
+    ):
+        validated = recipe_list_schema.validate_json(body)
+        assert [recipe.spoonacular_id for recipe in validated] == [1, 2, 3]
+        assert body == recipe_list_schema.dump_json(validated)
+    payloads.recipe_fragments.clear()
+    assert recipe_list_schema.validate_json(payloads.recipe_list(db, recipe_ids))
+
+
+def test_recipes_without_a_spoonacular_id_are_left_out(db):
+    recipe_id = _legacy_recipe(db, spoonacular_id=None, title="Grandma's soup", cached=True)
+    assert payloads.recipe_list(db, [recipe_id]) == b"[]"
@@ -0,0 +1,57 @@
+import pytest
+
+TOTAL = 100
+
+
+@pytest.fixture
+def catalog(upstream):
+    # 100 "greek yogurt" products upstream, paged like /food/products/search
+    def search(request):
+        offset, number = int(request.url.params["offset"]), int(request.url.params["number"])
+        products = [
+            {"id": n, "title": f"Greek yogurt {n:03d}", "image": f"{n}.jpg", "imageType": "jpg"}
+            for n in range(offset, min(offset + number, TOTAL))
+        ]
+        return {"products": products, "totalProducts": TOTAL}
+
+    upstream.add(r"/food/products/search", search)
+    return upstream
+
+
+def _search(client, offset, number=10):
+    response = client.get("/products/search", params={"query": "Greek  Yogurt", "offset": offset, "number": number})
+    assert response.status_code == 200
+    return response
+
+
+def test_pages_inside_the_fetched_window_are_local(client, catalog):
+    assert _search(client, 0).headers["x-data-source"] == "spoonacular"
+    assert _search(client, 10).headers["x-data-source"] == "spoonacular"
+
+    # 20 leading results cached: any page inside them is local, even though upstream knows 100
+    response = _search(client, 5)
+    assert response.headers["x-data-source"] == "local"
+    assert len(response.json()["products"]) == 10
+    assert response.json()["next_offset"] == 15
+
+    assert _search(client, 15).headers["x-data-source"] == "spoonacular"
+
+
+def test_a_gap_does_not_extend_the_fetched_window(client, catalog):
+    _search(client, 0)
+    _search(client, 30)
+
+    assert _search(client, 0).headers["x-data-source"] == "local"
+    assert _search(client, 30).headers["x-data-source"] == "spoonacular"
+    assert _search(client, 10).headers["x-data-source"] == "spoonacular"
+    # 10..20 closes the gap up to 20 only; 30..40 was fetched before it joined the window
+    assert _search(client, 10).headers["x-data-source"] == "local"
+
+
+def test_a_fully_fetched_query_is_local(client, catalog):
+    _search(client, 0, number=100)
+
+    response = _search(client, 95)
+    assert response.headers["x-data-source"] == "local"
+    assert len(response.json()["products"]) == 5
+    assert response.json()["next_offset"] is None
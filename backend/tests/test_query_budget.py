@@ -0,0 +1,105 @@
+import orjson
+
+from app.db import bulk
+from app.db.query_counter import assert_max_queries
+from app.routes.spoonacular import recipes as recipe_routes
+from app.services import payloads, similarity, spoonacular
+from tests.conftest import query_count
+from tests.fakes import recipe_payload, search_result
+
+# Statement budgets for the hot recipe paths: a lazy load or a per-row query in a loop breaks these.
+
+
+def _cache_recipes(db, spoonacular_ids):
+    return bulk.upsert_recipes(db, [spoonacular.recipe_row(recipe_payload(sid)) for sid in spoonacular_ids])
+
+
+def test_local_search_budget(client, db):
+    _cache_recipes(db, range(1, 11))
+
+    response = client.get("/recipes/search/chicken", params={"number": 10})
+
+    assert response.status_code == 200
+    assert response.headers["x-data-source"] == "local"
+    assert len(response.json()) == 10
+    # ranked ids, then recipes and their ingredients (payloads.recipe_list)
+    assert query_count(response) <= 3
+
+
+def test_local_search_helpers_budget(db):
+    _cache_recipes(db, range(1, 11))
+
+    with assert_max_queries(3):
+        recipe_ids = recipe_routes._search_local_recipes(db, "chicken", 10, "dinner", "gluten free", "10-60", ["beef"])
+        payloads.recipe_list(db, recipe_ids)
+    assert len(recipe_ids) == 10
+
+
+def test_search_miss_budget(client, db, upstream):
+    _cache_recipes(db, range(1, 3))
+    upstream.add(r"/recipes/complexSearch", {"results": [search_result(sid, f"Chicken {sid}") for sid in range(100, 108)]})
+
+    response = client.get("/recipes/search/chicken", params={"number": 10})
+
+    assert response.status_code == 200
+    assert response.headers["x-data-source"] == "local+spoonacular"
+    assert len(response.json()) == 10
+    # constant in the number of new recipes: no per-recipe reload after the enrichment jobs are queued
+    assert query_count(response) <= 11
+
+
+def test_save_search_results_budget(db):
+    local_ids = [recipe.id for recipe in _cache_recipes(db, range(1, 3))]
+    results = [search_result(sid, f"Chicken {sid}") for sid in range(100, 110)]
+
+    with assert_max_queries(10):
+        body = recipe_routes._save_search_results(db, local_ids, results, 12)
+    assert len(orjson.loads(body)) == 12
+
+
+def test_cached_search_answer_budget(client, db):
+    _cache_recipes(db, range(1, 6))
+    client.get("/recipes/search/chicken", params={"number": 5})
+
+    response = client.get("/recipes/search/chicken", params={"number": 5})
+
+    assert response.status_code == 200
+    assert query_count(response) == 0
+
+
+def test_cached_similar_recipes_budget(client, db, upstream):
+    recipe, *others = _cache_recipes(db, range(1, 6))
+    similarity.save_edges(db, similarity.edges_from_spoonacular(recipe.id, [
+        {"id": other.spoonacular_id, "title": other.title, "image": other.image} for other in others
+    ]))
+
+    response = client.get(f"/recipes/{recipe.spoonacular_id}/similar_recipes", params={"number": 3})
+
+    assert response.status_code == 200
+    assert [item["similar_spoonacular_id"] for item in response.json()["similar_recipes"]] == [2, 3, 4]
+    assert len(response.json()["ingredients"]) == 3
+    # recipe + edges in one join, ingredients in one SELECT ... IN
+    assert query_count(response) <= 2
+    assert upstream.calls == []
+
+
+def test_similar_recipes_from_upstream_budget(client, db, upstream):
+    recipe, = _cache_recipes(db, [1])
+    upstream.add(r"/recipes/1/similar", [{"id": 50 + i, "title": f"Similar {i}", "image": None} for i in range(5)])
+
+    response = client.get("/recipes/1/similar_recipes", params={"number": 5})
+
+    assert response.status_code == 200
+    assert len(response.json()["similar_recipes"]) == 5
+    assert query_count(response) <= 6
+
+
+def test_random_recipes_budget(client, upstream):
+    upstream.add(r"/recipes/random", {"recipes": [recipe_payload(sid) for sid in range(1, 11)]})
+
+    response = client.get("/recipes/random", params={"number": 10})
+
+    assert response.status_code == 200
+    assert len(response.json()) == 10
+    # constant in the number of recipes: one statement per table and per after-write hook
+    assert query_count(response) <= 10
@@ -0,0 +1,61 @@
+import asyncio, time
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.quota import BACKGROUND, INTERACTIVE, NO_RATE_RETRY_AFTER, QuotaScheduler
+
+
+def test_points_left_decide_the_mode():
+    scheduler = QuotaScheduler(rate=10, burst=10, min_points=5, background_reserve=50)
+    assert scheduler.mode() == "normal"
+
+    scheduler.record(200, {"X-API-Quota-Left": "40"})
+    assert scheduler.mode() == "background_paused"
+    assert scheduler.allows(INTERACTIVE) and not scheduler.allows(BACKGROUND)
+
+    scheduler.record(200, {"X-API-Quota-Left": "3"})
+    assert scheduler.mode() == "cache_only"
+    assert not scheduler.allows(INTERACTIVE)
+
+
+def test_402_means_cache_only_until_the_reset():
+    scheduler = QuotaScheduler(rate=10, burst=10)
+    scheduler.record(402, {})
+    assert scheduler.mode() == "cache_only"
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(scheduler.acquire())
+    assert error.value.status_code == 503
+    assert int(error.value.headers["Retry-After"]) > 0
+    assert scheduler.rejected[INTERACTIVE] == 1
+
+
+def test_429_pauses_and_empties_the_bucket():
+    scheduler = QuotaScheduler(rate=10, burst=10, max_wait=0.0)
+    scheduler.record(429, {"Retry-After": "5"})
+    assert scheduler.rate_limited == 1
+    assert scheduler.paused_until > time.monotonic() + 4
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(scheduler.acquire())
+    assert int(error.value.headers["Retry-After"]) >= 5
+    assert scheduler.throttled[INTERACTIVE] == 1
+
+
+def test_bucket_allows_burst_then_throttles():
+    scheduler = QuotaScheduler(rate=0.001, burst=2, max_wait=0.0)
+
+    async def main():
+        await scheduler.acquire()
+        await scheduler.acquire()
+        await scheduler.acquire()
+
+    with pytest.raises(HTTPException):
+        asyncio.run(main())
+    assert scheduler.calls[INTERACTIVE] == 2
+
+
+def test_zero_rate_uses_a_fixed_retry_after():
+    scheduler = QuotaScheduler(rate=0, burst=0, max_wait=0.0)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(scheduler.acquire())
+    assert error.value.headers["Retry-After"] == str(NO_RATE_RETRY_AFTER)
@@ -0,0 +1,18 @@
+import httpx
+
+
+def test_similar_recipes_of_an_unknown_recipe_is_404(client, upstream):
+    response = client.get("/recipes/424242/similar_recipes")
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Recipe not found"
+    assert "/recipes/424242/information" in upstream.paths()
+
+
+def test_similar_recipes_upstream_failure_is_not_a_404(client, upstream):
+    upstream.add(r"/recipes/7/information", httpx.Response(500))
+
+    response = client.get("/recipes/7/similar_recipes")
+
+    assert response.status_code == 500
+
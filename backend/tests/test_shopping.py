@@ -0,0 +1,84 @@
+import pytest
+
+from app.db import bulk
+from app.services import enrichment, shopping, spoonacular
+from app.models.db_users import User
+from tests.fakes import recipe_payload, search_result
+
+
+@pytest.fixture
+def user_id(db):
+    user = User(username="cook", full_name="Cook", phone=1, email="cook@example.com", password="x")
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+def _cache(db, *recipes):
+    bulk.upsert_recipes(db, [spoonacular.recipe_row(recipe) for recipe in recipes])
+
+
+def _items(db, user_id):
+    return {item["name"]: item["amount"] for item in shopping.get_list(db, user_id)["items"]}
+
+
+def test_adding_and_removing_recipes_applies_deltas(db, user_id):
+    _cache(db, recipe_payload(1, ingredients=("rice", "garlic")), recipe_payload(2, ingredients=("rice", "onion")))
+
+    result = shopping.update_list(db, user_id, add=[1, 2, 99], remove=[])
+    assert result["added"] == 2 and result["unknown"] == [99]
+    items = _items(db, user_id)
+    assert set(items) == {"rice", "garlic", "onion"}
+    assert items["rice"] == pytest.approx(2 * items["onion"])
+
+    shopping.update_list(db, user_id, add=[], remove=[1])
+    items = _items(db, user_id)
+    assert set(items) == {"rice", "onion"}
+    assert items["rice"] == pytest.approx(items["onion"])
+    assert shopping.get_list(db, user_id)["recipes"] == [2]
+
+
+def test_repeated_updates_change_nothing(db, user_id):
+    _cache(db, recipe_payload(1))
+    shopping.update_list(db, user_id, add=[1], remove=[])
+    before = _items(db, user_id)
+    assert shopping.update_list(db, user_id, add=[1], remove=[])["items_changed"] == 0
+    assert _items(db, user_id) == before
+
+
+def test_deleted_items_stay_hidden_and_go_with_their_last_recipe(db, user_id):
+    _cache(db, recipe_payload(1, ingredients=("rice",)))
+    shopping.update_list(db, user_id, add=[1], remove=[])
+    (item,) = shopping.get_list(db, user_id)["items"]
+    assert shopping.delete_item(db, user_id, item["id"])
+    assert shopping.get_list(db, user_id)["items"] == []
+
+    shopping.update_list(db, user_id, add=[], remove=[1])
+    shopping.update_list(db, user_id, add=[1], remove=[])
+    assert [item["name"] for item in shopping.get_list(db, user_id)["items"]] == ["rice"]
+
+
+def test_removal_subtracts_what_the_recipe_added(db, user_id):
+    # Recipe 1 comes from a search (no ingredients yet) and is enriched while on the list
+    _cache(db, recipe_payload(2, ingredients=("rice",)), search_result(1))
+    shopping.update_list(db, user_id, add=[1, 2], remove=[])
+    before = _items(db, user_id)
+    bulk.upsert_recipes(db, [spoonacular.recipe_row(recipe_payload(1, ingredients=("rice", "onion")))],
+                        update_fields=enrichment.ENRICHED_FIELDS)
+
+    shopping.update_list(db, user_id, add=[], remove=[1])
+    assert _items(db, user_id) == before
+
+
+def test_a_new_contribution_shows_a_hidden_item_again(db, user_id):
+    _cache(db, *(recipe_payload(sid, ingredients=("rice",)) for sid in (1, 2, 3)))
+    shopping.update_list(db, user_id, add=[1, 2], remove=[])
+    (item,) = shopping.get_list(db, user_id)["items"]
+    shopping.delete_item(db, user_id, item["id"])
+
+    # Removing a recipe keeps it hidden, adding one that needs it shows it with the running total
+    shopping.update_list(db, user_id, add=[], remove=[2])
+    assert shopping.get_list(db, user_id)["items"] == []
+    shopping.update_list(db, user_id, add=[3], remove=[])
+    (shown,) = shopping.get_list(db, user_id)["items"]
+    assert shown["id"] == item["id"] and shown["amount"] == pytest.approx(item["amount"])
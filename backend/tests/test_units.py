@@ -0,0 +1,51 @@
+import pytest
+
+from app.services import units
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("2", 2.0),
+        ("1 1/2", 1.5),
+        ("3/4", 0.75),
+        ("½", 0.5),
+        ("1½", 1.5),
+        ("2-3", 2.5),
+        ("1 to 2", 1.5),
+        ("0.25", 0.25),
+        (3, 3.0),
+        ("", None),
+        ("a pinch", None),
+        (None, None),
+    ],
+)
+def test_parse_quantity(text, expected):
+    if expected is None:
+        assert units.parse_quantity(text) is None
+    else:
+        assert units.parse_quantity(text) == pytest.approx(expected)
+
+
+def test_normalize_unit():
+    assert units.normalize_unit("Cups") == "cup"
+    assert units.normalize_unit("T") == "tbsp"
+    assert units.normalize_unit("handful of") is None
+
+
+def test_to_base_keeps_the_dimension():
+    assert units.to_base("1", "cup") == ("ml", pytest.approx(236.5882365))
+    assert units.to_base("2", "kg") == ("g", 2000.0)
+    assert units.to_base("some", "cup") == (None, None)
+    assert units.to_base("1", "splash") == (None, None)
+
+
+def test_to_base_uses_piece_weights():
+    unit, amount = units.to_base("2", "slice", "bread")
+    assert unit == "g" and amount == pytest.approx(60.0)
+
+
+def test_convert_needs_a_density_across_dimensions():
+    with pytest.raises(units.ConversionError):
+        units.convert("1", "cup", "g", "unobtainium")
+    assert units.grams("1", "cup", "unobtainium") is None
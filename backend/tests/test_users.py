@@ -0,0 +1,37 @@
+import json
+
+from app.models.db_users import User
+from tests.conftest import query_count
+
+
+def _add_users(db, count):
+    db.add_all(
+        User(username=f"user{n}", full_name=f"User {n}", phone=n, email=f"user{n}@example.com", password="x")
+        for n in range(count)
+    )
+    db.commit()
+
+
+def test_keyset_pagination_follows_the_cursor(client, db):
+    _add_users(db, 5)
+    seen = []
+    after_id = 0
+    while True:
+        response = client.get("/user/", params={"after_id": after_id, "limit": 2})
+        assert response.status_code == 200
+        assert query_count(response) <= 1
+        seen += [user["username"] for user in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+        after_id = int(cursor)
+    assert seen == [f"user{n}" for n in range(5)]
+
+
+def test_stream_returns_every_user_as_ndjson(client, db):
+    _add_users(db, 3)
+    response = client.get("/user/", params={"stream": "true"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines() if line]
+    assert [line["username"] for line in lines] == ["user0", "user1", "user2"]
+    assert "password" not in lines[0]
@@ -0,0 +1,47 @@
+import time
+
+from app.db import bulk
+from app.models.db_jobs import Job
+from app.models.db_wine import WinePairing
+from app.services import spoonacular, wine
+from tests.fakes import recipe_payload
+
+
+def _queued(db):
+    return sorted((job.kind, job.key) for job in db.query(Job).filter(Job.kind.in_(wine.JOB_KINDS.values())))
+
+
+def test_unknown_terms_are_not_queued(client, db):
+    response = client.get("/wine/pairing", params={"food": "qwerty asdf"})
+    assert response.status_code == 404
+    assert client.get("/wine/dishes", params={"wine": "grape juice"}).status_code == 404
+    assert _queued(db) == []
+
+
+def test_known_terms_are_queued(client, db):
+    # A fixed food, a cuisine, a cached ingredient name, and a wine
+    bulk.upsert_recipes(db, [spoonacular.recipe_row(recipe_payload(1, ingredients=("quinoa",), cuisines=[]))])
+    db.query(Job).delete()
+    db.commit()
+
+    for food in ("Steak", "thai", "quinoa"):
+        assert client.get("/wine/pairing", params={"food": food}).status_code == 202, food
+    assert client.get("/wine/dishes", params={"wine": "Malbec"}).status_code == 202
+
+    assert _queued(db) == [
+        ("wine_dishes", "malbec"), ("wine_pairing", "quinoa"), ("wine_pairing", "steak"), ("wine_pairing", "thai"),
+    ]
+
+
+def test_stale_index_is_rebuilt_in_the_background(db):
+    index = wine.get_index(db)
+    db.add(WinePairing(dish="lamb", wine="rioja", source=wine.DISH))
+    db.commit()
+    wine._built_at = time.monotonic() - wine.MAX_INDEX_AGE - 1
+
+    # The stale index answers right away; the new one replaces it when built
+    assert wine.get_index(db) is index
+    deadline = time.monotonic() + 5
+    while wine._index is index and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert wine._index.get(wine.WINE, "rioja")[1] == ["lamb"]